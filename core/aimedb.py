@@ -2,6 +2,7 @@ import logging, coloredlogs
 from Crypto.Cipher import AES
 from typing import Dict, Tuple, Callable, Union, Optional
 import asyncio
+import struct
 from logging.handlers import TimedRotatingFileHandler
 
 from core.config import CoreConfig
@@ -70,56 +71,109 @@ class AimedbServlette():
         asyncio.create_task(asyncio.start_server(self.dataReceived, addr, self.config.aimedb.port))
     
     async def dataReceived(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
-        self.logger.debug(f"Connection made from {writer.get_extra_info('peername')[0]}")
-        while True:
-            try:
-                data: bytes = await reader.read(4096)
-                if len(data) == 0:
-                    self.logger.debug("Connection closed")
-                    return
-                await self.process_data(data, reader, writer)
-                await writer.drain()
-            except ConnectionResetError as e:
-                self.logger.debug("Connection reset, disconnecting")
-                return
-
-    async def process_data(self, data: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Optional[bytes]:
         addr = writer.get_extra_info('peername')[0]
+        self.logger.debug(f"Connection made from {addr}")
+
+        # ECB keeps no state between blocks, so one cipher serves the whole connection
         cipher = AES.new(self.config.aimedb.key.encode(), AES.MODE_ECB)
 
+        # Requests are processed concurrently, but their responses go out in the order they came in
+        pending: asyncio.Queue = asyncio.Queue(max(1, self.config.aimedb.max_pipelined))
+        sender = asyncio.create_task(self.send_responses(pending, cipher, writer))
+
         try:
-            decrypted = cipher.decrypt(data)
-        
-        except Exception as e:
-            self.logger.error(f"Failed to decrypt {data.hex()} because {e}")
-            return
+            while True:
+                decrypted = await self.read_frame(reader, cipher)
+                if decrypted is None:
+                    self.logger.debug("Connection closed")
+                    break
+
+                self.logger.debug(f"{addr} wrote {decrypted.hex()}")
+
+                if struct.unpack_from("<H", decrypted, 4)[0] == CMD_CODE_GOODBYE:
+                    self.logger.info("Goodbye")
+                    break
+
+                await pending.put(asyncio.create_task(self.process_data(decrypted, addr)))
+
+        except ConnectionResetError:
+            self.logger.debug("Connection reset, disconnecting")
 
-        self.logger.debug(f"{addr} wrote {decrypted.hex()}")
+        finally:
+            await pending.put(None)
+            await sender
+            writer.close()
+
+    async def read_frame(self, reader: asyncio.StreamReader, cipher) -> Optional[bytes]:
+        """
+        Read exactly one request, using the length field of the header to find where it ends.
+        Returns the decrypted request, or None if the connection was closed or can't be read anymore.
+        """
+        try:
+            data = await reader.readexactly(HEADER_SIZE)
+
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                self.logger.warning(f"Connection closed with a partial header ({len(e.partial)} bytes)")
+            return None
+
+        decrypted = cipher.decrypt(data)
+        length = struct.unpack_from("<H", decrypted, 6)[0]
+
+        if length <= HEADER_SIZE:
+            return decrypted
+
+        if length % AES.block_size != 0:
+            # There's no way to know where the next request starts, so give up on the connection
+            self.logger.error(f"Request length {length} is not a multiple of the block size, disconnecting: {decrypted.hex()}")
+            return None
 
+        try:
+            data = await reader.readexactly(length - HEADER_SIZE)
+
+        except asyncio.IncompleteReadError as e:
+            self.logger.warning(f"Connection closed with a partial request ({HEADER_SIZE + len(e.partial)} of {length} bytes)")
+            return None
+
+        return decrypted + cipher.decrypt(data)
+
+    async def send_responses(self, pending: asyncio.Queue, cipher, writer: asyncio.StreamWriter) -> None:
+        while True:
+            task: Optional[asyncio.Task] = await pending.get()
+            if task is None:
+                return
+
+            try:
+                resp_bytes = await task
+
+            except Exception as e:
+                self.logger.error(f"Unhandled exception while processing request: {e}")
+                continue
+
+            if resp_bytes is None or writer.is_closing():
+                continue
+
+            try:
+                writer.write(cipher.encrypt(resp_bytes))
+                await writer.drain()
+
+            except ConnectionResetError:
+                self.logger.debug("Connection reset while sending response")
+
+            except Exception as e:
+                self.logger.error(f"Failed to encrypt {resp_bytes.hex()} because {e}")
+
+    async def process_data(self, decrypted: bytes, addr: str) -> Optional[bytes]:
         try:
             head = ADBHeader.from_data(decrypted)
         
         except ADBHeaderException as e:
             self.logger.error(f"Error parsing ADB header: {e}")
-            try:    
-                encrypted = cipher.encrypt(ADBBaseResponse().make())
-                writer.write(encrypted)
-                await writer.drain()
-                return
-
-            except Exception as e:
-                self.logger.error(f"Failed to encrypt default response because {e}")
-            
-            return
+            return ADBBaseResponse().make()
 
         if head.keychip_id == "ABCD1234567" or head.store_id == 0xfff0:
             self.logger.warning(f"Request from uninitialized AMLib: {vars(head)}")
 
-        if head.cmd == 0x66:
-            self.logger.info("Goodbye")
-            writer.close()
-            return
-
         handler, resp_code, name = self.request_list.get(head.cmd, (self.handle_default, None, 'default'))
 
         if resp_code is None:
@@ -138,19 +192,14 @@ class AimedbServlette():
         
         elif resp is None: # Nothing to send, probably a goodbye
             self.logger.warning(f"None return by handler for {name}")
-            return
+            return None
         
         else:
             self.logger.error(f"Unsupported type returned by ADB handler for {name}: {type(resp)}")
             raise TypeError(f"Unsupported type returned by ADB handler for {name}: {type(resp)}")
 
-        try:
-            encrypted = cipher.encrypt(resp_bytes)
-            self.logger.debug(f"Response {resp_bytes.hex()}")
-            writer.write(encrypted)
-
-        except Exception as e:
-            self.logger.error(f"Failed to encrypt {resp_bytes.hex()} because {e}")
+        self.logger.debug(f"Response {resp_bytes.hex()}")
+        return resp_bytes
     
     async def handle_default(self, data: bytes, resp_code: int, length: int = 0x20) -> ADBBaseResponse:
         req = ADBHeader.from_data(data)
@@ -182,9 +231,10 @@ class AimedbServlette():
             ret.head.status = ADBStatus.BAN_SYS
             return ret
         
-        user_id = await self.data.card.get_user_id_from_card(req.access_code)
-        is_banned = await self.data.card.get_card_banned(req.access_code)
-        is_locked = await self.data.card.get_card_locked(req.access_code)
+        card = await self.data.card.resolve_card(req.access_code)
+        user_id = card["user"] if card else None
+        is_banned = card["is_banned"] if card else None
+        is_locked = card["is_locked"] if card else None
         
         ret = ADBLookupResponse.from_req(req.head, user_id)
         if is_banned and is_locked:
@@ -199,10 +249,14 @@ class AimedbServlette():
         )
         
         if user_id and user_id > 0:
-            await self.data.card.update_card_last_login(req.access_code)
+            chip_id = None
             if (req.access_code.startswith("010") or req.access_code.startswith("3")) and req.serial_number != 0x04030201: # Default segatools sn
-                await self.data.card.set_chip_id_by_access_code(req.access_code, req.serial_number)
-                self.logger.info(f"Attempt to set chip id to {req.serial_number:08X} for access code {req.access_code}")
+                # Only write the chip ID when it changed, the card was resolved with the stored one
+                if card["chip_id"] != req.serial_number:
+                    chip_id = req.serial_number
+                    self.logger.info(f"Attempt to set chip id to {req.serial_number:08X} for access code {req.access_code}")
+
+            self.data.card.queue_card_login(req.access_code, chip_id)
         return ret
 
     async def handle_lookup_ex(self, data: bytes, resp_code: int) -> ADBBaseResponse:
@@ -213,10 +267,10 @@ class AimedbServlette():
             ret.head.status = ADBStatus.BAN_SYS
             return ret
         
-        user_id = await self.data.card.get_user_id_from_card(req.access_code)
-
-        is_banned = await self.data.card.get_card_banned(req.access_code)
-        is_locked = await self.data.card.get_card_locked(req.access_code)
+        card = await self.data.card.resolve_card(req.access_code)
+        user_id = card["user"] if card else None
+        is_banned = card["is_banned"] if card else None
+        is_locked = card["is_locked"] if card else None
 
         ret = ADBLookupExResponse.from_req(req.head, user_id)
         if is_banned and is_locked:
@@ -239,7 +293,7 @@ class AimedbServlette():
                 ret.auth_key = auth_key_full
 
         if user_id and user_id > 0:
-            await self.data.card.update_card_last_login(req.access_code)
+            self.data.card.queue_card_login(req.access_code)
         return ret
 
     async def handle_felica_lookup(self, data: bytes, resp_code: int) -> bytes:
@@ -259,10 +313,10 @@ class AimedbServlette():
             ret.head.status = ADBStatus.BAN_SYS
             return ret
 
-        card = await self.data.card.get_card_by_idm(idm)
+        card = await self.data.card.resolve_card_by_idm(idm)
         if not card:
             ac = self.data.card.to_access_code(idm)
-            test = await self.data.card.get_card_by_access_code(ac)
+            test = await self.data.card.resolve_card(ac)
             if test:
                 await self.data.card.set_idm_by_access_code(ac, idm)
         
@@ -328,10 +382,10 @@ class AimedbServlette():
             ret.head.status = ADBStatus.BAN_SYS
             return ret
         
-        card = await self.data.card.get_card_by_idm(idm)
+        card = await self.data.card.resolve_card_by_idm(idm)
         if not card:
             access_code = self.data.card.to_access_code(idm)
-            card = await self.data.card.get_card_by_access_code(access_code)
+            card = await self.data.card.resolve_card(access_code)
             if card:
                 user_id = card['user']
                 await self.data.card.set_idm_by_access_code(access_code, idm)
@@ -366,7 +420,7 @@ class AimedbServlette():
                 resp.auth_key = auth_key_full
         
         if user_id and user_id > 0:
-            await self.data.card.update_card_last_login(access_code)
+            self.data.card.queue_card_login(access_code)
         return resp
 
     async def handle_campaign_clear(self, data: bytes, resp_code: int) -> ADBBaseResponse:
@@ -8,7 +8,8 @@ import logging
 import coloredlogs
 import urllib.parse
 import math
-from typing import Dict, List, Any, Optional, Union, Final
+import asyncio
+from typing import Dict, List, Any, Optional, Tuple, Union, Final
 from logging.handlers import TimedRotatingFileHandler
 from starlette.requests import Request
 from starlette.responses import PlainTextResponse
@@ -24,11 +25,16 @@ from os import path, environ, mkdir, access, W_OK
 
 from .config import CoreConfig
 from .utils import Utils
-from .data import Data
+from .data import Data, async_cached, flush_event_log
+from .data.cache import LocalCache
 from .const import *
 from .title import TitleServlet
 
 BILLING_DT_FORMAT: Final[str] = "%Y%m%d%H%M%S"
+# Cabinets keep checking in with the same values, so remember this many (playlimit, nearfull, keychip) signatures
+BILLING_SIGNATURE_CACHE_SIZE: Final[int] = 4096
+# How long a keychip's machine, arcade and PowerOn fields are kept before being looked up again
+POWERON_CACHE_LIFETIME: Final[int] = 300
 
 class DLIMG_TYPE(Enum):
     app = 0
@@ -126,6 +132,55 @@ class AllnetServlet:
             )
             self.logger.initialized = True
 
+    @async_cached(lifetime=POWERON_CACHE_LIFETIME, namespace="allnet_auth")
+    async def get_poweron_info(self, serial: str, format_ver: int) -> Optional[Tuple[Dict, Optional[Dict], Dict]]:
+        """
+        Machine and arcade for a keychip, along with the PowerOn response fields that
+        only depend on them. Returns None for unregistered keychips.
+        """
+        machine = await self.data.arcade.get_machine(serial)
+        if machine is None:
+            return None
+
+        arcade = await self.data.arcade.get_arcade(machine["arcade"])
+        if arcade is None:
+            return (machine._asdict(), None, {})
+
+        country = (
+            arcade["country"] if machine["country"] is None else machine["country"]
+        )
+        if country is None:
+            country = AllnetCountryCode.JAPAN.value
+
+        fields = {
+            "country": country,
+            "place_id": f"{arcade['id']:04X}",
+            "allnet_id": machine["id"],
+            "name": arcade["name"] if arcade["name"] is not None else "",
+            "nickname": arcade["nickname"] if arcade["nickname"] is not None else "",
+            "region0": (
+                arcade["region_id"]
+                if arcade["region_id"] is not None
+                else AllnetJapanRegionId.AICHI.value
+            ),
+            "region_name0": (
+                arcade["state"]
+                if arcade["state"] is not None
+                else AllnetJapanRegionId.AICHI.name
+            ),
+            "region_name1": (
+                arcade["country"]
+                if arcade["country"] is not None
+                else AllnetCountryCode.JAPAN.value
+            ),
+            "region_name2": arcade["city"] if arcade["city"] is not None else "",
+            "client_timezone": ( # lmao
+                arcade["timezone"] if arcade["timezone"] is not None else "+0900" if format_ver == 3 else "+09:00"
+            ),
+        }
+
+        return (machine._asdict(), arcade._asdict(), fields)
+
     def startup(self) -> None:
         self.logger.info(f"Ready on port {self.config.allnet.port if self.config.allnet.standalone else self.config.server.port}")
         if not TitleServlet.title_registry:
@@ -169,7 +224,7 @@ class AllnetServlet:
 
         self.logger.debug(f"Allnet request: {vars(req)}")
 
-        machine = await self.data.arcade.get_machine(req.serial)        
+        machine, arcade, poweron_fields = await self.get_poweron_info(req.serial, req.format_ver) or (None, None, {})
         if machine is None and not self.config.server.allow_unregistered_serials:
             msg = f"Unrecognised serial {req.serial} attempted allnet auth from {request_ip}."
             await self.data.base.log_event(
@@ -182,7 +237,17 @@ class AllnetServlet:
             return PlainTextResponse(urllib.parse.unquote(urllib.parse.urlencode(resp_dict)) + "\n")
 
         if machine is not None:
-            arcade = await self.data.arcade.get_arcade(machine["arcade"])
+            if arcade is None:
+                msg = f"{req.serial} attempted allnet auth, but its arcade {machine['arcade']} does not exist."
+                await self.data.base.log_event(
+                    "allnet", "ALLNET_AUTH_NO_SHOP", logging.ERROR, msg, {}, None, None, machine['id'], request_ip, req.game_id, req.ver
+                )
+                self.logger.warning(msg)
+
+                resp.stat = ALLNET_STAT.bad_shop.value
+                resp_dict = {k: v for k, v in vars(resp).items() if v is not None}
+                return PlainTextResponse(urllib.parse.unquote(urllib.parse.urlencode(resp_dict)) + "\n")
+
             if self.config.server.check_arcade_ip:
                 if arcade["ip"] and arcade["ip"] is not None and arcade["ip"] != req.ip:
                     msg = f"{req.serial} attempted allnet auth from bad IP {req.ip} (expected {arcade['ip']})."
@@ -217,36 +282,8 @@ class AllnetServlet:
                 resp_dict = {k: v for k, v in vars(resp).items() if v is not None}
                 return PlainTextResponse(urllib.parse.unquote(urllib.parse.urlencode(resp_dict)) + "\n")
             
-            country = (
-                arcade["country"] if machine["country"] is None else machine["country"]
-            )
-            if country is None:
-                country = AllnetCountryCode.JAPAN.value
-
-            resp.country = country
-            resp.place_id = f"{arcade['id']:04X}"
-            resp.allnet_id = machine["id"]
-            resp.name = arcade["name"] if arcade["name"] is not None else ""
-            resp.nickname = arcade["nickname"] if arcade["nickname"] is not None else ""
-            resp.region0 = (
-                arcade["region_id"]
-                if arcade["region_id"] is not None
-                else AllnetJapanRegionId.AICHI.value
-            )
-            resp.region_name0 = (
-                arcade["state"]
-                if arcade["state"] is not None
-                else AllnetJapanRegionId.AICHI.name
-            )
-            resp.region_name1 = (
-                arcade["country"]
-                if arcade["country"] is not None
-                else AllnetCountryCode.JAPAN.value
-            )
-            resp.region_name2 = arcade["city"] if arcade["city"] is not None else ""
-            resp.client_timezone = ( # lmao
-                arcade["timezone"] if arcade["timezone"] is not None else "+0900" if req.format_ver == 3 else "+09:00"
-            )
+            for k, v in poweron_fields.items():
+                setattr(resp, k, v)
         
         else:
             arcade = None
@@ -807,10 +844,44 @@ class BillingServlet:
                 level=core_cfg.billing.loglevel, logger=self.logger, fmt=log_fmt_str
             )
             self.logger.initialized = True
+
+        self.signature_cache = LocalCache(BILLING_SIGNATURE_CACHE_SIZE)
+        self.signer = self.load_signer()
     
     def startup(self) -> None:
         self.logger.info(f"Ready on port {self.config.billing.port if self.config.billing.standalone else self.config.server.port}")
 
+    def load_signer(self) -> Optional[Any]:
+        try:
+            with open(self.config.billing.signing_key, "rb") as f:
+                return PKCS1_v1_5.new(RSA.import_key(f.read()))
+
+        except Exception as e:
+            self.logger.error(f"Failed to load billing signing key {self.config.billing.signing_key}: {e}")
+            return None
+
+    def sign_billing_values(self, playlimit: int, nearfull: int, kc_serial_bytes: bytes) -> Tuple[str, str]:
+        playlimit_sig = self.signer.sign(SHA.new(playlimit.to_bytes(4, "little") + kc_serial_bytes)).hex()
+        nearfull_sig = self.signer.sign(SHA.new(nearfull.to_bytes(4, "little") + kc_serial_bytes)).hex()
+        return (playlimit_sig, nearfull_sig)
+
+    async def get_billing_signatures(self, playlimit: int, nearfull: int, kc_serial_bytes: bytes) -> Tuple[str, str]:
+        """
+        Signatures for a playlimit/nearfull pair. RSA signing is slow, so it is done off the
+        event loop, and the result is remembered since cabinets ask for the same values again and again.
+        """
+        key = (playlimit, nearfull, kc_serial_bytes)
+        sigs = self.signature_cache.get(key)
+
+        if sigs is None:
+            sigs = await asyncio.get_running_loop().run_in_executor(
+                None, self.sign_billing_values, playlimit, nearfull, kc_serial_bytes
+            )
+            # Signatures never go stale, entries only leave the cache when it's full
+            self.signature_cache.set(key, sigs, 365 * 24 * 60 * 60)
+
+        return sigs
+
     def billing_req_to_dict(self, data: bytes):
         """
         Parses an billing request string into a python dictionary
@@ -844,9 +915,11 @@ class BillingServlet:
 
         self.logger.debug(f"request {req_dict}")
 
-        rsa = RSA.import_key(open(self.config.billing.signing_key, "rb").read())
-        signer = PKCS1_v1_5.new(rsa)
-        digest = SHA.new()
+        if self.signer is None:
+            self.signer = self.load_signer()
+            if self.signer is None:
+                return PlainTextResponse()
+
         traces: List[TraceData] = []
         try:
             req = BillingInfo(req_dict[0])
@@ -908,35 +981,41 @@ class BillingServlet:
                 f"{req.playcnt} billing_type {req.billingtype.name} nearfull {req.nearfull} playlimit {req.playlimit}"
             )
 
+        if traces:
+            machine_id = machine['id'] if machine is not None else None
+            stored = await self.data.arcade.put_billing_traces([x.to_row(machine_id) for x in traces])
+            if stored is None:
+                self.logger.error(f"Failed to store {len(traces)} tracelogs from {req.keychipid}")
+            else:
+                self.logger.debug(f"Stored {len(traces)} tracelogs from {req.keychipid}")
+
         if req.traceleft > 0:
             self.logger.warning(f"{req.traceleft} unsent tracelogs")
         kc_playlimit = req.playlimit
         kc_nearfull = req.nearfull
 
-        while req.playcnt > req.playlimit:
-            kc_playlimit += 1024
-            kc_nearfull += 1024
+        # Raise the limit in steps of 1024 until it covers the play count
+        if req.playcnt > req.playlimit:
+            steps = -(-(req.playcnt - req.playlimit) // 1024)
+            kc_playlimit += steps * 1024
+            kc_nearfull += steps * 1024
 
         playlimit = kc_playlimit
         nearfull = kc_nearfull + (req.billingtype.value * 0x00010000)
 
-        digest.update(playlimit.to_bytes(4, "little") + kc_serial_bytes)
-        playlimit_sig = signer.sign(digest).hex()
-
-        digest = SHA.new()
-        digest.update(nearfull.to_bytes(4, "little") + kc_serial_bytes)
-        nearfull_sig = signer.sign(digest).hex()
+        playlimit_sig, nearfull_sig = await self.get_billing_signatures(playlimit, nearfull, kc_serial_bytes)
 
         # TODO: playhistory
 
-        resp = BillingResponse(playlimit, playlimit_sig, nearfull, nearfull_sig, req.requestno, req.protocolver)
+        linelimit = self.config.billing.trace_linelimit
+        resp = BillingResponse(playlimit, playlimit_sig, nearfull, nearfull_sig, req.requestno, req.protocolver, linelimit=linelimit)
 
         resp_str = urllib.parse.unquote(urllib.parse.urlencode(vars(resp))) + "\r\n"
 
         self.logger.debug(f"response {vars(resp)}")
         if req.traceleft > 0:
-            self.logger.info(f"Requesting 20 more of {req.traceleft} unsent tracelogs")
-            return PlainTextResponse("result=6&waittime=0&linelimit=20\r\n")
+            self.logger.info(f"Requesting {min(linelimit, req.traceleft)} more of {req.traceleft} unsent tracelogs")
+            return PlainTextResponse(f"result=6&waittime=0&linelimit={linelimit}\r\n")
         
         return PlainTextResponse(resp_str)
 
@@ -1137,6 +1216,22 @@ class TraceData:
         except Exception as e:
             raise KeyError(e)
 
+    def to_row(self, machine_id: Optional[int] = None) -> Dict:
+        """
+        Row for the machine_billing_trace table, with every field that is not
+        common to all trace types collected into data
+        """
+        common = ("record_number", "seq_number", "trace_type", "date", "keychip")
+        return {
+            "machine": machine_id,
+            "keychip": self.keychip,
+            "trace_type": self.trace_type.value,
+            "record_number": self.record_number,
+            "seq_number": self.seq_number,
+            "date": self.date,
+            "data": {k: v for k, v in vars(self).items() if k not in common},
+        }
+
 class TraceDataCharge(TraceData):
     def __init__(self, data: Dict) -> None:
         super().__init__(data)
@@ -1194,6 +1289,7 @@ class BillingResponse:
         request_num: int = 1,
         protocol_ver: float = 1.000,
         playhistory: str = "000000/0:000000/0:000000/0",
+        linelimit: int = 100,
     ) -> None:
         self.result = 0
         self.requestno = request_num
@@ -1205,7 +1301,7 @@ class BillingResponse:
         self.playhistory = playhistory
         self.nearfull = nearfull
         self.nearfullsig = nearfull_sig
-        self.linelimit = 100
+        self.linelimit = linelimit
         self.protocolver = float5.to_str(protocol_ver)
         # playhistory -> YYYYMM/C:...
         # YYYY -> 4 digit year, MM -> 2 digit month, C -> Playcount during that period
@@ -1299,7 +1395,8 @@ app_billing = Starlette(
         Route("/request", billing.handle_billing_request, methods=["POST"]),
         Route("/request/", billing.handle_billing_request, methods=["POST"]),
     ],
-    on_startup=[billing.startup]
+    on_startup=[billing.startup],
+    on_shutdown=[flush_event_log]
 )
 
 allnet = AllnetServlet(cfg, cfg_dir)
@@ -1322,5 +1419,6 @@ if cfg.allnet.allow_online_updates:
 app_allnet = Starlette(
     cfg.server.is_develop, 
     route_lst,
-    on_startup=[allnet.startup]
+    on_startup=[allnet.startup],
+    on_shutdown=[flush_event_log]
 )
@@ -3,6 +3,7 @@ import logging
 import coloredlogs
 from logging.handlers import TimedRotatingFileHandler
 from starlette.routing import Route
+from starlette.middleware import Middleware
 from starlette.requests import Request
 from starlette.applications import Starlette
 from starlette.responses import PlainTextResponse
@@ -13,6 +14,8 @@ from core import CoreConfig, TitleServlet, MuchaServlet
 from core.allnet import AllnetServlet, BillingServlet
 from core.chimedb import ChimeServlet
 from core.frontend import FrontendServlet
+from core.data import flush_event_log
+from core.metrics import MetricsMiddleware, render_metrics
 
 async def dummy_rt(request: Request):
     return PlainTextResponse("Service OK")
@@ -52,7 +55,9 @@ coloredlogs.install(level=log_lv, logger=logger, fmt=log_fmt_str)
 
 logger.info(f"Artemis starting in {'develop' if cfg.server.is_develop else 'production'} mode")
 
-title = TitleServlet(cfg, cfg_dir) # This has to be loaded first to load plugins
+# In multi-worker mode, title sub-services run in the services process instead of every worker
+is_title_worker = environ.get("ARTEMIS_PROCESS_ROLE", "") == "title_worker"
+title = TitleServlet(cfg, cfg_dir, run_setup=not is_title_worker) # This has to be loaded first to load plugins
 mucha = MuchaServlet(cfg, cfg_dir)
 
 route_lst: List[Route] = [
@@ -102,4 +107,9 @@ if cfg.chimedb.enable:
 for code, game in title.title_registry.items():
     route_lst += game.get_routes()
 
-app = Starlette(cfg.server.is_develop, route_lst)
+middleware: List[Middleware] = []
+if cfg.metrics.enable:
+    route_lst.append(Route("/metrics", render_metrics))
+    middleware.append(Middleware(MetricsMiddleware, cfg=cfg))
+
+app = Starlette(cfg.server.is_develop, route_lst, middleware=middleware, on_shutdown=[flush_event_log])
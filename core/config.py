@@ -116,6 +116,21 @@ class ServerConfig:
             self.__config, "core", "server", "strict_ip_checking", default=False
         )
 
+    @property
+    def cache_dir(self) -> str:
+        return CoreConfig.get_config_field(
+            self.__config, "core", "server", "cache_dir", default="cache"
+        )
+
+    @property
+    def workers(self) -> int:
+        """
+        Number of processes serving the title server, ignored in develop mode
+        """
+        return CoreConfig.get_config_field(
+            self.__config, "core", "server", "workers", default=1
+        )
+
 class TitleConfig:
     def __init__(self, parent_config: "CoreConfig") -> None:
         self.__config = parent_config
@@ -260,6 +275,54 @@ class DatabaseConfig:
             self.__config, "core", "database", "memcached_host", default="localhost"
         )
 
+    @property
+    def local_cache_size(self) -> int:
+        return CoreConfig.get_config_field(
+            self.__config, "core", "database", "local_cache_size", default=1024
+        )
+
+    @property
+    def event_log_batch_size(self) -> int:
+        return CoreConfig.get_config_field(
+            self.__config, "core", "database", "event_log_batch_size", default=100
+        )
+
+    @property
+    def event_log_flush_interval(self) -> float:
+        return CoreConfig.get_config_field(
+            self.__config, "core", "database", "event_log_flush_interval", default=1.0
+        )
+
+    @property
+    def event_log_max_queue(self) -> int:
+        return CoreConfig.get_config_field(
+            self.__config, "core", "database", "event_log_max_queue", default=10000
+        )
+
+    @property
+    def concurrent_fetch_limit(self) -> int:
+        return CoreConfig.get_config_field(
+            self.__config, "core", "database", "concurrent_fetch_limit", default=4
+        )
+
+    @property
+    def slow_query_threshold(self) -> int:
+        return CoreConfig.get_config_field(
+            self.__config, "core", "database", "slow_query_threshold", default=200
+        )
+
+    @property
+    def slow_query_log_size(self) -> int:
+        return CoreConfig.get_config_field(
+            self.__config, "core", "database", "slow_query_log_size", default=100
+        )
+
+    @property
+    def repeated_query_threshold(self) -> int:
+        return CoreConfig.get_config_field(
+            self.__config, "core", "database", "repeated_query_threshold", default=10
+        )
+
     def create_ssl_context_if_enabled(self):
         if not self.ssl_enabled:
             return
@@ -421,6 +484,12 @@ class BillingConfig:
             self.__config, "core", "billing", "signing_key", default="cert/billing.key"
         )
 
+    @property
+    def trace_linelimit(self) -> int:
+        return CoreConfig.get_config_field(
+            self.__config, "core", "billing", "trace_linelimit", default=1000
+        )
+
 class AimedbConfig:
     def __init__(self, parent_config: "CoreConfig") -> None:
         self.__config = parent_config
@@ -469,6 +538,12 @@ class AimedbConfig:
             self.__config, "core", "aimedb", "id_lifetime_seconds", default=86400
         )
 
+    @property
+    def max_pipelined(self) -> int:
+        return CoreConfig.get_config_field(
+            self.__config, "core", "aimedb", "max_pipelined", default=8
+        )
+
 class MuchaConfig:
     def __init__(self, parent_config: "CoreConfig") -> None:
         self.__config = parent_config
@@ -505,6 +580,43 @@ class ChimedbConfig:
             self.__config, "core", "chimedb", "key", default=""
         )
 
+class MetricsConfig:
+    def __init__(self, parent_config: "CoreConfig") -> None:
+        self.__config = parent_config
+
+    @property
+    def enable(self) -> bool:
+        """
+        Time every title server request and serve the results on /metrics
+        """
+        return CoreConfig.get_config_field(
+            self.__config, "core", "metrics", "enable", default=False
+        )
+
+    @property
+    def profile_sample_rate(self) -> float:
+        """
+        Fraction of requests to run under cProfile, 0 to disable profiling
+        """
+        return float(CoreConfig.get_config_field(
+            self.__config, "core", "metrics", "profile_sample_rate", default=0.0
+        ))
+
+    @property
+    def profile_slow_threshold(self) -> int:
+        """
+        Milliseconds a profiled request must take for its profile to be saved
+        """
+        return int(CoreConfig.get_config_field(
+            self.__config, "core", "metrics", "profile_slow_threshold", default=500
+        ))
+
+    @property
+    def profile_dir(self) -> str:
+        return CoreConfig.get_config_field(
+            self.__config, "core", "metrics", "profile_dir", default="logs/profiles"
+        )
+
 class CoreConfig(dict):
     def __init__(self) -> None:
         self.server = ServerConfig(self)
@@ -516,6 +628,7 @@ class CoreConfig(dict):
         self.aimedb = AimedbConfig(self)
         self.mucha = MuchaConfig(self)
         self.chimedb = ChimedbConfig(self)
+        self.metrics = MetricsConfig(self)
 
     @classmethod
     def str_to_loglevel(cls, level_str: str):
@@ -1,4 +1,11 @@
 import zlib
+import os
+import json
+import hashlib
+import logging
+from os import path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
 
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
@@ -39,4 +46,99 @@ class CipherAES:
         decryptor = cipher.decryptor()
 
         decrypted_data = decryptor.update(ciphertext) + decryptor.finalize()
-        return self._unpad(decrypted_data)
\ No newline at end of file
+        return self._unpad(decrypted_data)
+
+# Bump whenever the way endpoint hashes are computed changes, to ignore stale cache files
+ENDPOINT_HASH_CACHE_VERSION = 1
+
+# Below this many PBKDF2 hashes, starting worker processes costs more than it saves
+ENDPOINT_HASH_POOL_THRESHOLD = 256
+
+class EndpointHashJob(NamedTuple):
+    """
+    One hashed endpoint table to build. algorithm is either "pbkdf2", where key is
+    the salt, or "md5", where key is appended to the endpoint name before hashing.
+    """
+    algorithm: str
+    names: Tuple[str, ...]
+    key: bytes
+    iter_count: int = 0
+
+    def cache_key(self) -> str:
+        h = hashlib.sha256()
+        h.update(f"{ENDPOINT_HASH_CACHE_VERSION}|{self.algorithm}|{self.iter_count}|".encode())
+        h.update(self.key)
+        h.update("\n".join(self.names).encode())
+        return h.hexdigest()
+
+def _hash_endpoint(algorithm: str, name: str, key: bytes, iter_count: int) -> str:
+    if algorithm == "pbkdf2":
+        # PBKDF2-HMAC-SHA1 with a 128 byte output, truncated to the 16 bytes the games actually use
+        return hashlib.pbkdf2_hmac("sha1", name.encode(), key, iter_count, 128).hex()[:32]
+
+    if algorithm == "md5":
+        return hashlib.md5(name.encode() + key).hexdigest()
+
+    raise ValueError(f"Unknown endpoint hash algorithm {algorithm}")
+
+def _hash_endpoint_args(args: Tuple[str, str, bytes, int]) -> str:
+    return _hash_endpoint(*args)
+
+def build_endpoint_hash_tables(jobs: Dict[Any, EndpointHashJob], cache_dir: Optional[str] = None) -> Dict[Any, Dict[str, str]]:
+    """
+    Build a hashed name -> endpoint name table for every job. Tables are loaded from
+    cache_dir when a previous run already computed them, otherwise they are computed
+    (in a process pool, if there are enough of them) and written back to cache_dir.
+    """
+    logger = logging.getLogger("core")
+    tables: Dict[Any, Dict[str, str]] = {}
+    pending: Dict[Any, EndpointHashJob] = {}
+
+    for version, job in jobs.items():
+        cache_file = path.join(cache_dir, "endpoint_hashes", f"{job.cache_key()}.json") if cache_dir else None
+        if cache_file and path.exists(cache_file):
+            try:
+                with open(cache_file, "r") as f:
+                    tables[version] = json.load(f)
+                continue
+
+            except (OSError, ValueError) as e:
+                logger.warning(f"Failed to load endpoint hash cache {cache_file}: {e}")
+
+        pending[version] = job
+
+    if not pending:
+        return tables
+
+    work = [
+        (version, (job.algorithm, name, job.key, job.iter_count))
+        for version, job in pending.items()
+        for name in job.names
+    ]
+
+    num_pbkdf2 = sum(1 for _, args in work if args[0] == "pbkdf2")
+    if num_pbkdf2 >= ENDPOINT_HASH_POOL_THRESHOLD and (os.cpu_count() or 1) > 1:
+        with ProcessPoolExecutor() as pool:
+            hashes = list(pool.map(_hash_endpoint_args, [args for _, args in work], chunksize=32))
+
+    else:
+        hashes = [_hash_endpoint_args(args) for _, args in work]
+
+    for (version, args), hashed_name in zip(work, hashes):
+        tables.setdefault(version, {})[hashed_name] = args[1]
+
+    if cache_dir:
+        try:
+            os.makedirs(path.join(cache_dir, "endpoint_hashes"), exist_ok=True)
+            for version, job in pending.items():
+                cache_file = path.join(cache_dir, "endpoint_hashes", f"{job.cache_key()}.json")
+                with open(f"{cache_file}.{os.getpid()}", "w") as f:
+                    json.dump(tables.get(version, {}), f)
+
+                # Several server processes may be starting at once, so never leave a half written file around
+                os.replace(f"{cache_file}.{os.getpid()}", cache_file)
+
+        except OSError as e:
+            logger.warning(f"Failed to write endpoint hash cache to {cache_dir}: {e}")
+
+    return tables
@@ -1,2 +1,4 @@
 from core.data.database import Data
-from core.data.cache import cached
+from core.data.schema import flush_event_log, fetch_concurrently, flush_card_logins
+from core.data.cache import cached, async_cached, invalidate, get_generation
+from core.data.stats import query_stats
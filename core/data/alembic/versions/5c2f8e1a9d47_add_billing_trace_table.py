@@ -0,0 +1,39 @@
+"""add_billing_trace_table
+
+Revision ID: 5c2f8e1a9d47
+Revises: 27e3434740df, bdf710616ba4
+Create Date: 2025-04-20 14:08:51.201735
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2f8e1a9d47'
+down_revision = ('27e3434740df', 'bdf710616ba4')
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('machine_billing_trace',
+    sa.Column('id', sa.BIGINT(), nullable=False),
+    sa.Column('machine', sa.Integer(), nullable=True),
+    sa.Column('keychip', sa.String(length=16), nullable=False),
+    sa.Column('trace_type', sa.Integer(), nullable=False),
+    sa.Column('record_number', sa.Integer(), nullable=False),
+    sa.Column('seq_number', sa.Integer(), nullable=False),
+    sa.Column('date', sa.TIMESTAMP(), nullable=False),
+    sa.Column('data', sa.JSON(), nullable=False),
+    sa.Column('when_received', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['machine'], ['machine.id'], onupdate='cascade', ondelete='set null'),
+    sa.PrimaryKeyConstraint('id'),
+    mysql_charset='utf8mb4'
+    )
+    op.create_index('machine_billing_trace_keychip_date', 'machine_billing_trace', ['keychip', 'date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('machine_billing_trace_keychip_date', table_name='machine_billing_trace')
+    op.drop_table('machine_billing_trace')
@@ -0,0 +1,50 @@
+"""add_play_count_rollups
+
+Revision ID: 8b3e6d21f4a0
+Revises: 5c2f8e1a9d47
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b3e6d21f4a0'
+down_revision = '5c2f8e1a9d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('play_count_daily',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('game', sa.String(length=4), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('day', sa.DATE(), nullable=False),
+    sa.Column('music_id', sa.Integer(), nullable=False),
+    sa.Column('plays', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('game', 'version', 'day', 'music_id', name='play_count_daily_uk'),
+    mysql_charset='utf8mb4'
+    )
+    op.create_index('play_count_daily_ranking', 'play_count_daily', ['game', 'day', 'plays'], unique=False)
+
+    op.create_table('play_count_total',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('game', sa.String(length=4), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('music_id', sa.Integer(), nullable=False),
+    sa.Column('plays', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('game', 'version', 'music_id', name='play_count_total_uk'),
+    mysql_charset='utf8mb4'
+    )
+    op.create_index('play_count_total_ranking', 'play_count_total', ['game', 'version', 'plays'], unique=False)
+
+
+def downgrade():
+    op.drop_index('play_count_total_ranking', table_name='play_count_total')
+    op.drop_table('play_count_total')
+    op.drop_index('play_count_daily_ranking', table_name='play_count_daily')
+    op.drop_table('play_count_daily')
@@ -1,8 +1,10 @@
-from typing import Any, Callable
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from collections import OrderedDict
 from functools import wraps
 import hashlib
 import pickle
 import logging
+import time
 from core.config import CoreConfig
 
 cfg: CoreConfig = None  # type: ignore
@@ -65,3 +67,155 @@ def cached(lifetime: int = 10, extra_key: Any = None) -> Callable:
         return wrapper
 
     return _cached
+
+
+# How long a process trusts its copy of a namespace generation before asking memcached again
+GENERATION_REFRESH = 5
+
+_memcache_clients: Dict[str, Any] = {}
+_generations: Dict[str, Tuple[int, float]] = {}
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache with a per-entry expiry time
+    """
+
+    def __init__(self, max_size: int = 1024) -> None:
+        self.max_size = max_size
+        self.entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        expires, value = entry
+        if expires < time.monotonic():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, lifetime: int) -> None:
+        self.entries[key] = (time.monotonic() + lifetime, value)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+local_cache = LocalCache()
+
+
+def _get_memcache(config: Optional[CoreConfig]) -> Any:
+    if not has_mc or config is None or not config.database.enable_memcached:
+        return None
+
+    hostname = config.database.memcached_host
+    if hostname not in _memcache_clients:
+        memcache = pylibmc.Client([hostname], binary=True)
+        memcache.behaviors = {"tcp_nodelay": True, "ketama": True}
+        _memcache_clients[hostname] = memcache
+
+    return _memcache_clients[hostname]
+
+
+def _get_generation(namespace: str, memcache: Any) -> int:
+    generation, checked = _generations.get(namespace, (0, 0.0))
+    if memcache is None or checked + GENERATION_REFRESH > time.monotonic():
+        return generation
+
+    try:
+        remote = memcache.get(f"cache-ns-{namespace}")
+    except pylibmc.Error as e:
+        logging.getLogger("database").error(f"Memcache failed: {e}")
+        remote = None
+
+    if remote is not None and remote != generation:
+        # Somebody else (usually read.py) invalidated this namespace
+        generation = remote
+
+    _generations[namespace] = (generation, time.monotonic())
+    return generation
+
+
+def get_generation(namespace: str, config: Optional[CoreConfig] = None) -> int:
+    """
+    Current generation of a namespace, for callers keeping their own derived data
+    that should be rebuilt whenever the namespace is invalidated.
+    """
+    return _get_generation(namespace, _get_memcache(config))
+
+
+def invalidate(namespace: str, config: Optional[CoreConfig] = None) -> None:
+    """
+    Drop every result cached by async_cached under the given namespace, in this
+    process and, if memcached is enabled, in every other process sharing it.
+    """
+    generation = _generations.get(namespace, (0, 0.0))[0] + 1
+    memcache = _get_memcache(config)
+
+    if memcache is not None:
+        try:
+            memcache.add(f"cache-ns-{namespace}", generation)
+            generation = memcache.incr(f"cache-ns-{namespace}")
+        except pylibmc.Error as e:
+            logging.getLogger("database").error(f"Memcache failed: {e}")
+
+    _generations[namespace] = (generation, time.monotonic())
+
+
+def async_cached(lifetime: int = 60, namespace: str = "default") -> Callable:
+    """
+    Cache the result of an async schema method, first in a bounded in-process
+    LRU and then in memcached if it is enabled. The wrapped method's instance
+    must carry a CoreConfig as `config`, like BaseData does. Arguments are used
+    as the key directly, so they must be hashable and have a stable repr.
+    """
+
+    def _async_cached(func: Callable) -> Callable:
+        func_key = f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        async def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            memcache = _get_memcache(getattr(self, "config", None))
+            generation = _get_generation(namespace, memcache)
+            key = (func_key, generation, args, tuple(sorted(kwargs.items())))
+
+            result = local_cache.get(key)
+            if result is not None:
+                return result
+
+            if memcache is not None:
+                mc_key = hashlib.md5(repr(key).encode()).hexdigest()
+                try:
+                    result = memcache.get(mc_key)
+                except pylibmc.Error as e:
+                    logging.getLogger("database").error(f"Memcache failed: {e}")
+                    result = None
+
+                if result is not None:
+                    local_cache.set(key, result, lifetime)
+                    return result
+
+            result = await func(self, *args, **kwargs)
+
+            if result is not None:
+                local_cache.set(key, result, lifetime)
+
+                if memcache is not None:
+                    try:
+                        memcache.set(mc_key, result, lifetime)
+                    except pylibmc.Error as e:
+                        logging.getLogger("database").error(f"Memcache failed: {e}")
+
+            return result
+
+        return wrapper
+
+    return _async_cached
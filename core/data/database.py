@@ -19,7 +19,9 @@ from sqlalchemy.ext.asyncio import (
 from sqlalchemy.orm import sessionmaker
 
 from core.config import CoreConfig
-from core.data.schema import ArcadeData, BaseData, CardData, UserData, metadata
+from core.data.cache import local_cache
+from core.data.stats import query_stats
+from core.data.schema import ArcadeData, BaseData, CardData, UserData, fetch_concurrently, metadata
 from core.utils import MISSING, Utils
 
 
@@ -67,6 +69,14 @@ class Data:
         if Data.base is MISSING:
             Data.base = BaseData(self.config, self.session)
 
+        local_cache.max_size = self.config.database.local_cache_size
+        fetch_concurrently.limit = self.config.database.concurrent_fetch_limit
+        query_stats.configure(
+            self.config.database.slow_query_threshold / 1000,
+            self.config.database.slow_query_log_size,
+            self.config.database.repeated_query_threshold,
+        )
+
         self.logger = logging.getLogger("database")
 
         # Prevent the logger from adding handlers multiple times
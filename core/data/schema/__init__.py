@@ -1,6 +1,7 @@
 from core.data.schema.user import UserData
-from core.data.schema.card import CardData
-from core.data.schema.base import BaseData, metadata
+from core.data.schema.card import CardData, flush_card_logins
+from core.data.schema.base import BaseData, TransactionFailed, metadata, flush_event_log, fetch_concurrently
 from core.data.schema.arcade import ArcadeData
+from core.data.schema.playcount import PlayCountData, parse_play_day
 
-__all__ = ["UserData", "CardData", "BaseData", "metadata", "ArcadeData"]
+__all__ = ["UserData", "CardData", "BaseData", "TransactionFailed", "metadata", "ArcadeData", "flush_event_log", "fetch_concurrently", "flush_card_logins", "PlayCountData", "parse_play_day"]
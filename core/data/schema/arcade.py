@@ -1,12 +1,12 @@
 import re
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from sqlalchemy import Column, Table, and_, or_
+from sqlalchemy import Column, Index, Table, and_, or_
 from sqlalchemy.dialects.mysql import insert
 from sqlalchemy.engine import Row
 from sqlalchemy.sql import func, select
 from sqlalchemy.sql.schema import ForeignKey, PrimaryKeyConstraint
-from sqlalchemy.types import JSON, Boolean, Integer, String
+from sqlalchemy.types import BIGINT, JSON, TIMESTAMP, Boolean, Integer, String
 
 from core.data.schema.base import BaseData, metadata
 
@@ -67,6 +67,31 @@ arcade_owner: Table = Table(
     mysql_charset="utf8mb4",
 )
 
+# Append-only store for the tracelogs cabinets upload during billing checkin.
+# Fields specific to the trace type are kept in data.
+machine_billing_trace: Table = Table(
+    "machine_billing_trace",
+    metadata,
+    Column("id", BIGINT, primary_key=True, nullable=False),
+    Column(
+        "machine",
+        Integer,
+        ForeignKey("machine.id", ondelete="set null", onupdate="cascade"),
+    ),
+    Column("keychip", String(16), nullable=False),
+    Column("trace_type", Integer, nullable=False),
+    Column("record_number", Integer, nullable=False),
+    Column("seq_number", Integer, nullable=False),
+    Column("date", TIMESTAMP, nullable=False),
+    Column("data", JSON, nullable=False),
+    Column("when_received", TIMESTAMP, nullable=False, server_default=func.now()),
+    Index("machine_billing_trace_keychip_date", "keychip", "date"),
+    mysql_charset="utf8mb4",
+)
+
+# Upper bound on rows per INSERT, to keep statements well under max_allowed_packet
+BILLING_TRACE_INSERT_CHUNK = 500
+
 
 class ArcadeData(BaseData):
     async def get_machine(self, serial: Optional[str] = None, id: Optional[int] = None) -> Optional[Row]:
@@ -339,6 +364,23 @@ class ArcadeData(BaseData):
             return False
         return True
 
+    async def put_billing_traces(self, rows: List[Dict]) -> Optional[int]:
+        """
+        Bulk insert parsed billing tracelogs. Returns the number of rows stored,
+        or None if any chunk failed to insert.
+        """
+        stored = 0
+        for i in range(0, len(rows), BILLING_TRACE_INSERT_CHUNK):
+            result = await self.insert_many(
+                machine_billing_trace, rows[i:i + BILLING_TRACE_INSERT_CHUNK], upsert=False
+            )
+            if result is None:
+                self.logger.error(f"Failed to store billing traces {i}-{min(i + BILLING_TRACE_INSERT_CHUNK, len(rows))} of {len(rows)}")
+                return None
+            stored += result
+
+        return stored
+
     async def get_num_generated_keychips(self) -> Optional[int]:
         result = await self.execute(select(func.count("serial LIKE 'A69A%'")).select_from(machine))
         if result:
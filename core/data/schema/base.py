@@ -1,10 +1,15 @@
 import asyncio
 import json
 import logging
+import sys
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from random import randrange
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 
 from sqlalchemy import Column, MetaData, Table
+from sqlalchemy.dialects.mysql import insert
 from sqlalchemy.engine import Row
 from sqlalchemy.engine.cursor import CursorResult
 from sqlalchemy.exc import SQLAlchemyError
@@ -15,6 +20,8 @@ from sqlalchemy.sql import func, text
 from sqlalchemy.types import INTEGER, JSON, TEXT, TIMESTAMP, Integer, String
 
 from core.config import CoreConfig
+from core.data.stats import query_stats
+from core.metrics import current_request_labels, record_query
 
 metadata = MetaData()
 
@@ -37,6 +44,147 @@ event_log: Table = Table(
     mysql_charset="utf8mb4",
 )
 
+class EventLogWriter:
+    """
+    Queues event_log rows in memory and writes them with one multi-row INSERT
+    whenever batch_size rows are waiting or flush_interval seconds have passed.
+    Rows logged while max_queue rows are already waiting are dropped.
+    """
+
+    def __init__(self, data: "BaseData") -> None:
+        self.data = data
+        self.logger = logging.getLogger("database")
+        self.batch_size = max(1, data.config.database.event_log_batch_size)
+        self.flush_interval = data.config.database.event_log_flush_interval
+        self.queue: asyncio.Queue = asyncio.Queue(max(1, data.config.database.event_log_max_queue))
+
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.stopping = False
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def put(self, row: Dict) -> None:
+        try:
+            self.queue.put_nowait(row)
+
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                self.logger.warning(f"Event log queue is full, {self.dropped} events dropped so far")
+            return
+
+        if self.queue.qsize() >= self.batch_size:
+            self.wakeup.set()
+
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self) -> None:
+        # This task inherits the context of whoever logged first, which may be inside a transaction
+        _transaction_session.set(None)
+
+        while not self.stopping:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self.wakeup.clear()
+            await self.flush()
+
+        await self.flush()
+
+    async def flush(self) -> None:
+        while not self.queue.empty():
+            rows = []
+            while len(rows) < self.batch_size and not self.queue.empty():
+                rows.append(self.queue.get_nowait())
+
+            if await self.data.insert_many(event_log, rows, upsert=False) is not None:
+                self.written += len(rows)
+                continue
+
+            # Usually one bad row (ex. a user or arcade that no longer exists), write them one by one so only it is lost
+            failed = 0
+            for row in rows:
+                if await self.data.execute(event_log.insert().values(**row)) is None:
+                    failed += 1
+
+            self.written += len(rows) - failed
+            if failed:
+                self.failed += failed
+                self.logger.error(f"Failed to write {failed} events to the event log, {self.failed} lost so far")
+
+    async def stop(self) -> None:
+        """
+        Write everything still queued and stop the background task. Logging another
+        event afterwards starts it again.
+        """
+        if self.task is not None and not self.task.done():
+            self.stopping = True
+            self.wakeup.set()
+            await self.task
+
+        else:
+            await self.flush()
+
+        self.task = None
+        self.stopping = False
+
+
+_event_log_writer: Optional[EventLogWriter] = None
+
+
+async def flush_event_log() -> None:
+    """
+    Write out every queued event log entry, for use on shutdown
+    """
+    if _event_log_writer is not None:
+        await _event_log_writer.stop()
+
+
+# Session shared by every BaseData.execute call made inside a transaction() block
+# on the current task. Empty outside of a transaction.
+_transaction_session: ContextVar[Optional[AsyncSession]] = ContextVar(
+    "transaction_session", default=None
+)
+
+
+class TransactionFailed(Exception):
+    """
+    A statement inside a transaction() block failed, the whole block is rolled back
+    """
+
+
+class ConcurrentFetch:
+    """
+    Awaits independent reads at the same time, each on its own pooled connection,
+    with at most limit of them in flight for one call. Results come back in the
+    order the reads were passed in.
+    """
+
+    def __init__(self, limit: int = 4) -> None:
+        self.limit = limit
+
+    async def __call__(self, *reads: Awaitable) -> List[Any]:
+        # Everything inside transaction() shares one connection, which can only run one query at a time
+        if len(reads) <= 1 or _transaction_session.get() is not None:
+            return [await read for read in reads]
+
+        semaphore = asyncio.Semaphore(max(1, self.limit))
+
+        async def run(read: Awaitable) -> Any:
+            async with semaphore:
+                return await read
+
+        return list(await asyncio.gather(*(run(read) for read in reads)))
+
+
+fetch_concurrently = ConcurrentFetch()
+
 
 class BaseData:
     def __init__(self, cfg: CoreConfig, conn: "sessionmaker[AsyncSession]") -> None:
@@ -44,40 +192,183 @@ class BaseData:
         self.conn = conn
         self.logger = logging.getLogger("database")
 
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[AsyncSession]:
+        """
+        Run every query issued on this task inside one session and one transaction,
+        committing when the block exits. Nested blocks join the outer transaction.
+        A failed statement raises TransactionFailed instead of returning None, and
+        the transaction is rolled back even if the block swallowed the exception.
+        Callbacks passed to after_commit run once the commit went through.
+        """
+        session = _transaction_session.get()
+        if session is not None:
+            yield session
+            return
+
+        async with self.conn() as session:
+            # The engine runs in AUTOCOMMIT, so ask for a real transaction for this connection
+            await session.connection(execution_options={"isolation_level": "READ COMMITTED"})
+            token = _transaction_session.set(session)
+
+            try:
+                yield session
+                if session.info.get("failed"):
+                    raise TransactionFailed("a statement failed inside the transaction")
+
+                await session.commit()
+
+            except Exception:
+                await session.rollback()
+                raise
+
+            finally:
+                _transaction_session.reset(token)
+
+        for callback in session.info.get("after_commit", []):
+            try:
+                await callback()
+
+            except Exception as e:
+                self.logger.error(f"Failed to run {getattr(callback, '__qualname__', callback)} after commit - {e}")
+
+    async def after_commit(self, callback: Callable[[], Awaitable[Any]]) -> None:
+        """
+        Run callback once the current transaction has committed, or right away outside
+        of one. For best-effort writes that shouldn't hold locks in, or fail, the transaction.
+        """
+        session = _transaction_session.get()
+        if session is None:
+            await callback()
+            return
+
+        session.info.setdefault("after_commit", []).append(callback)
+
     async def execute(self, sql: str, opts: Dict[str, Any] = {}) -> Optional[CursorResult]:
-        res = None
+        session = _transaction_session.get()
+        if session is not None:
+            return await self._execute(session, sql, opts)
 
         async with self.conn() as session:
+            return await self._execute(session, sql, opts)
+
+    async def _execute(self, session: AsyncSession, sql: str, opts: Dict[str, Any]) -> Optional[CursorResult]:
+        res = None
+        error = None
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"SQL Execute: {''.join(str(sql).splitlines())}")
+
+        start = time.perf_counter()
+        try:
+            res = await session.execute(text(sql), opts)
+
+        except SQLAlchemyError as e:
+            self.logger.error(f"SQLAlchemy error {e}")
+            error = e
+
+        except UnicodeEncodeError as e:
+            self.logger.error(f"UnicodeEncodeError error {e}")
+            error = e
+
+        except Exception:
             try:
-                self.logger.debug(f"SQL Execute: {''.join(str(sql).splitlines())}")
-                res = await session.execute(text(sql), opts)
+                res = await session.execute(sql, opts)
 
             except SQLAlchemyError as e:
                 self.logger.error(f"SQLAlchemy error {e}")
-                return None
+                error = e
 
             except UnicodeEncodeError as e:
                 self.logger.error(f"UnicodeEncodeError error {e}")
-                return None
+                error = e
 
             except Exception:
-                try:
-                    res = await session.execute(sql, opts)
+                self.logger.error(f"Unknown error")
+                raise
 
-                except SQLAlchemyError as e:
-                    self.logger.error(f"SQLAlchemy error {e}")
-                    return None
+        finally:
+            self._record_query(time.perf_counter() - start, res, error)
 
-                except UnicodeEncodeError as e:
-                    self.logger.error(f"UnicodeEncodeError error {e}")
-                    return None
+        if error is not None:
+            if session is _transaction_session.get():
+                # Committing the statements that did succeed would leave a partial write behind
+                session.info["failed"] = True
+                raise TransactionFailed(str(error)) from error
 
-                except Exception:
-                    self.logger.error(f"Unknown error")
-                    raise
+            return None
 
         return res
 
+    def _record_query(self, seconds: float, res: Optional[CursorResult], error: Optional[Exception]) -> None:
+        # The statement as sent to the server, compiled (and cached) by SQLAlchemy already
+        context = getattr(res, "context", None)
+        if context is not None:
+            statement = context.statement
+            params = context.parameters[0] if len(context.parameters) == 1 else context.parameters
+        else:
+            statement, params = getattr(error, "statement", None), getattr(error, "params", None)
+
+        # Walk up past execute, insert_many and friends to the schema method that ran the query
+        frame = sys._getframe(1)
+        while frame.f_back is not None and frame.f_code in _STATEMENT_FRAMES:
+            frame = frame.f_back
+
+        caller = frame.f_code.co_name
+        info = query_stats.record(statement, params, f"{type(self).__name__}.{caller}", seconds, error is not None)
+
+        repeats = record_query(seconds, info.fingerprint if info is not None else None)
+        if info is not None and repeats == query_stats.repeat_threshold:
+            endpoint = "/".join(x for x in current_request_labels() if x)
+            query_stats.record_repeat(endpoint, info)
+            self.logger.warning(f"{endpoint} ran the same statement {repeats} times: {info.fingerprint}")
+
+    async def explain(self, statement: str, params: Any) -> Optional[List[Row]]:
+        """
+        EXPLAIN a statement captured by the slow query log, with the parameters it ran with
+        """
+        try:
+            async with self.conn() as session:
+                conn = await session.connection()
+                result = await conn.exec_driver_sql(f"EXPLAIN {statement}", params)
+                return result.fetchall()
+
+        except SQLAlchemyError as e:
+            self.logger.error(f"Failed to EXPLAIN {statement} - {e}")
+            return None
+
+    async def insert_many(
+        self, table: Table, rows: List[Dict], upsert: bool = True
+    ) -> Optional[int]:
+        """
+        Insert many rows with one multi-row INSERT per distinct set of columns,
+        optionally turning it into an INSERT ... ON DUPLICATE KEY UPDATE.
+        Returns the number of affected rows, or None if any statement failed.
+        """
+        groups: Dict[frozenset, List[Dict]] = {}
+        for row in rows:
+            groups.setdefault(frozenset(row.keys()), []).append(row)
+
+        affected = 0
+        for columns, group in groups.items():
+            sql = insert(table).values(group)
+
+            if upsert:
+                sql = sql.on_duplicate_key_update(
+                    **{c: sql.inserted[c] for c in columns if c in table.c}
+                )
+
+            result = await self.execute(sql)
+            if result is None:
+                self.logger.error(
+                    f"insert_many: Failed to insert {len(group)} rows into {table.name}"
+                )
+                return None
+
+            affected += result.rowcount
+
+        return affected
+
     def generate_id(self) -> int:
         """
         Generate a random 5-7 digit id
@@ -87,8 +378,15 @@ class BaseData:
     async def log_event(
         self, system: str, type: str, severity: int, message: str, details: Dict = {}, user: int = None, 
         arcade: int = None, machine: int = None, ip: Optional[str] = None, game: Optional[str] = None, version: Optional[str] = None
-    ) -> Optional[int]:
-        sql = event_log.insert().values(
+    ) -> None:
+        """
+        Queue an event to be written to the event log in the background
+        """
+        global _event_log_writer
+        if _event_log_writer is None:
+            _event_log_writer = EventLogWriter(self)
+
+        _event_log_writer.put(dict(
             system=system,
             type=type,
             severity=severity,
@@ -100,16 +398,7 @@ class BaseData:
             version=version,
             message=message,
             details=json.dumps(details),
-        )
-        result = await self.execute(sql)
-
-        if result is None:
-            self.logger.error(
-                f"{__name__}: Failed to insert event into event log! system = {system}, type = {type}, severity = {severity}, message = {message}"
-            )
-            return None
-
-        return result.lastrowid
+        ))
 
     async def get_event_log(self, entries: int = 100) -> Optional[List[Row]]:
         sql = event_log.select().order_by(event_log.c.id.desc()).limit(entries)
@@ -129,3 +418,9 @@ class BaseData:
                 data[k] = False
 
         return data
+
+
+# Code of the BaseData methods that run statements on behalf of a schema method
+_STATEMENT_FRAMES = frozenset(
+    method.__code__ for method in (BaseData._record_query, BaseData._execute, BaseData.execute, BaseData.insert_many)
+)
@@ -1,12 +1,23 @@
-from typing import Dict, List, Optional
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
 
 from sqlalchemy import Column, Table, UniqueConstraint
 from sqlalchemy.engine import Row
-from sqlalchemy.sql import func
+from sqlalchemy.sql import case, func, select
 from sqlalchemy.sql.schema import ForeignKey
 from sqlalchemy.types import BIGINT, TIMESTAMP, VARCHAR, Boolean, Integer, String
 
-from core.data.schema.base import BaseData, metadata
+from core.data.cache import async_cached, invalidate
+from core.data.schema.base import BaseData, _transaction_session, metadata
+
+# Seconds a resolved card is trusted for. Changes made through CardData are seen
+# right away by the process that made them, and by every other process only if
+# memcached is enabled. This bounds how long every other edit takes to show up.
+CARD_CACHE_LIFETIME = 300
+# Seconds between writes of queued last login times and chip IDs
+CARD_LOGIN_FLUSH_INTERVAL = 5.0
+CARD_LOGIN_BATCH_SIZE = 500
 
 aime_card: Table = Table(
     "aime_card",
@@ -26,6 +37,96 @@ aime_card: Table = Table(
 )
 
 
+class CardLoginWriter:
+    """
+    Coalesces last_login_date and chip_id updates from card scans, writing them
+    every CARD_LOGIN_FLUSH_INTERVAL seconds. A card scanned several times between
+    two flushes is only written once.
+    """
+
+    def __init__(self, data: "CardData") -> None:
+        self.data = data
+        self.logger = logging.getLogger("database")
+
+        # access_code -> chip ID to store, or None to only touch last_login_date
+        self.pending: Dict[str, Optional[int]] = {}
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.stopping = False
+
+    def put(self, access_code: str, chip_id: Optional[int] = None) -> None:
+        if chip_id is not None or access_code not in self.pending:
+            self.pending[access_code] = chip_id
+
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self) -> None:
+        # This task inherits the context of whoever queued first, which may be inside a transaction
+        _transaction_session.set(None)
+
+        while self.pending and not self.stopping:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), CARD_LOGIN_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+            await self.flush()
+
+    async def flush(self) -> None:
+        pending, self.pending = self.pending, {}
+        access_codes = list(pending)
+
+        for i in range(0, len(access_codes), CARD_LOGIN_BATCH_SIZE):
+            chunk = access_codes[i:i + CARD_LOGIN_BATCH_SIZE]
+            chip_ids = {ac: pending[ac] for ac in chunk if pending[ac] is not None}
+
+            values: Dict[str, Any] = {"last_login_date": func.now()}
+            if chip_ids:
+                values["chip_id"] = case(chip_ids, value=aime_card.c.access_code, else_=aime_card.c.chip_id)
+
+            result = await self.data.execute(aime_card.update(aime_card.c.access_code.in_(chunk)).values(**values))
+            if result is not None:
+                continue
+
+            if not chip_ids:
+                self.logger.warning(f"Failed to update last login time for {len(chunk)} cards")
+                continue
+
+            # Usually a chip ID already used by another card, write them one by one so only that card fails
+            for ac in chunk:
+                if pending[ac] is None:
+                    await self.data.update_card_last_login(ac)
+                else:
+                    await self.data.set_chip_id_by_access_code(ac, pending[ac], last_login=True)
+
+        if any(chip_id is not None for chip_id in pending.values()):
+            invalidate("card", self.data.config)
+
+    async def stop(self) -> None:
+        if self.task is not None and not self.task.done():
+            self.stopping = True
+            self.wakeup.set()
+            await self.task
+
+        await self.flush()
+
+        self.task = None
+        self.stopping = False
+        self.wakeup.clear()
+
+
+_card_login_writer: Optional[CardLoginWriter] = None
+
+
+async def flush_card_logins() -> None:
+    """
+    Write out every queued last login time and chip ID, for use on shutdown
+    """
+    if _card_login_writer is not None:
+        await _card_login_writer.stop()
+
+
 class CardData(BaseData):
     moble_os_codes = set([0x06, 0x07, 0x10, 0x12, 0x13, 0x14, 0x15, 0x17, 0x18])
     card_os_codes  = set([0x20, 0xF0, 0xF1, 0xF2, 0xF3, 0xF4, 0xF5, 0xF6, 0xF7])
@@ -38,6 +139,44 @@ class CardData(BaseData):
             return None
         return result.fetchone()
 
+    async def _resolve_card(self, *where: Any) -> Optional[Dict[str, Any]]:
+        sql = select(
+            aime_card.c.id, aime_card.c.user, aime_card.c.access_code, aime_card.c.idm,
+            aime_card.c.chip_id, aime_card.c.is_banned, aime_card.c.is_locked,
+        ).where(*where)
+
+        result = await self.execute(sql)
+        if result is None:
+            return None
+
+        row = result.fetchone()
+        if row is None:
+            return None
+
+        return dict(row._mapping)
+
+    @async_cached(lifetime=CARD_CACHE_LIFETIME, namespace="card")
+    async def resolve_card(self, access_code: str) -> Optional[Dict[str, Any]]:
+        """
+        Everything AimeDB needs to know about a card (id, user, access_code, idm,
+        chip_id, is_banned, is_locked) in one cached lookup
+        """
+        return await self._resolve_card(aime_card.c.access_code == access_code)
+
+    @async_cached(lifetime=CARD_CACHE_LIFETIME, namespace="card")
+    async def resolve_card_by_idm(self, idm: str) -> Optional[Dict[str, Any]]:
+        return await self._resolve_card(aime_card.c.idm == idm)
+
+    def queue_card_login(self, access_code: str, chip_id: Optional[int] = None) -> None:
+        """
+        Update a card's last login time, and optionally its chip ID, in the background
+        """
+        global _card_login_writer
+        if _card_login_writer is None:
+            _card_login_writer = CardLoginWriter(self)
+
+        _card_login_writer.put(access_code, chip_id)
+
     async def get_card_by_id(self, card_id: int) -> Optional[Row]:
         sql = aime_card.select(aime_card.c.id == card_id)
 
@@ -56,6 +195,7 @@ class CardData(BaseData):
             self.logger.error(
                 f"Failed to change card access code from {old_ac} to {new_ac}"
             )
+        invalidate("card", self.config)
 
     async def get_user_id_from_card(self, access_code: str) -> Optional[int]:
         """
@@ -95,6 +235,7 @@ class CardData(BaseData):
         result = await self.execute(sql)
         if result is None:
             self.logger.error(f"Failed to delete card with id {card_id}")
+        invalidate("card", self.config)
 
     async def get_user_cards(self, aime_id: int) -> Optional[List[Row]]:
         """
@@ -135,20 +276,27 @@ class CardData(BaseData):
         if result:
             return result.fetchone()
 
-    async def set_chip_id_by_access_code(self, access_code: str, chip_id: int) -> Optional[Row]:
-        result = await self.execute(aime_card.update(aime_card.c.access_code == access_code).values(chip_id=chip_id))
+    async def set_chip_id_by_access_code(self, access_code: str, chip_id: int, last_login: bool = False) -> Optional[Row]:
+        values: Dict[str, Any] = {"chip_id": chip_id}
+        if last_login:
+            values["last_login_date"] = func.now()
+
+        result = await self.execute(aime_card.update(aime_card.c.access_code == access_code).values(**values))
         if not result:
             self.logger.error(f"Failed to update chip ID to {chip_id} for {access_code}")
+        invalidate("card", self.config)
 
     async def set_idm_by_access_code(self, access_code: str, idm: str) -> Optional[Row]:
         result = await self.execute(aime_card.update(aime_card.c.access_code == access_code).values(idm=idm))
         if not result:
             self.logger.error(f"Failed to update IDm to {idm} for {access_code}")
+        invalidate("card", self.config)
 
     async def set_access_code_by_access_code(self, old_ac: str, new_ac: str) -> None:
         result = await self.execute(aime_card.update(aime_card.c.access_code == old_ac).values(access_code=new_ac))
         if not result:
             self.logger.error(f"Failed to change card access code from {old_ac} to {new_ac}")
+        invalidate("card", self.config)
 
     async def set_memo_by_access_code(self, access_code: str, memo: str) -> None:
         result = await self.execute(aime_card.update(aime_card.c.access_code == access_code).values(memo=memo))
@@ -0,0 +1,170 @@
+from datetime import date, datetime
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Column, Index, Table, UniqueConstraint, and_
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.engine import Row
+from sqlalchemy.sql import func, select
+from sqlalchemy.types import DATE, Integer, String
+
+from core.data.schema.base import BaseData, TransactionFailed, metadata
+
+# Rows written per INSERT when a rollup is rebuilt
+PLAY_COUNT_BATCH_SIZE = 1000
+
+play_count_daily: Table = Table(
+    "play_count_daily",
+    metadata,
+    Column("id", Integer, primary_key=True, nullable=False),
+    Column("game", String(4), nullable=False),
+    Column("version", Integer, nullable=False),
+    Column("day", DATE, nullable=False),
+    Column("music_id", Integer, nullable=False),
+    Column("plays", Integer, nullable=False, server_default="0"),
+    UniqueConstraint("game", "version", "day", "music_id", name="play_count_daily_uk"),
+    Index("play_count_daily_ranking", "game", "day", "plays"),
+    mysql_charset="utf8mb4",
+)
+
+play_count_total: Table = Table(
+    "play_count_total",
+    metadata,
+    Column("id", Integer, primary_key=True, nullable=False),
+    Column("game", String(4), nullable=False),
+    Column("version", Integer, nullable=False),
+    Column("music_id", Integer, nullable=False),
+    Column("plays", Integer, nullable=False, server_default="0"),
+    UniqueConstraint("game", "version", "music_id", name="play_count_total_uk"),
+    Index("play_count_total_ranking", "game", "version", "plays"),
+    mysql_charset="utf8mb4",
+)
+
+
+def parse_play_day(play_date: Optional[object]) -> Optional[date]:
+    """
+    The day part of a playlog playDate, which games send as "YYYY-MM-DD ..." strings
+    """
+    if isinstance(play_date, datetime):
+        return play_date.date()
+
+    try:
+        return datetime.strptime(str(play_date)[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+class PlayCountData(BaseData):
+    """
+    Play counts per game, version, day and music, kept alongside the playlog
+    tables so that ranking requests don't have to count the playlogs.
+    """
+
+    async def add_plays(self, game: str, version: int, plays: Iterable[Tuple[Optional[date], int]]) -> None:
+        """
+        Count one play for every (day, music_id) pair. Plays without a day only
+        count towards the version totals. Inside a transaction the counts are only
+        written once it committed, so the hot rows of popular songs aren't locked
+        for the whole save. Failures are only logged, backfill-playcounts rebuilds
+        the counts from the playlogs.
+        """
+        daily: Dict[Tuple[date, int], int] = {}
+        totals: Dict[int, int] = {}
+        for day, music_id in plays:
+            totals[music_id] = totals.get(music_id, 0) + 1
+            if day is not None:
+                daily[(day, music_id)] = daily.get((day, music_id), 0) + 1
+
+        if totals:
+            await self.after_commit(partial(self._write_plays, game, version, daily, totals))
+
+    async def _write_plays(
+        self, game: str, version: int, daily: Dict[Tuple[date, int], int], totals: Dict[int, int]
+    ) -> bool:
+        # Concurrent saves upsert the same rows, lock them in a fixed order so they can't deadlock
+        if daily:
+            sql = insert(play_count_daily).values([
+                {"game": game, "version": version, "day": day, "music_id": music_id, "plays": count}
+                for (day, music_id), count in sorted(daily.items())
+            ])
+            sql = sql.on_duplicate_key_update(plays=play_count_daily.c.plays + sql.inserted.plays)
+
+            if await self.execute(sql) is None:
+                self.logger.error(f"add_plays: Failed to count {len(daily)} daily plays for {game} v{version}")
+                return False
+
+        sql = insert(play_count_total).values([
+            {"game": game, "version": version, "music_id": music_id, "plays": count}
+            for music_id, count in sorted(totals.items())
+        ])
+        sql = sql.on_duplicate_key_update(plays=play_count_total.c.plays + sql.inserted.plays)
+
+        if await self.execute(sql) is None:
+            self.logger.error(f"add_plays: Failed to count {len(totals)} plays for {game} v{version}")
+            return False
+
+        return True
+
+    async def get_top_daily(self, game: str, day: date, limit: int = 10) -> Optional[List[Row]]:
+        """
+        The most played music of a day across every version, as (music_id, plays) rows
+        """
+        plays = func.sum(play_count_daily.c.plays).label("plays")
+        sql = (
+            select([play_count_daily.c.music_id, plays])
+            .where(and_(play_count_daily.c.game == game, play_count_daily.c.day == day))
+            .group_by(play_count_daily.c.music_id)
+            .order_by(plays.desc())
+            .limit(limit)
+        )
+
+        result = await self.execute(sql)
+        if result is None:
+            return None
+        return result.fetchall()
+
+    async def get_top_total(self, game: str, version: int, limit: int = 10) -> Optional[List[Row]]:
+        """
+        The most played music of a version, as (music_id, plays) rows
+        """
+        sql = (
+            select([play_count_total.c.music_id, play_count_total.c.plays])
+            .where(and_(play_count_total.c.game == game, play_count_total.c.version == version))
+            .order_by(play_count_total.c.plays.desc())
+            .limit(limit)
+        )
+
+        result = await self.execute(sql)
+        if result is None:
+            return None
+        return result.fetchall()
+
+    async def replace_plays(
+        self, game: str, daily: Dict[Tuple[int, date, int], int], totals: Dict[Tuple[int, int], int]
+    ) -> bool:
+        """
+        Replace every play count of a game, keyed by (version, day, music_id) and
+        (version, music_id). Used to rebuild the rollups from the playlogs.
+        """
+        daily_rows = [
+            {"game": game, "version": version, "day": day, "music_id": music_id, "plays": count}
+            for (version, day, music_id), count in daily.items()
+        ]
+        total_rows = [
+            {"game": game, "version": version, "music_id": music_id, "plays": count}
+            for (version, music_id), count in totals.items()
+        ]
+
+        try:
+            async with self.transaction():
+                for table, rows in ((play_count_daily, daily_rows), (play_count_total, total_rows)):
+                    await self.execute(table.delete().where(table.c.game == game))
+
+                    for i in range(0, len(rows), PLAY_COUNT_BATCH_SIZE):
+                        await self.insert_many(table, rows[i:i + PLAY_COUNT_BATCH_SIZE], upsert=False)
+
+        except TransactionFailed as e:
+            self.logger.error(f"replace_plays: Rebuilding play counts of {game} {e}")
+            return False
+
+        return True
@@ -7,6 +7,7 @@ from sqlalchemy.engine import Row
 from sqlalchemy.sql import func, select
 from sqlalchemy.types import TIMESTAMP, Integer, String
 
+from core.data.cache import invalidate
 from core.data.schema.base import BaseData, metadata
 
 aime_user: Table = Table(
@@ -84,6 +85,9 @@ class UserData(BaseData):
         if result is None:
             self.logger.error(f"Failed to delete user with id {user_id}")
 
+        # The user's cards went with them
+        invalidate("card", self.config)
+
     async def get_unregistered_users(self) -> List[Row]:
         """
         Returns a list of users who have not registered with the webui. They may or may not have cards.
@@ -0,0 +1,152 @@
+import re
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Statements remembered by QueryStats.statement_info, the cache is emptied when it grows past this
+FINGERPRINT_CACHE_SIZE = 4096
+
+_whitespace = re.compile(r"\s+")
+# IN (%s, %s, ...) and multi-row VALUES lists, whose length depends on the call
+_placeholder_list = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)")
+_values_list = re.compile(r"(VALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_tables = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE)\s+`?(\w+)`?", re.IGNORECASE)
+
+
+class StatementInfo:
+    def __init__(self, statement: str) -> None:
+        fingerprint = _whitespace.sub(" ", statement).strip()
+        fingerprint = _placeholder_list.sub("(...)", fingerprint)
+        fingerprint = _values_list.sub(r"\1, ...", fingerprint)
+
+        self.fingerprint = fingerprint
+        self.verb = fingerprint.split(" ", 1)[0].upper()
+        self.tables = sorted(set(_tables.findall(fingerprint)))
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def add(self, seconds: float, failed: bool) -> None:
+        self.calls += 1
+        self.total_time += seconds
+        self.max_time = max(self.max_time, seconds)
+        if failed:
+            self.errors += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": round(self.total_time * 1000, 1),
+            "avg_ms": round(self.total_time * 1000 / self.calls, 2) if self.calls else 0,
+            "max_ms": round(self.max_time * 1000, 1),
+        }
+
+
+class QueryStats:
+    """
+    Timing of every statement run through BaseData.execute, counted by statement
+    fingerprint, table and calling method. Statements slower than slow_threshold
+    are kept in a ring buffer along with their parameters, so they can be
+    EXPLAINed later. Statements repeated repeat_threshold times within one title
+    request are recorded as likely N+1 query patterns.
+    """
+
+    def __init__(self, slow_threshold: float = 0.2, slow_log_size: int = 100, repeat_threshold: int = 10) -> None:
+        self.slow_threshold = slow_threshold
+        self.repeat_threshold = repeat_threshold
+
+        self.statements: Dict[str, StatementInfo] = {}
+        self.by_fingerprint: Dict[str, Counter] = {}
+        self.by_table: Dict[str, Counter] = {}
+        self.by_method: Dict[str, Counter] = {}
+        self.slow_queries: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+        # Id of the next slow query, which keeps pointing at the same entry while the ring buffer moves on
+        self.next_slow_id = 1
+        # (endpoint, fingerprint) -> number of requests that repeated the statement
+        self.repeated: Dict[Tuple[str, str], int] = {}
+
+    def configure(self, slow_threshold: float, slow_log_size: int, repeat_threshold: int) -> None:
+        self.slow_threshold = slow_threshold
+        self.repeat_threshold = repeat_threshold
+        if self.slow_queries.maxlen != slow_log_size:
+            self.slow_queries = deque(self.slow_queries, maxlen=max(1, slow_log_size))
+
+    def statement_info(self, statement: str) -> StatementInfo:
+        info = self.statements.get(statement)
+        if info is None:
+            if len(self.statements) >= FINGERPRINT_CACHE_SIZE:
+                self.statements.clear()
+
+            info = StatementInfo(statement)
+            self.statements[statement] = info
+
+        return info
+
+    def record(
+        self, statement: Optional[str], params: Any, method: str, seconds: float, failed: bool
+    ) -> Optional[StatementInfo]:
+        if statement is None:
+            self.by_method.setdefault(method, Counter()).add(seconds, failed)
+            return None
+
+        info = self.statement_info(statement)
+        self.by_fingerprint.setdefault(info.fingerprint, Counter()).add(seconds, failed)
+        self.by_method.setdefault(method, Counter()).add(seconds, failed)
+        for table in info.tables:
+            self.by_table.setdefault(table, Counter()).add(seconds, failed)
+
+        if seconds >= self.slow_threshold:
+            self.slow_queries.append({
+                "id": self.next_slow_id,
+                "when": time.time(),
+                "ms": round(seconds * 1000, 1),
+                "method": method,
+                "fingerprint": info.fingerprint,
+                "statement": statement,
+                "params": params,
+            })
+            self.next_slow_id += 1
+
+        return info
+
+    def record_repeat(self, endpoint: str, info: StatementInfo) -> None:
+        key = (endpoint, info.fingerprint)
+        self.repeated[key] = self.repeated.get(key, 0) + 1
+
+    def get_slow_query(self, query_id: int) -> Optional[Dict[str, Any]]:
+        """
+        A slow query by its id, or None if it has left the ring buffer already
+        """
+        for query in self.slow_queries:
+            if query["id"] == query_id:
+                return query
+
+        return None
+
+    def get_summary(self, limit: int = 25) -> Dict[str, List[Dict[str, Any]]]:
+        def top(counters: Dict[str, Counter], key: str) -> List[Dict[str, Any]]:
+            ranked = sorted(counters.items(), key=lambda x: x[1].total_time, reverse=True)[:limit]
+            return [{key: name, **counter.to_dict()} for name, counter in ranked]
+
+        return {
+            "statements": top(self.by_fingerprint, "fingerprint"),
+            "tables": top(self.by_table, "table"),
+            "methods": top(self.by_method, "method"),
+            "slow": [
+                {**q, "when": time.strftime("%x %X", time.localtime(q["when"])), "params": repr(q["params"])}
+                for q in reversed(self.slow_queries)
+            ],
+            "repeated": [
+                {"endpoint": endpoint, "fingerprint": fingerprint, "requests": count}
+                for (endpoint, fingerprint), count in sorted(self.repeated.items(), key=lambda x: x[1], reverse=True)[:limit]
+            ],
+        }
+
+
+query_stats = QueryStats()
@@ -18,7 +18,7 @@ from datetime import datetime, timezone
 from os import path, environ, mkdir, W_OK, access
 
 from core import CoreConfig, Utils
-from core.data import Data
+from core.data import Data, invalidate, flush_event_log, query_stats
 from core.const import AllnetCountryCode
 
 # A-HJ-NP-Z
@@ -86,7 +86,7 @@ class FrontendServlet():
 
             self.logger.inited = True
         
-        games = Utils.get_all_titles()
+        games = Utils.get_enabled_titles(config_dir)
         for game_dir, game_mod in games.items():
             if hasattr(game_mod, "frontend") and hasattr(game_mod, "index") and hasattr(game_mod, "game_codes"):
                 try:
@@ -138,6 +138,7 @@ class FrontendServlet():
             Mount("/sys", routes=[
                 Route("/", self.system.render_GET, methods=['GET']),
                 Route("/logs", self.system.render_logs, methods=['GET']),
+                Route("/queries", self.system.render_queries, methods=['GET']),
                 Route("/lookup.user", self.system.lookup_user, methods=['GET']),
                 Route("/lookup.shop", self.system.lookup_shop, methods=['GET']),
                 Route("/add.user", self.system.add_user, methods=['POST']),
@@ -957,6 +958,31 @@ class FE_System(FE_Base):
             events=events
         ), media_type="text/html; charset=utf-8")
         
+    async def render_queries(self, request: Request):
+        template = self.environment.get_template("core/templates/sys/queries.jinja")
+
+        usr_sesh = self.validate_session(request)
+        if not usr_sesh or not self.test_perm(usr_sesh.permissions, PermissionOffset.SYSADMIN):
+            return RedirectResponse("/sys/?e=11", 303)
+
+        explain = None
+        explain_id = request.query_params.get("explain", None)
+        if explain_id is not None and explain_id.isdigit():
+            slow = query_stats.get_slow_query(int(explain_id))
+            if slow is not None:
+                rows = await self.data.base.explain(slow["statement"], slow["params"])
+                explain = {
+                    "fingerprint": slow["fingerprint"],
+                    "rows": [row._asdict() for row in rows] if rows else [],
+                }
+
+        return Response(template.render(
+            title=f"{self.core_config.server.name} | Query Stats", 
+            sesh=vars(usr_sesh), 
+            stats=query_stats.get_summary(),
+            explain=explain,
+        ), media_type="text/html; charset=utf-8")
+
 class FE_Arcade(FE_Base):
     async def render_GET(self, request: Request):
         template = self.environment.get_template("core/templates/arcade/index.jinja")
@@ -1069,6 +1095,7 @@ class FE_Arcade(FE_Base):
         did_region = await self.data.arcade.set_arcade_region_info(sinfo['id'], new_country, new_region1 if new_region1 else None, new_region2 if new_region2 else None, None, None)
         did_timezone = await self.data.arcade.set_arcade_timezone(sinfo['id'], new_tz if new_tz else None)
         did_vpn = await self.data.arcade.set_arcade_vpn_ip(sinfo['id'], new_ip if new_ip else None)
+        invalidate("allnet_auth", self.core_config)
 
         if not did_name or not did_region or not did_timezone or not did_vpn:
             self.logger.error(f"Failed to update some shop into: Name: {did_name} Region: {did_region} TZ: {did_timezone} VPN: {did_vpn}")
@@ -1160,6 +1187,7 @@ class FE_Machine(FE_Base):
         did_real_cab = await self.data.arcade.set_machine_real_cabinet(cab['id'], new_is_cab)
         did_ota = await self.data.arcade.set_machine_can_ota(cab['id'], new_is_ota)
         did_memo = await self.data.arcade.set_machine_memo(cab['id'], new_memo if new_memo else None)
+        invalidate("allnet_auth", self.core_config)
 
         if not did_game or not did_country or not did_timezone or not did_real_cab or not did_ota or not did_memo:
             self.logger.error(f"Failed to update some shop into: Game: {did_game} Country: {did_country} TZ: {did_timezone} Real: {did_real_cab} OTA: {did_ota} Memo: {did_memo}")
@@ -1192,6 +1220,7 @@ class FE_Machine(FE_Base):
         if not await self.data.arcade.set_machine_arcade(cab['id'], new_sinfo['id']):
             return RedirectResponse(f"/cab/{cab_id}?e=99", 303)
         
+        invalidate("allnet_auth", self.core_config)
         return RedirectResponse(f"/cab/{cab_id}?s=2", 303)
 
 cfg_dir = environ.get("ARTEMIS_CFG_DIR", "config")
@@ -1209,4 +1238,4 @@ if not access(cfg.server.log_dir, W_OK):
     exit(1)
 
 fe = FrontendServlet(cfg, cfg_dir)
-app = Starlette(cfg.server.is_develop, fe.get_routes(), on_startup=[fe.startup])
+app = Starlette(cfg.server.is_develop, fe.get_routes(), on_startup=[fe.startup], on_shutdown=[flush_event_log])
@@ -0,0 +1,316 @@
+import cProfile
+import logging
+import os
+import random
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from core.config import CoreConfig
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the queries per request histogram buckets
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Phases of a title request, it stays in PHASE_RECEIVE until its dispatcher marks another one
+PHASE_RECEIVE = "receive"
+PHASE_DECODE = "decode"
+PHASE_HANDLER = "handler"
+PHASE_ENCODE = "encode"
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def render(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class RequestTimer:
+    """
+    Timings of one request. Dispatchers call mark() when the request moves to the
+    next phase, which closes the previous one.
+    """
+
+    def __init__(self) -> None:
+        self.game = ""
+        self.version = ""
+        self.endpoint = ""
+
+        self.start = time.perf_counter()
+        self.phase = PHASE_RECEIVE
+        self.phase_start = self.start
+        self.phases: Dict[str, float] = {}
+
+        self.db_time = 0.0
+        self.db_queries = 0
+        # Statement fingerprint -> times run by this request
+        self.statements: Dict[str, int] = {}
+
+    def set_labels(self, game: str, version: str, endpoint: str) -> None:
+        self.game = game
+        self.version = version
+        self.endpoint = endpoint
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases[self.phase] = self.phases.get(self.phase, 0) + now - self.phase_start
+        self.phase = phase
+        self.phase_start = now
+
+    def finish(self) -> float:
+        self.mark("")
+        return self.phase_start - self.start
+
+
+class RequestMetrics:
+    """
+    Latency and query count histograms of every request this process served,
+    labelled by game, version and endpoint
+    """
+
+    def __init__(self) -> None:
+        # (game, version, endpoint) -> histogram
+        self.latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self.db_latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self.queries: Dict[Tuple[str, str, str], Histogram] = {}
+        # (game, version, endpoint, phase) -> histogram
+        self.phase_latency: Dict[Tuple[str, str, str, str], Histogram] = {}
+        # (game, version, endpoint, status) -> count
+        self.responses: Dict[Tuple[str, str, str, int], int] = {}
+
+    def record(self, timer: RequestTimer, total: float, status: int) -> None:
+        key = (timer.game, timer.version, timer.endpoint)
+
+        self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(total)
+        self.db_latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(timer.db_time)
+        self.queries.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(timer.db_queries)
+
+        for phase, seconds in timer.phases.items():
+            self.phase_latency.setdefault(key + (phase,), Histogram(LATENCY_BUCKETS)).observe(seconds)
+
+        self.responses[key + (status,)] = self.responses.get(key + (status,), 0) + 1
+
+    def render(self) -> str:
+        lines = [
+            "# HELP artemis_request_duration_seconds Time taken to serve a title server request",
+            "# TYPE artemis_request_duration_seconds histogram",
+        ]
+        for key, hist in self.latency.items():
+            lines += hist.render("artemis_request_duration_seconds", self.labels(*key))
+
+        lines += [
+            "# HELP artemis_request_phase_duration_seconds Time a title server request spent in each phase",
+            "# TYPE artemis_request_phase_duration_seconds histogram",
+        ]
+        for key, hist in self.phase_latency.items():
+            lines += hist.render("artemis_request_phase_duration_seconds", self.labels(*key[:3]) + f',phase="{key[3]}"')
+
+        lines += [
+            "# HELP artemis_request_db_duration_seconds Time a title server request spent waiting on database queries",
+            "# TYPE artemis_request_db_duration_seconds histogram",
+        ]
+        for key, hist in self.db_latency.items():
+            lines += hist.render("artemis_request_db_duration_seconds", self.labels(*key))
+
+        lines += [
+            "# HELP artemis_request_queries Database queries run by a title server request",
+            "# TYPE artemis_request_queries histogram",
+        ]
+        for key, hist in self.queries.items():
+            lines += hist.render("artemis_request_queries", self.labels(*key))
+
+        lines += [
+            "# HELP artemis_responses_total Title server responses sent, by HTTP status",
+            "# TYPE artemis_responses_total counter",
+        ]
+        for key, count in self.responses.items():
+            lines.append(f'artemis_responses_total{{{self.labels(*key[:3])},status="{key[3]}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def labels(game: str, version: str, endpoint: str) -> str:
+        return f'game="{escape_label(game)}",version="{escape_label(version)}",endpoint="{escape_label(endpoint)}"'
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_metrics = RequestMetrics()
+
+# Endpoint label of requests nothing handles, so junk paths share one series
+UNKNOWN_ENDPOINT = "unknown"
+
+# Timer of the request being served by the current task, None outside of a request
+# or when metrics are disabled
+_request_timer: ContextVar[Optional[RequestTimer]] = ContextVar("request_timer", default=None)
+
+
+def set_request_labels(game: str, version: int, endpoint: str) -> None:
+    """
+    Label the current request, for dispatchers that only know the real endpoint
+    after decoding the request. Every label ends up in a metric series that is
+    kept forever, so only pass values from the dispatcher's own tables (the
+    internal version, a handled endpoint or UNKNOWN_ENDPOINT), never raw request input.
+    """
+    timer = _request_timer.get()
+    if timer is not None:
+        timer.set_labels(game, str(version), endpoint)
+
+
+def mark_request_phase(phase: str) -> None:
+    timer = _request_timer.get()
+    if timer is not None:
+        timer.mark(phase)
+
+
+def record_query(seconds: float, fingerprint: Optional[str] = None) -> int:
+    """
+    Add a query to the current request. Returns how many times the request has
+    run this statement so far, or 0 outside of a request.
+    """
+    timer = _request_timer.get()
+    if timer is None:
+        return 0
+
+    timer.db_queries += 1
+    timer.db_time += seconds
+    if fingerprint is None:
+        return 0
+
+    timer.statements[fingerprint] = timer.statements.get(fingerprint, 0) + 1
+    return timer.statements[fingerprint]
+
+
+def current_request_labels() -> Tuple[str, str, str]:
+    timer = _request_timer.get()
+    if timer is None:
+        return ("", "", "")
+
+    return (timer.game, timer.version, timer.endpoint)
+
+
+class RequestProfiler:
+    """
+    Runs a sample of requests under cProfile, saving the profile of those slower
+    than the threshold. cProfile follows whatever runs on the thread, including
+    other requests' tasks, so only one request is profiled at a time.
+    """
+
+    def __init__(self, sample_rate: float, slow_threshold: int, profile_dir: str) -> None:
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold / 1000
+        self.profile_dir = profile_dir
+        self.logger = logging.getLogger("core")
+
+        self.active: Optional[cProfile.Profile] = None
+
+    def start(self) -> Optional[cProfile.Profile]:
+        if self.sample_rate <= 0 or self.active is not None or random.random() >= self.sample_rate:
+            return None
+
+        self.active = cProfile.Profile()
+        self.active.enable()
+        return self.active
+
+    def stop(self, profile: cProfile.Profile, timer: RequestTimer, total: float) -> None:
+        profile.disable()
+        self.active = None
+
+        if total < self.slow_threshold:
+            return
+
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            name = "_".join(x for x in (timer.game, timer.version, timer.endpoint) if x).replace("/", "_")
+            file = f"{self.profile_dir}/{int(time.time() * 1000)}_{name}.prof"
+            profile.dump_stats(file)
+            self.logger.info(f"Saved profile of {total * 1000:.0f}ms request to {file}")
+
+        except OSError as e:
+            self.logger.warning(f"Failed to save request profile - {e}")
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request passing through the app. Dispatchers label requests
+    with set_request_labels, anything else is labelled with the route handler it
+    reached, or UNKNOWN_ENDPOINT if no route matched.
+    """
+
+    def __init__(self, app: ASGIApp, cfg: CoreConfig) -> None:
+        self.app = app
+        self.profiler = RequestProfiler(
+            cfg.metrics.profile_sample_rate, cfg.metrics.profile_slow_threshold, cfg.metrics.profile_dir
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        timer = RequestTimer()
+        token = _request_timer.set(timer)
+        profile = self.profiler.start()
+        status = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+
+        finally:
+            total = timer.finish()
+            _request_timer.reset(token)
+
+            if not timer.endpoint:
+                # The router fills in the matched route's handler on the scope it was given. Path
+                # parameters are whatever the client sent, so they are never used as labels.
+                if "endpoint" in scope:
+                    timer.set_labels("", "", getattr(scope["endpoint"], "__qualname__", UNKNOWN_ENDPOINT))
+
+                else:
+                    timer.set_labels("", "", UNKNOWN_ENDPOINT)
+
+            if profile is not None:
+                self.profiler.stop(profile, timer, total)
+
+            request_metrics.record(timer, total, status)
+
+
+async def render_metrics(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(request_metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,5 +1,7 @@
-from typing import Dict, List, Tuple, Any
+from typing import Callable, Dict, List, Optional, Tuple, Any
 import json
+import time
+import inflection
 import logging, coloredlogs
 from logging.handlers import TimedRotatingFileHandler
 from starlette.requests import Request
@@ -19,6 +21,46 @@ class JSONResponseNoASCII(Response):
             ensure_ascii=False,
         ).encode("utf-8")
 
+class DispatchTable:
+    """
+    Bound handle_*_request coroutines of one handler instance, indexed once at
+    startup so that dispatching a request is a dict lookup instead of a
+    hasattr/getattr on a freshly built string.
+    """
+
+    def __init__(self, handler: Any) -> None:
+        self.handler = handler
+        self.methods: Dict[str, Callable] = {}
+        self.endpoints: Dict[str, Callable] = {}
+
+        for name in dir(handler):
+            if not name.startswith("handle_") or not name.endswith("_request"):
+                continue
+
+            method = getattr(handler, name)
+            if not callable(method):
+                continue
+
+            self.methods[name] = method
+            # handle_method_api_request -> MethodApi
+            self.endpoints[inflection.camelize(name[7:-8])] = method
+
+    def get_method(self, name: str) -> Optional[Callable]:
+        return self.methods.get(name)
+
+    def get(self, endpoint: str) -> Optional[Callable]:
+        """
+        Find the handler for an endpoint name as sent by the game, ex. GetUserPreviewApi
+        """
+        method = self.endpoints.get(endpoint)
+        if method is None:
+            # Spellings that don't round trip through camelize, remember them once found
+            method = self.methods.get("handle_" + inflection.underscore(endpoint) + "_request")
+            if method is not None:
+                self.endpoints[endpoint] = method
+
+        return method
+
 class BaseServlet:
     def __init__(self, core_cfg: CoreConfig, cfg_dir: str) -> None:
         self.core_cfg = core_cfg
@@ -95,7 +137,7 @@ class BaseServlet:
 
 class TitleServlet:
     title_registry: Dict[str, BaseServlet] = {}
-    def __init__(self, core_cfg: CoreConfig, cfg_folder: str):
+    def __init__(self, core_cfg: CoreConfig, cfg_folder: str, run_setup: bool = True):
         super().__init__()
         self.config = core_cfg
         self.config_folder = cfg_folder
@@ -125,11 +167,17 @@ class TitleServlet:
             )
             self.logger.initialized = True
 
-        plugins = Utils.get_all_titles()
+        if self.title_registry:
+            # Already built by another app in this process, ex. the title server for allnet
+            return
+
+        plugins = Utils.get_enabled_titles(self.config_folder)
 
         for folder, mod in plugins.items():
             if hasattr(mod, "game_codes") and hasattr(mod, "index") and hasattr(mod.index, "is_game_enabled"):
-                should_call_setup = True
+                start = time.perf_counter()
+                # Title workers leave sub-services to the services process, only one process may bind their ports
+                should_call_setup = run_setup
                 game_servlet: BaseServlet = mod.index
                 game_codes: List[str] = mod.game_codes
                 
@@ -143,6 +191,10 @@ class TitleServlet:
 
                         self.title_registry[code] = handler_cls
 
+                self.logger.info(
+                    f"Loaded {folder} in {(Utils.title_import_times.get(folder, 0) + time.perf_counter() - start) * 1000:.0f}ms"
+                )
+
             else:
                 self.logger.error(f"{folder} missing game_code or index in __init__.py, or is_game_enabled in index")
 
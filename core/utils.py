@@ -1,13 +1,15 @@
 import importlib
 import logging
+import time
 from base64 import b64decode
 from datetime import datetime, timezone
-from os import walk
+from os import environ, path, walk
 from types import ModuleType
 from typing import Any, Dict, Optional
 import math
 
 import jwt
+import yaml
 from starlette.requests import Request
 
 from .config import CoreConfig
@@ -42,6 +44,10 @@ separate value is needed to mean "unset"."""
 class Utils:
     real_title_port = None
     real_title_port_ssl = None
+    # Titles imported by get_enabled_titles, shared by everything in this process
+    enabled_titles: Optional[Dict[str, ModuleType]] = None
+    # Seconds spent importing each title, for startup reporting
+    title_import_times: Dict[str, float] = {}
 
     @classmethod
     def get_all_titles(cls) -> Dict[str, ModuleType]:
@@ -62,6 +68,92 @@ class Utils:
                         raise
             return ret
 
+    @classmethod
+    def get_title_manifest(cls, folder: str) -> Optional[Dict[str, Any]]:
+        """
+        Contents of titles/<folder>/manifest.yaml, or None if the title doesn't have one
+        """
+        manifest_path = f"titles/{folder}/manifest.yaml"
+        if not path.exists(manifest_path):
+            return None
+
+        with open(manifest_path) as f:
+            return yaml.safe_load(f)
+
+    @classmethod
+    def is_title_enabled(cls, folder: str, cfg_dir: str) -> bool:
+        """
+        Whether a title's server.enable is set, without importing it. Titles without
+        a manifest can't be checked, and are treated as enabled.
+        """
+        manifest = cls.get_title_manifest(folder)
+        if manifest is None:
+            return True
+
+        return cls.get_title_flag(folder, cfg_dir, "server", "enable", default=manifest["enable_default"])
+
+    @classmethod
+    def get_title_flag(cls, folder: str, cfg_dir: str, *keys: str, default: bool = False) -> bool:
+        """
+        A boolean setting from a title's config file, ex. ("matching", "enable"), without
+        importing the title. Titles without a manifest always get the default.
+        """
+        manifest = cls.get_title_manifest(folder)
+        if manifest is None:
+            return default
+
+        # Environment overrides win over the config file, like in the title's config class
+        env_key = f"CFG_{manifest['config_module']}_{'_'.join(keys)}"
+        if env_key in environ:
+            return environ[env_key].lower() not in ["false", "0", ""]
+
+        game_cfg = {}
+        if path.exists(f"{cfg_dir}/{manifest['config_name']}"):
+            with open(f"{cfg_dir}/{manifest['config_name']}") as f:
+                game_cfg = yaml.safe_load(f) or {}
+
+        for key in keys[:-1]:
+            game_cfg = game_cfg.get(key) or {}
+
+        return bool(game_cfg.get(keys[-1], default))
+
+    @classmethod
+    def get_enabled_titles(cls, cfg_dir: str) -> Dict[str, ModuleType]:
+        """
+        Like get_all_titles, but disabled titles are skipped before being imported.
+        The result is built once per process.
+        """
+        if cls.enabled_titles is not None:
+            return cls.enabled_titles
+
+        ret: Dict[str, ModuleType] = {}
+        for root, dirs, files in walk("titles"):
+            for dir in dirs:
+                if dir.startswith("__"):
+                    continue
+
+                if not cls.is_title_enabled(dir, cfg_dir):
+                    logging.getLogger("core").debug(f"get_enabled_titles: {dir} is disabled, not loading it")
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    mod = importlib.import_module(f"titles.{dir}")
+                    if hasattr(mod, "game_codes") and hasattr(
+                        mod, "index"
+                    ):  # Minimum required to function
+                        ret[dir] = mod
+
+                except ImportError as e:
+                    logging.getLogger("core").error(f"get_enabled_titles: {dir} - {e}")
+                    raise
+
+                cls.title_import_times[dir] = time.perf_counter() - start
+            break
+
+        cls.enabled_titles = ret
+        return ret
+
     @classmethod
     def get_ip_addr(cls, req: Request) -> str:
         ip = req.headers.get("x-forwarded-for", req.client.host)
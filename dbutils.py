@@ -9,6 +9,25 @@ import yaml
 from core.config import CoreConfig
 from core.data import Data
 
+async def backfill_play_counts(cfg: CoreConfig, cfg_dir: str) -> None:
+    # Imported here so that the other actions don't load any title
+    from titles.chuni.config import ChuniConfig
+    from titles.chuni.const import ChuniConstants
+    from titles.chuni.database import ChuniData
+    from titles.ongeki.database import OngekiData
+
+    logger = logging.getLogger("database")
+
+    # CHUNITHM needs its version config to map playlog romVersions back to versions
+    chuni_cfg = ChuniConfig()
+    if path.exists(f"{cfg_dir}/{ChuniConstants.CONFIG_NAME}"):
+        chuni_cfg.update(yaml.safe_load(open(f"{cfg_dir}/{ChuniConstants.CONFIG_NAME}")))
+
+    for name, data in (("CHUNITHM", ChuniData(cfg, chuni_cfg)), ("O.N.G.E.K.I.", OngekiData(cfg))):
+        logger.info(f"Rebuilding {name} play counts from the playlog")
+        if not await data.score.backfill_play_counts():
+            logger.error(f"Failed to rebuild {name} play counts")
+
 async def main():
     parser = argparse.ArgumentParser(description="Database utilities")
     parser.add_argument(
@@ -23,7 +42,7 @@ async def main():
     parser.add_argument("--email", "-e", type=str, help="Email for the new user")
     parser.add_argument("--access_code", "-a", type=str, help="Access code for new/transfer user", default="00000000000000000000")
     parser.add_argument("--message", "-m", type=str, help="Revision message")
-    parser.add_argument("action", type=str, help="create, upgrade, downgrade, create-owner, migrate, create-revision, create-autorevision")
+    parser.add_argument("action", type=str, help="create, upgrade, downgrade, create-owner, migrate, create-revision, create-autorevision, backfill-playcounts")
     args = parser.parse_args()
 
     environ["ARTEMIS_CFG_DIR"] = args.config
@@ -68,6 +87,9 @@ async def main():
     elif args.action == "create-autorevision":
         await data.create_revision_auto(args.message)
 
+    elif args.action == "backfill-playcounts":
+        await backfill_play_counts(cfg, args.config)
+
     else:
         logging.getLogger("database").info(f"Unknown action {args.action}")
 
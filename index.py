@@ -5,16 +5,31 @@ from os import path, environ
 import uvicorn
 import logging
 import asyncio
+import multiprocessing
+import signal
+import socket
+import threading
+import time
+from typing import Dict
 
 from core.config import CoreConfig
 from core.aimedb import AimedbServlette
+from core.data import flush_card_logins, flush_event_log
+from core.utils import Utils
 
-async def launch_main(cfg: CoreConfig, ssl: bool) -> None:
+# Seconds a restarted process waits before its first retry, doubled for every
+# following failure up to RESTART_BACKOFF_MAX
+RESTART_BACKOFF_MIN = 1
+RESTART_BACKOFF_MAX = 60
+# Seconds a process has to stay up before it is considered started, resetting its backoff
+RESTART_STABLE_TIME = 60
+
+def main_server_config(cfg: CoreConfig, ssl: bool, port: int) -> uvicorn.Config:
     if ssl:
-        server_cfg = uvicorn.Config(
+        return uvicorn.Config(
             "core.app:app", 
             host=cfg.server.listen_address, 
-            port=cfg.server.port if args.port == 0 else args.port, 
+            port=cfg.server.port if port == 0 else port, 
             reload=cfg.server.is_develop,
             log_level="info" if cfg.server.is_develop else "critical",
             ssl_version=3,
@@ -22,14 +37,16 @@ async def launch_main(cfg: CoreConfig, ssl: bool) -> None:
             ssl_keyfile=cfg.server.ssl_key
         ) 
     else:
-        server_cfg = uvicorn.Config(
+        return uvicorn.Config(
             "core.app:app", 
             host=cfg.server.listen_address, 
-            port=cfg.server.port if args.port == 0 else args.port, 
+            port=cfg.server.port if port == 0 else port, 
             reload=cfg.server.is_develop,
             log_level="info" if cfg.server.is_develop else "critical"
         )
-    server = uvicorn.Server(server_cfg)
+
+async def launch_main(cfg: CoreConfig, ssl: bool, port: int) -> None:
+    server = uvicorn.Server(main_server_config(cfg, ssl, port))
     await server.serve()
 
 async def launch_billing(cfg: CoreConfig) -> None:
@@ -70,8 +87,13 @@ async def launch_allnet(cfg: CoreConfig) -> None:
     await server.serve()
 
 
-async def launcher(cfg: CoreConfig, ssl: bool) -> None:
-    task_list = [asyncio.create_task(launch_main(cfg, ssl))]
+async def launcher(cfg: CoreConfig, ssl: bool, port: int, serve_main: bool = True) -> None:
+    task_list = []
+    if serve_main:
+        task_list.append(asyncio.create_task(launch_main(cfg, ssl, port)))
+    else:
+        # Nobody imports the title app in this process, load it here so title sub-services get set up
+        import core.app
     
     if cfg.billing.standalone:
         task_list.append(asyncio.create_task(launch_billing(cfg)))
@@ -81,6 +103,10 @@ async def launcher(cfg: CoreConfig, ssl: bool) -> None:
         task_list.append(asyncio.create_task(launch_allnet(cfg)))
     if cfg.aimedb.enable:
         AimedbServlette(cfg).start()
+
+    if not task_list:
+        # Only AimeDB and title sub-services, which run on their own
+        task_list.append(asyncio.create_task(asyncio.Event().wait()))
     
     done, pending = await asyncio.wait(
         task_list,
@@ -91,6 +117,80 @@ async def launcher(cfg: CoreConfig, ssl: bool) -> None:
     for pending_task in pending:
         pending_task.cancel("Another service died, server is shutting down")
 
+    await flush_event_log()
+    await flush_card_logins()
+
+def run_title_worker(cfg_dir: str, server_cfg: uvicorn.Config, sock: socket.socket) -> None:
+    environ["ARTEMIS_CFG_DIR"] = cfg_dir
+    environ["ARTEMIS_PROCESS_ROLE"] = "title_worker"
+
+    uvicorn.Server(server_cfg).run(sockets=[sock])
+
+def run_services(cfg_dir: str, cfg: CoreConfig, ssl: bool, port: int) -> None:
+    environ["ARTEMIS_CFG_DIR"] = cfg_dir
+    environ["ARTEMIS_PROCESS_ROLE"] = "services"
+
+    asyncio.run(launcher(cfg, ssl, port, serve_main=False))
+
+def supervise(cfg: CoreConfig, cfg_dir: str, ssl: bool, port: int) -> None:
+    """
+    Serve the title server from cfg.server.workers processes sharing one listen socket,
+    with everything else in a single services process. Dead processes are restarted,
+    waiting longer after every failure of a process that doesn't stay up.
+    """
+    logger = logging.getLogger("core")
+    # Children start from a fresh interpreter, so nothing (like database engines) is inherited from this process
+    ctx = multiprocessing.get_context("spawn")
+
+    server_cfg = main_server_config(cfg, ssl, port)
+    # Bound once here and handed to every worker, so the kernel spreads accepted connections between them
+    sock = server_cfg.bind_socket()
+
+    def start(name: str):
+        if name == "services":
+            proc = ctx.Process(target=run_services, args=(cfg_dir, cfg, ssl, port), name=name)
+        else:
+            proc = ctx.Process(target=run_title_worker, args=(cfg_dir, server_cfg, sock), name=name)
+
+        proc.start()
+        return proc
+
+    procs = {name: start(name) for name in ["services"] + [f"title_worker_{i}" for i in range(cfg.server.workers)]}
+    started = {name: time.monotonic() for name in procs}
+    # Processes waiting to be restarted, name -> when to restart them
+    restart_at: Dict[str, float] = {}
+    failures = {name: 0 for name in procs}
+    logger.info(f"Started {cfg.server.workers} title workers and a services process")
+
+    stopping = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: stopping.set())
+
+    while not stopping.wait(1):
+        now = time.monotonic()
+        for name, proc in procs.items():
+            if name in restart_at:
+                if now >= restart_at[name]:
+                    del restart_at[name]
+                    procs[name] = start(name)
+                    started[name] = now
+
+            elif not proc.is_alive():
+                # A process that keeps dying right after starting is most likely misconfigured, don't spin on it
+                failures[name] = failures[name] + 1 if now - started[name] < RESTART_STABLE_TIME else 1
+                delay = min(RESTART_BACKOFF_MIN * 2 ** (failures[name] - 1), RESTART_BACKOFF_MAX)
+                logger.error(f"{name} exited with code {proc.exitcode}, restarting in {delay}s")
+                restart_at[name] = now + delay
+
+    logger.info("Shutdown")
+    for proc in procs.values():
+        proc.terminate()
+
+    for proc in procs.values():
+        proc.join()
+
+    sock.close()
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Artemis main entry point")
     parser.add_argument(
@@ -115,4 +215,15 @@ if __name__ == "__main__":
 
     environ["ARTEMIS_CFG_DIR"] = args.config
 
-    asyncio.run(launcher(cfg, args.ssl))
+    if cfg.server.workers > 1 and not cfg.server.is_develop:
+        # Chunithm Online Battle rooms live in the memory of the process serving the request,
+        # with more than one title worker cabinets would end up matching in different rooms
+        if Utils.is_title_enabled("chuni", args.config) and Utils.get_title_flag("chuni", args.config, "matching", "enable"):
+            logging.getLogger("core").error(
+                "Chunithm Online Battle matching only supports a single title worker. Set server.workers to 1 or chuni matching.enable to False"
+            )
+            exit(1)
+
+        supervise(cfg, args.config, args.ssl, args.port)
+    else:
+        asyncio.run(launcher(cfg, args.ssl, args.port))
@@ -7,6 +7,7 @@ from typing import Any, Dict, List
 import pytz
 
 from core.config import CoreConfig
+from core.data import fetch_concurrently
 from titles.chuni.config import ChuniConfig
 from titles.chuni.const import ChuniConstants, FavoriteItemKind, ItemKind
 from titles.chuni.database import ChuniData
@@ -687,12 +688,12 @@ class ChuniBase:
         return bytes([ord(c) for c in src]).decode("utf-8")
 
     async def handle_get_user_preview_api_request(self, data: Dict) -> Dict:
-        profile = await self.data.profile.get_profile_preview(data["userId"], self.version)
+        profile, profile_character = await fetch_concurrently(
+            self.data.profile.get_profile_preview(data["userId"], self.version),
+            self.data.item.get_selected_character(data["userId"], self.version),
+        )
         if profile is None:
             return None
-        profile_character = await self.data.item.get_character(
-            data["userId"], profile["characterId"]
-        )
 
         if profile_character is None:
             chara = {}
@@ -864,181 +865,173 @@ class ChuniBase:
             self.logger.info("Guest play from place ID %d, ignoring.", place_id)
             return {"returnCode": "1"}
 
-        if "userData" in upsert:
-            try:
-                upsert["userData"][0]["userName"] = self.read_wtf8(
-                    upsert["userData"][0]["userName"]
+        # Everything below shares one session and is committed as a single transaction
+        async with self.data.base.transaction():
+            if "userData" in upsert:
+                try:
+                    upsert["userData"][0]["userName"] = self.read_wtf8(
+                        upsert["userData"][0]["userName"]
+                    )
+                except Exception:
+                    pass
+
+                await self.data.profile.put_profile_data(
+                    user_id, self.version, upsert["userData"][0]
                 )
-            except Exception:
-                pass
 
-            await self.data.profile.put_profile_data(
-                user_id, self.version, upsert["userData"][0]
-            )
+            if "userDataEx" in upsert:
+                await self.data.profile.put_profile_data_ex(
+                    user_id, self.version, upsert["userDataEx"][0]
+                )
 
-        if "userDataEx" in upsert:
-            await self.data.profile.put_profile_data_ex(
-                user_id, self.version, upsert["userDataEx"][0]
-            )
+            if "userGameOption" in upsert:
+                await self.data.profile.put_profile_option(user_id, upsert["userGameOption"][0])
 
-        if "userGameOption" in upsert:
-            await self.data.profile.put_profile_option(user_id, upsert["userGameOption"][0])
+            if "userGameOptionEx" in upsert:
+                await self.data.profile.put_profile_option_ex(
+                    user_id, upsert["userGameOptionEx"][0]
+                )
+            if "userRecentRatingList" in upsert:
+                await self.data.profile.put_profile_recent_rating(
+                    user_id, upsert["userRecentRatingList"]
+                )
 
-        if "userGameOptionEx" in upsert:
-            await self.data.profile.put_profile_option_ex(
-                user_id, upsert["userGameOptionEx"][0]
-            )
-        if "userRecentRatingList" in upsert:
-            await self.data.profile.put_profile_recent_rating(
-                user_id, upsert["userRecentRatingList"]
-            )
+            if "userCharacterList" in upsert:
+                await self.data.item.put_characters(user_id, upsert["userCharacterList"])
 
-        if "userCharacterList" in upsert:
-            for character in upsert["userCharacterList"]:
-                await self.data.item.put_character(user_id, character)
-
-        if "userMapList" in upsert:
-            for map in upsert["userMapList"]:
-                await self.data.item.put_map(user_id, map)
-
-        if "userCourseList" in upsert:
-            for course in upsert["userCourseList"]:
-                await self.data.score.put_course(user_id, course)
-
-        if "userDuelList" in upsert:
-            for duel in upsert["userDuelList"]:
-                await self.data.item.put_duel(user_id, duel)
-
-        if "userItemList" in upsert:
-            for item in upsert["userItemList"]:
-                await self.data.item.put_item(user_id, item)
-
-        if "userActivityList" in upsert:
-            for activity in upsert["userActivityList"]:
-                await self.data.profile.put_profile_activity(user_id, activity)
-
-        if "userChargeList" in upsert:
-            for charge in upsert["userChargeList"]:
-                await self.data.profile.put_profile_charge(user_id, charge)
-
-        if "userMusicDetailList" in upsert:
-            for song in upsert["userMusicDetailList"]:
-                await self.data.score.put_score(user_id, song)
-
-        if "userPlaylogList" in upsert:
-            for playlog in upsert["userPlaylogList"]:
-                # convert the player names to utf-8
-                if playlog["playedUserName1"] is not None:
-                  playlog["playedUserName1"] = self.read_wtf8(playlog["playedUserName1"])
-                if playlog["playedUserName2"] is not None:
-                  playlog["playedUserName2"] = self.read_wtf8(playlog["playedUserName2"])
-                if playlog["playedUserName3"] is not None:
-                  playlog["playedUserName3"] = self.read_wtf8(playlog["playedUserName3"])
-                await self.data.score.put_playlog(user_id, playlog, self.version)
-
-        if "userTeamPoint" in upsert:
-            team_points = upsert["userTeamPoint"]
-            try:
-                for tp in team_points:
-                    if tp["teamId"] != '65535':
-                        # Fetch the current team data
-                        current_team = await self.data.profile.get_team_by_id(tp["teamId"])
-
-                        # Calculate the new teamPoint
-                        new_team_point = int(tp["teamPoint"]) + current_team["teamPoint"]
-
-                        # Prepare the data to update
-                        team_data = {
-                            "teamPoint": new_team_point
-                        }
-
-                        # Update the team data
-                        await self.data.profile.update_team(tp["teamId"], team_data)
-            except:
-                pass # Probably a better way to catch if the team is not set yet (new profiles), but let's just pass
-        if "userMapAreaList" in upsert:
-            for map_area in upsert["userMapAreaList"]:
-                await self.data.item.put_map_area(user_id, map_area)
-
-        if "userOverPowerList" in upsert:
-            for overpower in upsert["userOverPowerList"]:
-                await self.data.profile.put_profile_overpower(user_id, overpower)
-
-        if "userEmoneyList" in upsert:
-            for emoney in upsert["userEmoneyList"]:
-                await self.data.profile.put_profile_emoney(user_id, emoney)
-
-        if "userLoginBonusList" in upsert:
-            for login in upsert["userLoginBonusList"]:
-                await self.data.item.put_login_bonus(
-                    user_id, self.version, login["presetId"], isWatched=True
-                )
-        
-        if "userRecentPlayerList" in upsert: # TODO: Seen in Air, maybe implement sometime
-            for rp in upsert["userRecentPlayerList"]:
-                pass
+            if "userMapList" in upsert:
+                await self.data.item.put_maps(user_id, upsert["userMapList"])
 
-        for rating_type in {"userRatingBaseList", "userRatingBaseHotList", "userRatingBaseNextList"}:
-            if rating_type not in upsert:
-                continue
-            
-            await self.data.profile.put_profile_rating(
-                user_id,
-                self.version,
-                rating_type,
-                upsert[rating_type],
-            )
+            if "userCourseList" in upsert:
+                await self.data.score.put_courses(user_id, upsert["userCourseList"])
+
+            if "userDuelList" in upsert:
+                await self.data.item.put_duels(user_id, upsert["userDuelList"])
+
+            if "userItemList" in upsert:
+                await self.data.item.put_items(user_id, upsert["userItemList"])
+
+            if "userActivityList" in upsert:
+                await self.data.profile.put_profile_activities(user_id, upsert["userActivityList"])
+
+            if "userChargeList" in upsert:
+                await self.data.profile.put_profile_charges(user_id, upsert["userChargeList"])
+
+            if "userMusicDetailList" in upsert:
+                await self.data.score.put_scores(user_id, upsert["userMusicDetailList"])
+
+            if "userPlaylogList" in upsert:
+                for playlog in upsert["userPlaylogList"]:
+                    # convert the player names to utf-8
+                    if playlog["playedUserName1"] is not None:
+                      playlog["playedUserName1"] = self.read_wtf8(playlog["playedUserName1"])
+                    if playlog["playedUserName2"] is not None:
+                      playlog["playedUserName2"] = self.read_wtf8(playlog["playedUserName2"])
+                    if playlog["playedUserName3"] is not None:
+                      playlog["playedUserName3"] = self.read_wtf8(playlog["playedUserName3"])
+
+                await self.data.score.put_playlogs(user_id, upsert["userPlaylogList"], self.version)
+
+            if "userTeamPoint" in upsert:
+                team_points = upsert["userTeamPoint"]
+                try:
+                    for tp in team_points:
+                        if tp["teamId"] != '65535':
+                            # Fetch the current team data
+                            current_team = await self.data.profile.get_team_by_id(tp["teamId"])
+
+                            # Calculate the new teamPoint
+                            new_team_point = int(tp["teamPoint"]) + current_team["teamPoint"]
+
+                            # Prepare the data to update
+                            team_data = {
+                                "teamPoint": new_team_point
+                            }
+
+                            # Update the team data
+                            await self.data.profile.update_team(tp["teamId"], team_data)
+                except:
+                    pass # Probably a better way to catch if the team is not set yet (new profiles), but let's just pass
+            if "userMapAreaList" in upsert:
+                await self.data.item.put_map_areas(user_id, upsert["userMapAreaList"])
+
+            if "userOverPowerList" in upsert:
+                await self.data.profile.put_profile_overpowers(user_id, upsert["userOverPowerList"])
+
+            if "userEmoneyList" in upsert:
+                await self.data.profile.put_profile_emoneys(user_id, upsert["userEmoneyList"])
+
+            if "userLoginBonusList" in upsert:
+                for login in upsert["userLoginBonusList"]:
+                    await self.data.item.put_login_bonus(
+                        user_id, self.version, login["presetId"], isWatched=True
+                    )
         
-        # added in LUMINOUS
-        if "userCMissionList" in upsert:
-            for cmission in upsert["userCMissionList"]:
-                mission_id = cmission["missionId"]
+            if "userRecentPlayerList" in upsert: # TODO: Seen in Air, maybe implement sometime
+                for rp in upsert["userRecentPlayerList"]:
+                    pass
 
-                await self.data.item.put_cmission(
+            for rating_type in {"userRatingBaseList", "userRatingBaseHotList", "userRatingBaseNextList"}:
+                if rating_type not in upsert:
+                    continue
+            
+                await self.data.profile.put_profile_rating(
                     user_id,
-                    {
-                        "missionId": mission_id,
-                        "point": cmission["point"],
-                    },
+                    self.version,
+                    rating_type,
+                    upsert[rating_type],
                 )
+        
+            # added in LUMINOUS
+            if "userCMissionList" in upsert:
+                for cmission in upsert["userCMissionList"]:
+                    mission_id = cmission["missionId"]
 
-                for progress in cmission["userCMissionProgressList"]:
-                    await self.data.item.put_cmission_progress(user_id, mission_id, progress)
+                    await self.data.item.put_cmission(
+                        user_id,
+                        {
+                            "missionId": mission_id,
+                            "point": cmission["point"],
+                        },
+                    )
 
-        if "userNetBattleData" in upsert:
-            net_battle = upsert["userNetBattleData"][0]
+                    for progress in cmission["userCMissionProgressList"]:
+                        await self.data.item.put_cmission_progress(user_id, mission_id, progress)
 
-            # fix the boolean
-            net_battle["isRankUpChallengeFailed"] = (
-                False if net_battle["isRankUpChallengeFailed"] == "false" else True
-            )
-            await self.data.profile.put_net_battle(user_id, net_battle)
-
-        # New in LUMINOUS PLUS
-        if "userFavoriteMusicList" in upsert:
-            # musicId, orderId
-            music_ids = set(
-                int(m["musicId"])
-                for m in upsert["userFavoriteMusicList"]
-                if m["musicId"] != "-1"
-            )
-            current_favorites = await self.data.item.get_all_favorites(
-                user_id, self.version, fav_kind=FavoriteItemKind.MUSIC.value
-            )
+            if "userNetBattleData" in upsert:
+                net_battle = upsert["userNetBattleData"][0]
+
+                # fix the boolean
+                net_battle["isRankUpChallengeFailed"] = (
+                    False if net_battle["isRankUpChallengeFailed"] == "false" else True
+                )
+                await self.data.profile.put_net_battle(user_id, net_battle)
+
+            # New in LUMINOUS PLUS
+            if "userFavoriteMusicList" in upsert:
+                # musicId, orderId
+                music_ids = set(
+                    int(m["musicId"])
+                    for m in upsert["userFavoriteMusicList"]
+                    if m["musicId"] != "-1"
+                )
+                current_favorites = await self.data.item.get_all_favorites(
+                    user_id, self.version, fav_kind=FavoriteItemKind.MUSIC.value
+                )
 
-            if current_favorites is None:
-                current_favorites = []
+                if current_favorites is None:
+                    current_favorites = []
 
-            current_favorite_ids = set(x.favId for x in current_favorites)
-            keep_ids = current_favorite_ids.intersection(music_ids)
-            deleted_ids = current_favorite_ids - keep_ids
-            added_ids = music_ids - keep_ids
+                current_favorite_ids = set(x.favId for x in current_favorites)
+                keep_ids = current_favorite_ids.intersection(music_ids)
+                deleted_ids = current_favorite_ids - keep_ids
+                added_ids = music_ids - keep_ids
 
-            for fav_id in deleted_ids:
-                await self.data.item.delete_favorite_music(user_id, self.version, fav_id)
+                for fav_id in deleted_ids:
+                    await self.data.item.delete_favorite_music(user_id, self.version, fav_id)
             
-            for fav_id in added_ids:
-                await self.data.item.put_favorite_music(user_id, self.version, fav_id)
+                for fav_id in added_ids:
+                    await self.data.item.put_favorite_music(user_id, self.version, fav_id)
 
         return {"returnCode": "1"}
 
@@ -139,6 +139,12 @@ class ChuniMatchingConfig:
             self.__config, "chuni", "matching", "match_error_limit", default=9999
         )
 
+    @property
+    def snapshot_file(self) -> str:
+        return CoreConfig.get_config_field(
+            self.__config, "chuni", "matching", "snapshot_file", default=""
+        )
+
 class ChuniConfig(dict):
     def __init__(self) -> None:
         self.server = ChuniServerConfig(self)
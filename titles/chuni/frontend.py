@@ -179,21 +179,22 @@ class ChuniFrontend(FE_Base):
             base_list=[]
             if profile and rating:
                 song_records = []
+                charts = await self.data.static.get_chart_index(usr_sesh.chunithm_version) or {}
 
                 for song in rating:
-                    music_chart = await self.data.static.get_music_chart(usr_sesh.chunithm_version, song.musicId, song.difficultId)
+                    music_chart = charts.get((song.musicId, song.difficultId))
                     if not music_chart:
                         continue
 
                     rank = calculate_song_rank(song.score, profile.version)
-                    rating = calculate_song_rating(song.score, music_chart.level, profile.version)
+                    rating = calculate_song_rating(song.score, music_chart["level"], profile.version)
 
                     song_rating = int(rating * 10 ** 2) / 10 ** 2
                     song_records.append({
                         "difficultId": song.difficultId,
                         "musicId": song.musicId,
-                        "title": music_chart.title,
-                        "level": music_chart.level,
+                        "title": music_chart["title"],
+                        "level": music_chart["level"],
                         "score": song.score,
                         "type": song.type,
                         "rank": rank,
@@ -243,15 +244,15 @@ class ChuniFrontend(FE_Base):
                     cur_version=version,
                     cur_version_name=ChuniConstants.game_ver_to_string(version)
                 ), media_type="text/html; charset=utf-8")
-            playlog = await self.data.score.get_playlogs_limited(user_id, version, index, 20)
+            # Chart metadata and favorite state come joined onto each playlog
+            playlog = await self.data.score.get_playlogs_limited_with_charts(user_id, version, index, 20)
             playlog_with_title = []
-            for idx,record in enumerate(playlog):
-                music_chart = await self.data.static.get_music_chart(version, record.musicId, record.level)
-                if music_chart:
-                    difficultyNum=music_chart.level
-                    artist=music_chart.artist
-                    title=music_chart.title
-                    (jacket, ext) = path.splitext(music_chart.jacketPath)
+            for idx,record in enumerate(playlog or []):
+                if record.title is not None:
+                    difficultyNum=record.chartLevel
+                    artist=record.artist
+                    title=record.title
+                    (jacket, ext) = path.splitext(record.jacketPath)
                     jacket += ".png"
                 else:
                     difficultyNum=0
@@ -259,8 +260,8 @@ class ChuniFrontend(FE_Base):
                     title="musicid: " + str(record.musicId)
                     jacket = "unknown.png"
 
-                # Check if this song is a favorite so we can populate the add/remove button
-                is_favorite = await self.data.item.is_favorite(user_id, version, record.musicId)
+                # Used to populate the add/remove favorite button
+                is_favorite = bool(record.isFav)
 
                 playlog_with_title.append({
                     # Values for the actual readable results
@@ -305,14 +306,15 @@ class ChuniFrontend(FE_Base):
             favorites_count = len(favorites)
             favorites_with_title = []
             favorites_by_genre = dict()
+            songs = await self.data.static.get_song_index() or {}
             for idx,favorite in enumerate(favorites):
-                song = await self.data.static.get_song(favorite.favId)
+                song = songs.get(favorite.favId)
                 if song:
-                    # we likely got multiple results - one for each chart. Just use the first
-                    artist=song.artist
-                    title=song.title
-                    genre=song.genre
-                    (jacket, ext) = path.splitext(song.jacketPath)
+                    # there is one row per chart, the index keeps the first
+                    artist=song["artist"]
+                    title=song["title"]
+                    genre=song["genre"]
+                    (jacket, ext) = path.splitext(song["jacketPath"])
                     jacket += ".png"
                 else:
                     artist="unknown"
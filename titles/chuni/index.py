@@ -11,13 +11,13 @@ import inflection
 import string
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad
-from Crypto.Protocol.KDF import PBKDF2
-from Crypto.Hash import SHA1
 from os import path
 from typing import Tuple, Dict, List
 
 from core import CoreConfig, Utils
-from core.title import BaseServlet
+from core.crypto import EndpointHashJob, build_endpoint_hash_tables
+from core.metrics import PHASE_DECODE, PHASE_ENCODE, PHASE_HANDLER, UNKNOWN_ENDPOINT, mark_request_phase, set_request_labels
+from core.title import BaseServlet, DispatchTable
 from .config import ChuniConfig
 from .const import ChuniConstants
 from .base import ChuniBase
@@ -94,6 +94,11 @@ class ChuniServlet(BaseServlet):
             )
             self.logger.inited = True
 
+        # One handler instance per version, built once and shared by every request
+        self.dispatch = [
+            DispatchTable(version(core_cfg, self.game_cfg)) for version in self.versions
+        ]
+
         known_iter_counts = {
             ChuniConstants.VER_CHUNITHM_CRYSTAL_PLUS: 67,
             f"{ChuniConstants.VER_CHUNITHM_CRYSTAL_PLUS}_int": 25, # SUPERSTAR
@@ -112,6 +117,7 @@ class ChuniServlet(BaseServlet):
             ChuniConstants.VER_CHUNITHM_LUMINOUS_PLUS: 56,
         }
 
+        hash_jobs: Dict[str, EndpointHashJob] = {}
         for version, keys in self.game_cfg.crypto.keys.items():
             if len(keys) < 3:
                 continue
@@ -132,13 +138,13 @@ class ChuniServlet(BaseServlet):
                 )
                 continue
 
-            self.hash_table[version] = {}
             method_list = [
                 method
                 for method in dir(self.versions[version_idx])
                 if not method.startswith("__")
             ]
 
+            names = []
             for method in method_list:
                 method_fixed = inflection.camelize(method)[6:-7]
 
@@ -150,21 +156,16 @@ class ChuniServlet(BaseServlet):
                     and version_idx >= ChuniConstants.VER_CHUNITHM_NEW
                 ):
                     method_fixed += "C3Exp"
-                    
-                hash = PBKDF2(
-                    method_fixed,
-                    salt,
-                    128,
-                    count=iter_count,
-                    hmac_hash_module=SHA1,
-                )
 
-                hashed_name = hash.hex()[:32] # truncate unused bytes like the game does
-                self.hash_table[version][hashed_name] = method_fixed
+                names.append(method_fixed)
 
-                self.logger.debug(
-                    f"Hashed v{version} method {method_fixed} with {salt} to get {hashed_name}"
-                )
+            hash_jobs[version] = EndpointHashJob("pbkdf2", tuple(names), salt, iter_count)
+
+        # Hashing every endpoint is slow, so this is done in parallel and cached on disk
+        self.hash_table = build_endpoint_hash_tables(hash_jobs, self.core_cfg.server.cache_dir)
+
+        for version, table in self.hash_table.items():
+            self.logger.debug(f"Hashed {len(table)} v{version} methods with {hash_jobs[version].key}")
 
     @classmethod
     def is_game_enabled(
@@ -202,6 +203,7 @@ class ChuniServlet(BaseServlet):
             return Response(zlib.compress(b'{"returnCode": "1"}'))
 
         req_raw = await request.body()
+        mark_request_phase(PHASE_DECODE)
 
         encrtped = False
         internal_ver = 0
@@ -340,22 +342,28 @@ class ChuniServlet(BaseServlet):
         else:
             endpoint = endpoint
 
-        func_to_find = "handle_" + inflection.underscore(endpoint) + "_request"
-        handler_cls = self.versions[internal_ver](self.core_cfg, self.game_cfg)
+        handler = self.dispatch[internal_ver].get(endpoint)
+        set_request_labels(
+            game_code if game_code in (ChuniConstants.GAME_CODE, ChuniConstants.GAME_CODE_NEW, ChuniConstants.GAME_CODE_INT) else UNKNOWN_ENDPOINT,
+            internal_ver,
+            endpoint if handler is not None else UNKNOWN_ENDPOINT,
+        )
+        mark_request_phase(PHASE_HANDLER)
 
-        if not hasattr(handler_cls, func_to_find):
+        if handler is None:
             self.logger.warning(f"Unhandled v{version} request {endpoint}")
             resp = {"returnCode": 1}
 
         else:
             try:
-                handler = getattr(handler_cls, func_to_find)
                 resp = await handler(req_data)
 
             except Exception as e:
                 self.logger.error(f"Error handling v{version} method {endpoint} - {e}")
                 return Response(zlib.compress(b'{"stat": "0"}'))
 
+        mark_request_phase(PHASE_ENCODE)
+
         if resp is None:
             resp = {"returnCode": 1}
 
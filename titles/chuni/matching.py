@@ -0,0 +1,312 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from titles.chuni.config import ChuniConfig
+
+# Online Battle rooms hold the host and up to 3 other players
+MAX_ROOM_MEMBERS = 4
+# Seconds a room is kept after its countdown ran out, so that late state polls
+# and the end request still find it
+ROOM_EXPIRY_GRACE = 120
+# Seconds to wait after a change before writing the snapshot, so a burst of joins
+# results in a single write
+SNAPSHOT_DELAY = 1.0
+
+
+class ChuniMatchingRoom:
+    def __init__(
+        self,
+        room_id: int,
+        version: int,
+        host: int,
+        deadline: float,
+        members: Optional[Dict[int, Dict]] = None,
+        finished: bool = False,
+    ) -> None:
+        self.room_id = room_id
+        self.version = version
+        self.host = host
+        # Wall clock time at which the countdown reaches 0, so it survives a restart
+        self.deadline = deadline
+        # userId -> matchingMemberInfo, in the order the members joined
+        self.members: Dict[int, Dict] = members if members is not None else {}
+        self.finished = finished
+
+    @property
+    def is_full(self) -> bool:
+        return self.finished or len(self.members) >= MAX_ROOM_MEMBERS
+
+    def rest_sec(self, now: Optional[float] = None) -> int:
+        if self.finished:
+            return 0
+
+        return max(0, math.ceil(self.deadline - (now or time.time())))
+
+    def is_expired(self, now: float) -> bool:
+        return now > self.deadline + ROOM_EXPIRY_GRACE
+
+    def member_list(self, first: Optional[int] = None) -> List[Dict]:
+        """
+        Member infos in join order, optionally moving one user to the front
+        """
+        if first is None or first not in self.members:
+            return list(self.members.values())
+
+        return [self.members[first]] + [m for uid, m in self.members.items() if uid != first]
+
+    def to_dict(self) -> Dict:
+        return {
+            "roomId": self.room_id,
+            "version": self.version,
+            "host": self.host,
+            "deadline": self.deadline,
+            "finished": self.finished,
+            "members": list(self.members.values()),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ChuniMatchingRoom":
+        return cls(
+            data["roomId"],
+            data["version"],
+            data["host"],
+            data["deadline"],
+            {int(m["userId"]): m for m in data["members"]},
+            data["finished"],
+        )
+
+
+class ChuniMatchingEngine:
+    """
+    Online Battle matching rooms, kept in process memory. Every operation runs to
+    completion without awaiting, so joins and leaves cannot interleave. The
+    countdown is derived from a deadline instead of being decremented by the
+    host's polls, and rooms are dropped once it has run out for ROOM_EXPIRY_GRACE
+    seconds. When snapshot_file is set, rooms are written there after every
+    change and loaded back on startup.
+    """
+
+    def __init__(self, match_time_limit: int, snapshot_file: str = "") -> None:
+        self.match_time_limit = match_time_limit
+        self.snapshot_file = snapshot_file
+        self.logger = logging.getLogger("chuni")
+
+        # version -> roomId -> room
+        self.rooms: Dict[int, Dict[int, ChuniMatchingRoom]] = {}
+        # version -> ids of rooms that can still be joined, oldest first
+        self.open_rooms: Dict[int, "OrderedDict[int, None]"] = {}
+        # (version, userId) -> roomId
+        self.member_rooms: Dict[Tuple[int, int], int] = {}
+        self.next_room_id: Dict[int, int] = {}
+
+        self.snapshot_handle: Optional[asyncio.TimerHandle] = None
+
+        if self.snapshot_file:
+            self.load_snapshot()
+
+    def get_room(self, version: int, room_id: int) -> Optional[ChuniMatchingRoom]:
+        room = self.rooms.get(version, {}).get(room_id)
+        if room is not None and room.is_expired(time.time()):
+            self.delete_room(room)
+            return None
+
+        return room
+
+    def join(self, version: int, member: Dict) -> ChuniMatchingRoom:
+        """
+        Put a player into the oldest room that still accepts players, opening a
+        new room with them as host if there is none
+        """
+        now = time.time()
+        user_id = int(member["userId"])
+        self.expire(version, now)
+
+        # A player can only wait in one room at a time
+        self.remove_member(version, user_id)
+
+        room = None
+        open_rooms = self.open_rooms.setdefault(version, OrderedDict())
+        while open_rooms:
+            room_id = next(iter(open_rooms))
+            candidate = self.rooms[version][room_id]
+            if not candidate.is_full and candidate.rest_sec(now) > 0:
+                room = candidate
+                break
+
+            # Countdown already ran out, the game fills the room with CPUs now
+            del open_rooms[room_id]
+
+        if room is None:
+            room_id = self.next_room_id.get(version, 1)
+            self.next_room_id[version] = room_id + 1
+
+            room = ChuniMatchingRoom(room_id, version, user_id, now)
+            self.rooms.setdefault(version, {})[room_id] = room
+            open_rooms[room_id] = None
+
+        room.members[user_id] = member
+        self.member_rooms[(version, user_id)] = room.room_id
+
+        # Every new member restarts the countdown
+        room.deadline = now + self.match_time_limit
+        if room.is_full:
+            open_rooms.pop(room.room_id, None)
+
+        self.schedule_snapshot()
+        return room
+
+    def update_member(self, version: int, room_id: int, member: Dict) -> Optional[ChuniMatchingRoom]:
+        """
+        Replace a member's info with the one sent in their latest state poll
+        """
+        room = self.get_room(version, room_id)
+        if room is None:
+            return None
+
+        user_id = int(member["userId"])
+        if user_id in room.members:
+            room.members[user_id] = member
+
+        return room
+
+    def finish(self, version: int, room_id: int) -> Optional[ChuniMatchingRoom]:
+        """
+        Close a room so nobody else can join it and its countdown reads 0
+        """
+        room = self.get_room(version, room_id)
+        if room is None:
+            return None
+
+        room.finished = True
+        self.open_rooms.get(version, {}).pop(room_id, None)
+
+        self.schedule_snapshot()
+        return room
+
+    def leave(self, version: int, user_id: int) -> None:
+        if self.remove_member(version, user_id):
+            self.schedule_snapshot()
+
+    def remove_member(self, version: int, user_id: int) -> bool:
+        room_id = self.member_rooms.pop((version, user_id), None)
+        if room_id is None:
+            return False
+
+        room = self.rooms.get(version, {}).get(room_id)
+        if room is None:
+            return False
+
+        room.members.pop(user_id, None)
+        if not room.members:
+            self.delete_room(room)
+            return True
+
+        if room.host == user_id:
+            room.host = next(iter(room.members))
+
+        open_rooms = self.open_rooms.setdefault(version, OrderedDict())
+        if not room.is_full and room.rest_sec() > 0 and room_id not in open_rooms:
+            # Reopen the room, keeping the oldest rooms at the front
+            self.open_rooms[version] = OrderedDict((x, None) for x in sorted([*open_rooms, room_id]))
+
+        return True
+
+    def delete_room(self, room: ChuniMatchingRoom) -> None:
+        self.rooms.get(room.version, {}).pop(room.room_id, None)
+        self.open_rooms.get(room.version, {}).pop(room.room_id, None)
+
+        for user_id in room.members:
+            if self.member_rooms.get((room.version, user_id)) == room.room_id:
+                del self.member_rooms[(room.version, user_id)]
+
+    def expire(self, version: int, now: float) -> None:
+        for room in [r for r in self.rooms.get(version, {}).values() if r.is_expired(now)]:
+            self.logger.debug(f"Matching room {room.room_id} (version {version}) expired")
+            self.delete_room(room)
+
+    def schedule_snapshot(self) -> None:
+        if not self.snapshot_file or self.snapshot_handle is not None:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.write_snapshot()
+            return
+
+        self.snapshot_handle = loop.call_later(SNAPSHOT_DELAY, self.write_snapshot)
+
+    def write_snapshot(self) -> None:
+        self.snapshot_handle = None
+        rooms = [room.to_dict() for by_id in self.rooms.values() for room in by_id.values()]
+
+        try:
+            snapshot_dir = os.path.dirname(self.snapshot_file)
+            if snapshot_dir:
+                os.makedirs(snapshot_dir, exist_ok=True)
+
+            tmp_file = f"{self.snapshot_file}.tmp"
+            with open(tmp_file, "w") as f:
+                json.dump({"nextRoomId": self.next_room_id, "rooms": rooms}, f)
+            os.replace(tmp_file, self.snapshot_file)
+
+        except OSError as e:
+            self.logger.warning(f"Failed to write matching snapshot {self.snapshot_file}: {e}")
+
+    def load_snapshot(self) -> None:
+        if not os.path.exists(self.snapshot_file):
+            return
+
+        try:
+            with open(self.snapshot_file, "r") as f:
+                snapshot = json.load(f)
+
+            now = time.time()
+            for room_data in snapshot["rooms"]:
+                room = ChuniMatchingRoom.from_dict(room_data)
+                if room.is_expired(now):
+                    continue
+
+                self.rooms.setdefault(room.version, {})[room.room_id] = room
+                for user_id in room.members:
+                    self.member_rooms[(room.version, user_id)] = room.room_id
+
+            for version, rooms in self.rooms.items():
+                open_rooms = self.open_rooms.setdefault(version, OrderedDict())
+                for room_id in sorted(rooms):
+                    if not rooms[room_id].is_full and rooms[room_id].rest_sec(now) > 0:
+                        open_rooms[room_id] = None
+
+            for version, room_id in snapshot["nextRoomId"].items():
+                self.next_room_id[int(version)] = room_id
+
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.warning(f"Failed to load matching snapshot {self.snapshot_file}: {e}")
+            self.rooms, self.open_rooms, self.member_rooms, self.next_room_id = {}, {}, {}, {}
+            return
+
+        self.logger.info(f"Restored {sum(len(x) for x in self.rooms.values())} matching rooms from {self.snapshot_file}")
+
+
+_matching_engine: Optional[ChuniMatchingEngine] = None
+
+
+def get_matching_engine(game_cfg: ChuniConfig) -> ChuniMatchingEngine:
+    """
+    The matching engine shared by every version's handler
+    """
+    global _matching_engine
+    if _matching_engine is None:
+        # Nothing joins rooms with matching off, and several workers may be running, so leave the snapshot alone
+        _matching_engine = ChuniMatchingEngine(
+            game_cfg.matching.match_time_limit,
+            game_cfg.matching.snapshot_file if game_cfg.matching.enable else "",
+        )
+
+    return _matching_engine
@@ -6,11 +6,13 @@ from typing import Dict
 import pytz
 
 from core.config import CoreConfig
+from core.data import fetch_concurrently
 from core.utils import Utils
 from titles.chuni.base import ChuniBase
 from titles.chuni.config import ChuniConfig
 from titles.chuni.const import ChuniConstants
 from titles.chuni.database import ChuniData
+from titles.chuni.matching import get_matching_engine
 
 
 class ChuniNew(ChuniBase):
@@ -24,6 +26,7 @@ class ChuniNew(ChuniBase):
         self.logger = logging.getLogger("chuni")
         self.game = ChuniConstants.GAME_CODE
         self.version = ChuniConstants.VER_CHUNITHM_NEW
+        self.matching = get_matching_engine(game_cfg)
     
     def _interal_ver_to_intver(self) -> str:
         if self.version == ChuniConstants.VER_CHUNITHM_NEW:
@@ -124,12 +127,12 @@ class ChuniNew(ChuniBase):
         return {"userId": data["userId"], "symbolCharInfoList": []}
 
     async def handle_get_user_preview_api_request(self, data: Dict) -> Dict:
-        profile = await self.data.profile.get_profile_preview(data["userId"], self.version)
+        profile, profile_character = await fetch_concurrently(
+            self.data.profile.get_profile_preview(data["userId"], self.version),
+            self.data.item.get_selected_character(data["userId"], self.version),
+        )
         if profile is None:
             return None
-        profile_character = await self.data.item.get_character(
-            data["userId"], profile["characterId"]
-        )
 
         if profile_character is None:
             chara = {}
@@ -515,73 +518,53 @@ class ChuniNew(ChuniBase):
         return {"returnCode": "1"}
 
     async def handle_begin_matching_api_request(self, data: Dict) -> Dict:
-        room_id = 1
-        # check if there is a free matching room
-        matching_room = await self.data.item.get_oldest_free_matching(self.version)
+        # fix userName WTF8
+        new_member = data["matchingMemberInfo"]
+        new_member["userName"] = self.read_wtf8(new_member["userName"])
 
-        if matching_room is None:
-            # grab the latest roomId and add 1 for the new room
-            newest_matching = await self.data.item.get_newest_matching(self.version)
-            if newest_matching is not None:
-                room_id = newest_matching["roomId"] + 1
-
-            # fix userName WTF8
-            new_member = data["matchingMemberInfo"]
-            new_member["userName"] = self.read_wtf8(new_member["userName"])
-
-            # create the new room with room_id and the current user id (host)
-            # user id is required for the countdown later on
-            await self.data.item.put_matching(
-                self.version, room_id, [new_member], user_id=new_member["userId"]
-            )
+        if not self.game_cfg.matching.enable:
+            # matching is off, the player gets a room of their own that the game fills with CPUs
+            return {
+                "roomId": 0,
+                "matchingWaitState": {
+                    "isFinish": True,
+                    "restMSec": 0,
+                    "pollingInterval": 1,
+                    "matchingMemberInfoList": [new_member],
+                },
+            }
 
-            # get the newly created matching room
-            matching_room = await self.data.item.get_matching(self.version, room_id)
-        else:
-            # a room already exists, so just add the new member to it
-            matching_member_list = matching_room["matchingMemberInfoList"]
-            # fix userName WTF8
-            new_member = data["matchingMemberInfo"]
-            new_member["userName"] = self.read_wtf8(new_member["userName"])
-            matching_member_list.append(new_member)
-
-            # add the updated room to the database, make sure to set isFull correctly!
-            await self.data.item.put_matching(
-                self.version,
-                matching_room["roomId"],
-                matching_member_list,
-                user_id=matching_room["user"],
-                is_full=True if len(matching_member_list) >= 4 else False,
-            )
+        # join the oldest room that still has a free slot, or become the host of a new one
+        matching_room = self.matching.join(self.version, new_member)
 
         matching_wait = {
             "isFinish": False,
-            "restMSec": matching_room["restMSec"],  # in sec
+            "restMSec": matching_room.rest_sec(),  # in sec
             "pollingInterval": 1,  # in sec
-            "matchingMemberInfoList": matching_room["matchingMemberInfoList"],
+            "matchingMemberInfoList": matching_room.member_list(),
         }
 
-        return {"roomId": 1, "matchingWaitState": matching_wait}
+        return {"roomId": matching_room.room_id, "matchingWaitState": matching_wait}
 
     async def handle_end_matching_api_request(self, data: Dict) -> Dict:
-        matching_room = await self.data.item.get_matching(self.version, data["roomId"])
-        members = matching_room["matchingMemberInfoList"]
+        # close the room, so no one can join anymore
+        matching_room = self.matching.finish(self.version, int(data["roomId"]))
+        if matching_room is None:
+            return {
+                "matchingResult": 0,
+                "matchingMemberInfoList": [],
+                "matchingMemberRoleList": [],
+                "reflectorUri": f"{self.core_cfg.server.hostname}",
+            }
+
+        members = matching_room.member_list()
 
         # only set the host user to role 1 every other to 0?
         role_list = [
-            {"role": 1} if m["userId"] == matching_room["user"] else {"role": 0}
+            {"role": 1} if int(m["userId"]) == matching_room.host else {"role": 0}
             for m in members
         ]
 
-        await self.data.item.put_matching(
-            self.version,
-            matching_room["roomId"],
-            members,
-            user_id=matching_room["user"],
-            rest_sec=0,  # make sure to always set 0
-            is_full=True,  # and full, so no one can join
-        )
-
         return {
             "matchingResult": 1,  # needs to be 1 for successful matching
             "matchingMemberInfoList": members,
@@ -592,79 +575,35 @@ class ChuniNew(ChuniBase):
         }
 
     async def handle_remove_matching_member_api_request(self, data: Dict) -> Dict:
-        # get all matching rooms, because Chuni only returns the userId
-        # not the actual roomId
-        matching_rooms = await self.data.item.get_all_matchings(self.version)
-        if matching_rooms is None:
-            return {"returnCode": "1"}
-
-        for room in matching_rooms:
-            old_members = room["matchingMemberInfoList"]
-            new_members = [m for m in old_members if m["userId"] != data["userId"]]
-
-            # if nothing changed go to the next room
-            if len(old_members) == len(new_members):
-                continue
-
-            # if the last user got removed, delete the matching room
-            if len(new_members) <= 0:
-                await self.data.item.delete_matching(self.version, room["roomId"])
-            else:
-                # remove the user from the room
-                await self.data.item.put_matching(
-                    self.version,
-                    room["roomId"],
-                    new_members,
-                    user_id=room["user"],
-                    rest_sec=room["restMSec"],
-                )
+        # Chuni only sends the userId, the engine knows which room they are in
+        self.matching.leave(self.version, int(data["userId"]))
 
         return {"returnCode": "1"}
 
     async def handle_get_matching_state_api_request(self, data: Dict) -> Dict:
         polling_interval = 1
-        # get the current active room
-        matching_room = await self.data.item.get_matching(self.version, data["roomId"])
-        members = matching_room["matchingMemberInfoList"]
-        rest_sec = matching_room["restMSec"]
 
-        # grab the current member
+        # grab the current member, also parse WTF-8 everytime
         current_member = data["matchingMemberInfo"]
+        current_member["userName"] = self.read_wtf8(current_member["userName"])
 
-        # only the host user can decrease the countdown
-        if matching_room["user"] == int(current_member["userId"]):
-            # cap the restMSec to 0
-            if rest_sec > 0:
-                rest_sec -= polling_interval
-            else:
-                rest_sec = 0
-
-        # update the members in order to recieve messages
-        for i, member in enumerate(members):
-            if member["userId"] == current_member["userId"]:
-                # replace the old user data with the current user data,
-                # also parse WTF-8 everytime
-                current_member["userName"] = self.read_wtf8(current_member["userName"])
-                members[i] = current_member
-
-        await self.data.item.put_matching(
-            self.version,
-            data["roomId"],
-            members,
-            rest_sec=rest_sec,
-            user_id=matching_room["user"],
-        )
-
-        # only add the other members to the list
-        diff_members = [m for m in members if m["userId"] != current_member["userId"]]
+        # update the member in order to recieve messages
+        matching_room = self.matching.update_member(self.version, int(data["roomId"]), current_member)
+        if matching_room is None:
+            # the room expired or was never created, let the game fill it with CPUs
+            rest_sec = 0
+            members = [current_member]
+        else:
+            rest_sec = matching_room.rest_sec()
+            # the current user needs to be the first one?
+            members = matching_room.member_list(first=int(current_member["userId"]))
 
         matching_wait = {
             # makes no difference? Always use False?
             "isFinish": True if rest_sec == 0 else False,
             "restMSec": rest_sec,
             "pollingInterval": polling_interval,
-            # the current user needs to be the first one?
-            "matchingMemberInfoList": [current_member] + diff_members,
+            "matchingMemberInfoList": members,
         }
 
         return {
@@ -5,6 +5,7 @@ from read import BaseReader
 from PIL import Image
 
 from core.config import CoreConfig
+from core.data.cache import invalidate
 from titles.chuni.database import ChuniData
 from titles.chuni.const import ChuniConstants
 from titles.chuni.schema.static import music as MusicTable
@@ -61,6 +62,9 @@ class ChuniReader(BaseReader):
             await self.read_map_icon(f"{dir}/mapIcon")
             await self.read_system_voice(f"{dir}/systemVoice")
 
+        # Running servers keep events, charges, login bonuses and charts cached, tell them to refetch
+        invalidate("chuni_static", self.config)
+
     async def read_login_bonus(self, root_dir: str) -> None:
         for root, dirs, files in walk(f"{root_dir}loginBonusPreset"):
             for dir in dirs:
@@ -15,6 +15,7 @@ from sqlalchemy.sql import func, select
 from sqlalchemy.types import JSON, TIMESTAMP, Boolean, Integer, String
 
 from core.data.schema import BaseData, metadata
+from titles.chuni.schema.profile import profile
 
 character: Table = Table(
     "chuni_item_character",
@@ -490,6 +491,10 @@ class ChuniItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_characters(self, user_id: int, character_list: List[Dict]) -> Optional[int]:
+        rows = [self.fix_bools({**x, "user": user_id}) for x in character_list]
+        return await self.insert_many(character, rows)
+
     async def get_character(self, user_id: int, character_id: int) -> Optional[Dict]:
         sql = select(character).where(
             and_(character.c.user == user_id, character.c.characterId == character_id)
@@ -500,6 +505,27 @@ class ChuniItemData(BaseData):
             return None
         return result.fetchone()
 
+    async def get_selected_character(self, aime_id: int, version: int) -> Optional[Row]:
+        """
+        The character set on the user's newest profile up to version, looked up
+        in one query so it does not have to wait for the profile to be loaded
+        """
+        selected = (
+            select(profile.c.characterId)
+            .where(and_(profile.c.user == aime_id, profile.c.version <= version))
+            .order_by(profile.c.version.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        sql = select(character).where(
+            and_(character.c.user == aime_id, character.c.characterId == selected)
+        )
+
+        result = await self.execute(sql)
+        if result is None:
+            return None
+        return result.fetchone()
+
     async def get_characters(
         self, user_id: int, limit: Optional[int] = None, offset: Optional[int] = None
     ) -> Optional[List[Row]]:
@@ -530,6 +556,10 @@ class ChuniItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_items(self, user_id: int, item_list: List[Dict]) -> Optional[int]:
+        rows = [self.fix_bools({**x, "user": user_id}) for x in item_list]
+        return await self.insert_many(item, rows)
+
     async def get_items(
         self,
         user_id: int,
@@ -569,6 +599,10 @@ class ChuniItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_duels(self, user_id: int, duel_list: List[Dict]) -> Optional[int]:
+        rows = [self.fix_bools({**x, "user": user_id}) for x in duel_list]
+        return await self.insert_many(duel, rows)
+
     async def get_duels(self, user_id: int) -> Optional[List[Row]]:
         sql = select(duel).where(duel.c.user == user_id)
 
@@ -590,6 +624,10 @@ class ChuniItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_maps(self, user_id: int, map_list: List[Dict]) -> Optional[int]:
+        rows = [self.fix_bools({**x, "user": user_id}) for x in map_list]
+        return await self.insert_many(map, rows)
+
     async def get_maps(self, user_id: int) -> Optional[List[Row]]:
         sql = select(map).where(map.c.user == user_id)
 
@@ -611,6 +649,10 @@ class ChuniItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_map_areas(self, user_id: int, map_area_list: List[Dict]) -> Optional[int]:
+        rows = [self.fix_bools({**x, "user": user_id}) for x in map_area_list]
+        return await self.insert_many(map_area, rows)
+
     async def get_map_areas(self, user_id: int, map_area_ids: List[int]) -> Optional[List[Row]]:
         sql = select(map_area).where(map_area.c.user == user_id, map_area.c.mapAreaId.in_(map_area_ids))
 
@@ -654,6 +654,15 @@ class ChuniProfileData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_profile_activities(self, aime_id: int, activity_list: List[Dict]) -> Optional[int]:
+        rows = []
+        for activity_data in activity_list:
+            activity_data = {**activity_data, "user": aime_id}
+            activity_data["activityId"] = activity_data.pop("id")
+            rows.append(activity_data)
+
+        return await self.insert_many(activity, rows)
+
     async def get_profile_activity(self, aime_id: int, kind: int) -> Optional[List[Row]]:
         sql = (
             select(activity)
@@ -680,6 +689,9 @@ class ChuniProfileData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_profile_charges(self, aime_id: int, charge_list: List[Dict]) -> Optional[int]:
+        return await self.insert_many(charge, [{**x, "user": aime_id} for x in charge_list])
+
     async def get_profile_charge(self, aime_id: int) -> Optional[List[Row]]:
         sql = select(charge).where(charge.c.user == aime_id)
 
@@ -705,6 +717,9 @@ class ChuniProfileData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_profile_emoneys(self, aime_id: int, emoney_list: List[Dict]) -> Optional[int]:
+        return await self.insert_many(emoney, [{**x, "user": aime_id} for x in emoney_list])
+
     async def get_profile_emoney(self, aime_id: int) -> Optional[List[Row]]:
         sql = select(emoney).where(emoney.c.user == aime_id)
 
@@ -726,6 +741,9 @@ class ChuniProfileData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_profile_overpowers(self, aime_id: int, overpower_list: List[Dict]) -> Optional[int]:
+        return await self.insert_many(overpower, [{**x, "user": aime_id} for x in overpower_list])
+
     async def get_profile_overpower(self, aime_id: int) -> Optional[List[Row]]:
         sql = select(overpower).where(overpower.c.user == aime_id)
 
@@ -1,15 +1,20 @@
 from typing import Dict, List, Optional
 
-from sqlalchemy import Column, Table, UniqueConstraint
+from sqlalchemy import Column, Table, UniqueConstraint, and_
 from sqlalchemy.dialects.mysql import insert
 from sqlalchemy.engine import Row
+from sqlalchemy.engine.base import Connection
 from sqlalchemy.schema import ForeignKey
 from sqlalchemy.sql import func, select
 from sqlalchemy.types import Boolean, Integer, String
 
-from core.data.schema import BaseData, metadata
+from core.config import CoreConfig
+from core.data.schema import BaseData, PlayCountData, metadata, parse_play_day
 
 from ..config import ChuniConfig
+from ..const import ChuniConstants
+from .item import favorite
+from .static import music
 
 course: Table = Table(
     "chuni_score_course",
@@ -237,6 +242,10 @@ class ChuniRomVersion():
         return -1
 
 class ChuniScoreData(BaseData):
+    def __init__(self, cfg: CoreConfig, conn: Connection) -> None:
+        super().__init__(cfg, conn)
+        self.playcount = PlayCountData(cfg, conn)
+
     async def get_courses(
         self,
         aime_id: int,
@@ -269,6 +278,10 @@ class ChuniScoreData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_courses(self, aime_id: int, course_list: List[Dict]) -> Optional[int]:
+        rows = [self.fix_bools({**x, "user": aime_id}) for x in course_list]
+        return await self.insert_many(course, rows)
+
     async def get_scores(
         self,
         aime_id: int,
@@ -326,6 +339,10 @@ class ChuniScoreData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_scores(self, aime_id: int, score_list: List[Dict]) -> Optional[int]:
+        rows = [self.fix_bools({**x, "user": aime_id}) for x in score_list]
+        return await self.insert_many(best_score, rows)
+
     async def get_playlogs(self, aime_id: int) -> Optional[Row]:
         sql = select(playlog).where(playlog.c.user == aime_id)
 
@@ -376,6 +393,55 @@ class ChuniScoreData(BaseData):
             return None
         return result.fetchall()
 
+    async def get_playlogs_limited_with_charts(self, aime_id: int, version: int, index: int, count: int) -> Optional[List[Row]]:
+        """
+        Same page as get_playlogs_limited, with the chart's title, artist,
+        chartLevel and jacketPath (None for unknown charts) and whether the
+        song is a favorite (isFav) joined in
+        """
+        rom_versions = await self.get_playlog_rom_versions_by_int_version(version, aime_id)
+        if rom_versions is None:
+            return None
+
+        sql = (
+            select(
+                playlog,
+                music.c.title,
+                music.c.artist,
+                music.c.level.label("chartLevel"),
+                music.c.jacketPath,
+                favorite.c.id.isnot(None).label("isFav"),
+            )
+            .select_from(
+                playlog.outerjoin(
+                    music,
+                    and_(
+                        music.c.version == version,
+                        music.c.songId == playlog.c.musicId,
+                        music.c.chartId == playlog.c.level,
+                    ),
+                ).outerjoin(
+                    favorite,
+                    and_(
+                        favorite.c.user == playlog.c.user,
+                        favorite.c.version == version,
+                        favorite.c.favId == playlog.c.musicId,
+                        favorite.c.favKind == 1,
+                    ),
+                )
+            )
+            .where((playlog.c.user == aime_id) & (playlog.c.romVersion.in_(rom_versions)))
+            .order_by(playlog.c.id.desc())
+            .limit(count)
+            .offset(index * count)
+        )
+
+        result = await self.execute(sql)
+        if result is None:
+            self.logger.info(f" aime_id {aime_id} has no playlog for version {version}")
+            return None
+        return result.fetchall()
+
     async def get_user_playlogs_count(self, aime_id: int, version: int) -> Optional[Row]:
         # Get a list of all the recorded romVersions in the playlog 
         # for this user that map to the given version.
@@ -404,20 +470,79 @@ class ChuniScoreData(BaseData):
         result = await self.execute(sql)
         if result is None:
             return None
+
+        await self.count_plays([playlog_data], version)
         return result.lastrowid
 
+    async def put_playlogs(self, aime_id: int, playlog_list: List[Dict], version: int) -> Optional[int]:
+        rows = []
+        for playlog_data in playlog_list:
+            playlog_data = self.fix_bools({**playlog_data, "user": aime_id})
+            if "romVersion" not in playlog_data:
+                playlog_data["romVersion"] = ChuniRomVersion.Versions[version]
+            rows.append(playlog_data)
+
+        affected = await self.insert_many(playlog, rows, upsert=False)
+        if affected is None:
+            return None
+
+        await self.count_plays(rows, version)
+        return affected
+
+    async def count_plays(self, playlog_list: List[Dict], version: int) -> None:
+        # WORLD'S END charts (level 4) don't count towards the game ranking
+        await self.playcount.add_plays(
+            ChuniConstants.GAME_CODE,
+            version,
+            [
+                (parse_play_day(x.get("playDate")), int(x["musicId"]))
+                for x in playlog_list
+                # The game sends every value as a string
+                if x.get("musicId") is not None and x.get("level") is not None and int(x["level"]) != 4
+            ],
+        )
+
     async def get_rankings(self, version: int) -> Optional[List[Dict]]:
-        # Get a list of all the recorded romVersions in the playlog for the given version
-        rom_versions = await self.get_playlog_rom_versions_by_int_version(version)
-        if rom_versions is None:
+        rows = await self.playcount.get_top_total(ChuniConstants.GAME_CODE, version)
+        if rows is None:
             return None
 
-        # Query results that have the matching romVersions
-        sql = select([playlog.c.musicId.label('id'), func.count(playlog.c.musicId).label('point')]).where((playlog.c.level != 4) & (playlog.c.romVersion.in_(rom_versions))).group_by(playlog.c.musicId).order_by(func.count(playlog.c.musicId).desc()).limit(10)
-        result = await self.execute(sql)
+        return [{"id": row["music_id"], "point": row["plays"]} for row in rows]
+
+    async def backfill_play_counts(self) -> bool:
+        """
+        Rebuild the play count rollups from the whole playlog table
+        """
+        day = func.left(playlog.c.playDate, 10).label("day")
+        sql = (
+            select([playlog.c.romVersion, day, playlog.c.musicId, func.count(playlog.c.id).label("plays")])
+            .where(playlog.c.level != 4)
+            .group_by(playlog.c.romVersion, day, playlog.c.musicId)
+        )
 
+        result = await self.execute(sql)
         if result is None:
-            return None
+            return False
+
+        daily: Dict = {}
+        totals: Dict = {}
+        versions: Dict[str, int] = {}
+        for row in result.fetchall():
+            if row["romVersion"] is None or row["musicId"] is None:
+                continue
+
+            if row["romVersion"] not in versions:
+                versions[row["romVersion"]] = ChuniRomVersion(row["romVersion"]).get_int_version()
+
+            version = versions[row["romVersion"]]
+            if version < 0:
+                continue
+
+            totals[(version, row["musicId"])] = totals.get((version, row["musicId"]), 0) + row["plays"]
+
+            play_day = parse_play_day(row["day"])
+            if play_day is not None:
+                key = (version, play_day, row["musicId"])
+                daily[key] = daily.get(key, 0) + row["plays"]
 
-        rows = result.fetchall()
-        return [dict(row) for row in rows]
+        return await self.playcount.replace_plays(ChuniConstants.GAME_CODE, daily, totals)
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy import (
     ForeignKeyConstraint,
     Table,
@@ -15,6 +15,7 @@ from sqlalchemy.sql import func, select
 from sqlalchemy.dialects.mysql import insert
 from datetime import datetime
 
+from core.data.cache import async_cached, invalidate
 from core.data.schema import BaseData, metadata
 
 events = Table(
@@ -293,6 +294,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.lastrowid
 
+    @async_cached(lifetime=3600, namespace="chuni_static")
     async def get_login_bonus(
         self,
         version: int,
@@ -310,6 +312,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.fetchall()
 
+    @async_cached(lifetime=3600, namespace="chuni_static")
     async def get_login_bonus_by_required_days(
         self, version: int, preset_id: int, need_login_day_count: int
     ) -> Optional[Row]:
@@ -345,6 +348,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.lastrowid
 
+    @async_cached(lifetime=3600, namespace="chuni_static")
     async def get_login_bonus_presets(
         self, version: int, is_enabled: bool = True
     ) -> Optional[List[Row]]:
@@ -388,6 +392,8 @@ class ChuniStaticData(BaseData):
             )
             return None
 
+        invalidate("chuni_static", self.config)
+
         event = self.get_event(version, event_id)
         if event is None:
             self.logger.warning(
@@ -406,6 +412,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.fetchone()
 
+    @async_cached(lifetime=3600, namespace="chuni_static")
     async def get_enabled_events(self, version: int) -> Optional[List[Row]]:
         sql = select(events).where(
             and_(events.c.version == version, events.c.enabled == True)
@@ -492,6 +499,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.lastrowid
 
+    @async_cached(lifetime=3600, namespace="chuni_static")
     async def get_enabled_charges(self, version: int) -> Optional[List[Row]]:
         sql = select(charge).where(
             and_(charge.c.version == version, charge.c.enabled == True)
@@ -510,6 +518,35 @@ class ChuniStaticData(BaseData):
             return None
         return result.fetchall()
 
+    @async_cached(lifetime=3600, namespace="chuni_static")
+    async def get_chart_index(self, version: int) -> Optional[Dict[Tuple[int, int], Dict]]:
+        """
+        Every chart of a version, keyed by (songId, chartId), for pages that
+        need chart metadata for many scores at once
+        """
+        sql = music.select(music.c.version == version)
+
+        result = await self.execute(sql)
+        if result is None:
+            return None
+        return {(row.songId, row.chartId): row._asdict() for row in result.fetchall()}
+
+    @async_cached(lifetime=3600, namespace="chuni_static")
+    async def get_song_index(self) -> Optional[Dict[int, Dict]]:
+        """
+        One chart per songId across all versions, the same row get_song returns
+        """
+        sql = music.select().order_by(music.c.id)
+
+        result = await self.execute(sql)
+        if result is None:
+            return None
+
+        songs: Dict[int, Dict] = {}
+        for row in result.fetchall():
+            songs.setdefault(row.songId, row._asdict())
+        return songs
+
     async def get_music(self, version: int) -> Optional[List[Row]]:
         sql = music.select(music.c.version <= version)
 
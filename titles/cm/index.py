@@ -1,5 +1,4 @@
 import json
-import inflection
 import yaml
 import string
 import logging
@@ -14,7 +13,7 @@ from logging.handlers import TimedRotatingFileHandler
 
 from core.config import CoreConfig
 from core.utils import Utils
-from core.title import BaseServlet
+from core.title import BaseServlet, DispatchTable
 from .config import CardMakerConfig
 from .const import CardMakerConstants
 from .base import CardMakerBase
@@ -34,6 +33,8 @@ class CardMakerServlet(BaseServlet):
             CardMaker135(core_cfg, self.game_cfg)
         ]
 
+        self.dispatch = [DispatchTable(handler) for handler in self.versions]
+
         self.logger = logging.getLogger("cardmaker")
         log_fmt_str = "[%(asctime)s] Card Maker | %(levelname)s | %(message)s"
         log_fmt = logging.Formatter(log_fmt_str)
@@ -109,14 +110,13 @@ class CardMakerServlet(BaseServlet):
         self.logger.info(f"v{version} {endpoint} request from {client_ip}")
         self.logger.debug(req_data)
 
-        func_to_find = "handle_" + inflection.underscore(endpoint) + "_request"
+        handler = self.dispatch[internal_ver].get(endpoint)
 
-        if not hasattr(self.versions[internal_ver], func_to_find):
+        if handler is None:
             self.logger.warning(f"Unhandled v{version} request {endpoint}")
             return Response(zlib.compress(b'{"returnCode": 1}'))
 
         try:
-            handler = getattr(self.versions[internal_ver], func_to_find)
             resp = await handler(req_data)
 
         except Exception as e:
@@ -2,31 +2,32 @@ import logging
 import json
 from decimal import Decimal
 from base64 import b64encode
-from typing import Any, Dict, List
-from os import path
+from typing import Any, Dict, List, Optional
 
 from core.config import CoreConfig
 from .config import CxbConfig
 from .const import CxbConstants
 from .database import CxbData
+from .catalog import CxbCatalog
 
 from threading import Thread
 
 class CxbBase:
-    def __init__(self, cfg: CoreConfig, game_cfg: CxbConfig) -> None:
+    def __init__(self, cfg: CoreConfig, game_cfg: CxbConfig, catalog: Optional[CxbCatalog] = None) -> None:
         self.config = cfg  # Config file
         self.game_config = game_cfg
         self.data = CxbData(cfg)  # Database
+        self.catalog = catalog if catalog is not None else CxbCatalog()  # Data files
         self.game = CxbConstants.GAME_CODE
         self.logger = logging.getLogger("cxb")
         self.version = CxbConstants.VER_CROSSBEATS_REV
 
     def _get_data_contents(self, folder: str, filetype: str, encoding: str = None, subfolder: str = "") -> List[str]:
-        if path.exists(f"titles/cxb/data/{folder}/{subfolder}{filetype}.csv"):
-            with open(f"titles/cxb/data/{folder}/{subfolder}{filetype}.csv", encoding=encoding) as f:
-                return f.readlines()
-        
-        return []
+        try:
+            return self.catalog.lines(f"{folder}/{subfolder}{filetype}.csv", encoding)
+
+        except FileNotFoundError:
+            return []
 
     async def handle_action_rpreq_request(self, data: Dict) -> Dict:
         return {}
@@ -0,0 +1,124 @@
+import io
+import locale
+import logging
+import os
+import time
+from typing import Callable, Dict, Hashable, List, Optional
+
+
+class CxbCatalog:
+    """
+    Keeps every file under titles/cxb/data in memory, along with the response
+    fragments built from them, so that /data requests never touch the disk.
+    """
+
+    def __init__(self, data_dir: str = "titles/cxb/data", watch_interval: int = 0) -> None:
+        self.data_dir = data_dir
+        self.watch_interval = watch_interval
+        self.logger = logging.getLogger("cxb")
+
+        self.files: Dict[str, bytes] = {}
+        self.mtimes: Dict[str, float] = {}
+        self.fragments: Dict[Hashable, str] = {}
+        self.last_check = time.monotonic()
+
+        self.load()
+
+    def load(self) -> None:
+        files: Dict[str, bytes] = {}
+        mtimes: Dict[str, float] = {}
+
+        for root, dirs, filenames in os.walk(self.data_dir):
+            for filename in filenames:
+                full_path = os.path.join(root, filename)
+                rel_path = os.path.relpath(full_path, self.data_dir).replace(os.sep, "/")
+
+                with open(full_path, "rb") as f:
+                    files[rel_path] = f.read()
+                mtimes[rel_path] = os.path.getmtime(full_path)
+
+        self.files = files
+        self.mtimes = mtimes
+        self.fragments = {}
+        self.logger.info(f"Loaded {len(files)} data files from {self.data_dir}")
+
+    def _current_mtimes(self) -> Dict[str, float]:
+        mtimes: Dict[str, float] = {}
+        for root, dirs, filenames in os.walk(self.data_dir):
+            for filename in filenames:
+                full_path = os.path.join(root, filename)
+                rel_path = os.path.relpath(full_path, self.data_dir).replace(os.sep, "/")
+                mtimes[rel_path] = os.path.getmtime(full_path)
+
+        return mtimes
+
+    def check_for_changes(self) -> None:
+        if self.watch_interval <= 0:
+            return
+
+        now = time.monotonic()
+        if now - self.last_check < self.watch_interval:
+            return
+
+        self.last_check = now
+        if self._current_mtimes() != self.mtimes:
+            self.logger.info("Data files changed on disk, reloading")
+            self.load()
+
+    def fragment(self, key: Hashable, build: Callable[[], str]) -> str:
+        """
+        Return the fragment stored under key, building it the first time it is asked for
+        """
+        self.check_for_changes()
+
+        if key not in self.fragments:
+            self.fragments[key] = build()
+
+        return self.fragments[key]
+
+    def lines(self, file: str, encoding: Optional[str] = None) -> List[str]:
+        """
+        Equivalent of open(file, encoding=encoding).readlines(), served from memory.
+        Raises FileNotFoundError for files that do not exist, like open() would.
+        """
+        if file not in self.files:
+            raise FileNotFoundError(f"{self.data_dir}/{file}")
+
+        if encoding is None:
+            encoding = locale.getpreferredencoding(False)
+
+        # readlines() uses universal newlines, so do the same here
+        return io.StringIO(self.files[file].decode(encoding), newline=None).readlines()
+
+    def render(self, file: str, encoding: Optional[str] = None) -> str:
+        """
+        Every line of a file, with its line ending replaced by CRLF
+        """
+        return self.fragment(
+            ("render", file, encoding),
+            lambda: "".join(f"{line[:-1]}\r\n" for line in self.lines(file, encoding)),
+        )
+
+    def render_music_list(self, file: str) -> str:
+        """
+        The first 15 columns of every row of a MusicArchiveList
+        """
+
+        def build() -> str:
+            ret_str = ""
+            for line in self.lines(file):
+                line_split = line.split(",")
+                ret_str += ",".join(line_split[:15]) + ",\r\n"
+            return ret_str
+
+        return self.fragment(("music_list", file), build)
+
+    def render_random_music_list(self, file: str) -> str:
+        def build() -> str:
+            ret_str = ""
+            for line in self.lines(file):
+                line_split = line.split(",")
+                ret_str += "0," + line_split[0] + "," + line_split[0] + ",\r\n"
+            return ret_str
+
+        return self.fragment(("random_music_list", file), build)
@@ -25,6 +25,12 @@ class CxbServerConfig:
             self.__config, "cxb", "server", "use_https", default=True
         )
 
+    @property
+    def data_reload_interval(self) -> int:
+        return CoreConfig.get_config_field(
+            self.__config, "cxb", "server", "data_reload_interval", default=0
+        )
+
 
 class CxbConfig(dict):
     def __init__(self) -> None:
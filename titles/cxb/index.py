@@ -13,10 +13,11 @@ from typing import Dict, Tuple, List
 from os import path
 
 from core.config import CoreConfig
-from core.title import BaseServlet, JSONResponseNoASCII
+from core.title import BaseServlet, DispatchTable, JSONResponseNoASCII
 from core.utils import Utils
 from .config import CxbConfig
 from .const import CxbConstants
+from .catalog import CxbCatalog
 from .rev import CxbRev
 from .rss1 import CxbRevSunriseS1
 from .rss2 import CxbRevSunriseS2
@@ -58,12 +59,19 @@ class CxbServlet(BaseServlet):
             )
             self.logger.inited = True
 
+        # Every data file is read and decoded once here and shared by all versions
+        self.catalog = CxbCatalog(
+            watch_interval=self.game_cfg.server.data_reload_interval
+        )
+
         self.versions = [
-            CxbRev(core_cfg, self.game_cfg),
-            CxbRevSunriseS1(core_cfg, self.game_cfg),
-            CxbRevSunriseS2(core_cfg, self.game_cfg),
+            CxbRev(core_cfg, self.game_cfg, self.catalog),
+            CxbRevSunriseS1(core_cfg, self.game_cfg, self.catalog),
+            CxbRevSunriseS2(core_cfg, self.game_cfg, self.catalog),
         ]
 
+        self.dispatch = [DispatchTable(handler) for handler in self.versions]
+
     def get_routes(self) -> List[Route]:
         return [
             Route("/data", self.handle_data, methods=['POST']),
@@ -179,14 +187,14 @@ class CxbServlet(BaseServlet):
             version_string = "Rev SunriseS2"
             internal_ver = CxbConstants.VER_CROSSBEATS_REV_SUNRISE_S2
 
-        if not hasattr(self.versions[internal_ver], func_to_find):
+        handler = self.dispatch[internal_ver].get_method(func_to_find)
+
+        if handler is None:
             self.logger.warning(f"{version_string} has no handler for filetype {filetype} / {func_to_find}")
             return JSONResponse({"data":""})
         
         self.logger.info(f"{version_string} request for filetype {filetype}")
         self.logger.debug(req_json)
-
-        handler = getattr(self.versions[internal_ver], func_to_find)
         
         try:
             resp = await handler(req_json)
@@ -208,14 +216,14 @@ class CxbServlet(BaseServlet):
         subcmd = list(req_json.keys())[0]
         func_to_find = f"handle_action_{subcmd}_request"
         
-        if not hasattr(self.versions[0], func_to_find):
+        handler = self.dispatch[0].get_method(func_to_find)
+
+        if handler is None:
             self.logger.warning(f"No handler for action {subcmd} request")
             return Response()
         
         self.logger.info(f"Action {subcmd} Request")
         self.logger.debug(req_json)
-
-        handler = getattr(self.versions[0], func_to_find)
         
         try:
             resp = await handler(req_json)
@@ -237,14 +245,14 @@ class CxbServlet(BaseServlet):
         subcmd = list(req_json.keys())[0]
         func_to_find = f"handle_auth_{subcmd}_request"
         
-        if not hasattr(self.versions[0], func_to_find):
+        handler = self.dispatch[0].get_method(func_to_find)
+
+        if handler is None:
             self.logger.warning(f"No handler for auth {subcmd} request")
             return Response()
         
         self.logger.info(f"Action {subcmd} Request")
         self.logger.debug(req_json)
-
-        handler = getattr(self.versions[0], func_to_find)
         
         try:
             resp = await handler(req_json)
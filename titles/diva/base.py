@@ -2,12 +2,20 @@ import datetime
 from typing import Dict
 import logging
 import urllib.parse
-from threading import Thread
 
 from core.config import CoreConfig
+from core.data import fetch_concurrently
 from titles.diva.config import DivaConfig
 from titles.diva.const import DivaConstants
 from titles.diva.database import DivaData
+from titles.diva.catalog import (
+    CATALOG_CSTMZ_ITM,
+    CATALOG_PV_LIST,
+    CATALOG_QUEST,
+    CATALOG_SHOP,
+    get_catalog,
+)
+from titles.diva.ranking import get_rank_index
 
 
 class DivaBase:
@@ -15,6 +23,8 @@ class DivaBase:
         self.core_cfg = cfg  # Config file
         self.game_config = game_cfg
         self.data = DivaData(cfg)  # Database
+        self.ranking = get_rank_index(self.data)
+        self.catalog = get_catalog(self.data)
         self.date_time_format = "%Y-%m-%d %H:%M:%S"
         self.logger = logging.getLogger("diva")
         self.game = DivaConstants.GAME_CODE
@@ -89,79 +99,10 @@ class DivaBase:
         return encoded
 
     async def handle_pv_list_request(self, data: Dict) -> Dict:
-        pvlist = ""
-        with open(r"titles/diva/data/PvList0.dat", encoding="utf-8") as shop:
-            lines = shop.readlines()
-            for line in lines:
-                pvlist += f"{line}"
-        pvlist += ","
-
-        with open(r"titles/diva/data/PvList1.dat", encoding="utf-8") as shop:
-            lines = shop.readlines()
-            for line in lines:
-                pvlist += f"{line}"
-        pvlist += ","
-
-        with open(r"titles/diva/data/PvList2.dat", encoding="utf-8") as shop:
-            lines = shop.readlines()
-            for line in lines:
-                pvlist += f"{line}"
-        pvlist += ","
-
-        with open(r"titles/diva/data/PvList3.dat", encoding="utf-8") as shop:
-            lines = shop.readlines()
-            for line in lines:
-                pvlist += f"{line}"
-        pvlist += ","
-
-        with open(r"titles/diva/data/PvList4.dat", encoding="utf-8") as shop:
-            lines = shop.readlines()
-            for line in lines:
-                pvlist += f"{line}"
-
-        response = ""
-        response += f"&pvl_lut={self.time_lut}"
-        response += f"&pv_lst={pvlist}"
-
-        return response
+        return await self.catalog.get(CATALOG_PV_LIST, self.version, self.time_lut)
 
     async def handle_shop_catalog_request(self, data: Dict) -> Dict:
-        catalog = ""
-
-        shopList = await self.data.static.get_enabled_shops(self.version)
-        if not shopList:
-            with open(r"titles/diva/data/ShopCatalog.dat", encoding="utf-8") as shop:
-                lines = shop.readlines()
-                for line in lines:
-                    line = urllib.parse.quote(line) + ","
-                    catalog += f"{urllib.parse.quote(line)}"
-
-        else:
-            for shop in shopList:
-                line = (
-                    str(shop["shopId"])
-                    + ","
-                    + str(shop["unknown_0"])
-                    + ","
-                    + shop["name"]
-                    + ","
-                    + str(shop["points"])
-                    + ","
-                    + shop["start_date"]
-                    + ","
-                    + shop["end_date"]
-                    + ","
-                    + str(shop["type"])
-                )
-                line = urllib.parse.quote(line) + ","
-                catalog += f"{urllib.parse.quote(line)}"
-
-        catalog = catalog.replace("+", "%20")
-
-        response = f"&shp_ctlg_lut={self.time_lut}"
-        response += f"&shp_ctlg={catalog[:-3]}"
-
-        return response
+        return await self.catalog.get(CATALOG_SHOP, self.version, self.time_lut)
 
     async def handle_buy_module_request(self, data: Dict) -> Dict:
         profile = await self.data.profile.get_profile(data["pd_id"], self.version)
@@ -191,42 +132,7 @@ class DivaBase:
         return response
 
     async def handle_cstmz_itm_ctlg_request(self, data: Dict) -> Dict:
-        catalog = ""
-
-        itemList = await self.data.static.get_enabled_items(self.version)
-        if not itemList:
-            with open(r"titles/diva/data/ItemCatalog.dat", encoding="utf-8") as item:
-                lines = item.readlines()
-                for line in lines:
-                    line = urllib.parse.quote(line) + ","
-                    catalog += f"{urllib.parse.quote(line)}"
-
-        else:
-            for item in itemList:
-                line = (
-                    str(item["itemId"])
-                    + ","
-                    + str(item["unknown_0"])
-                    + ","
-                    + item["name"]
-                    + ","
-                    + str(item["points"])
-                    + ","
-                    + item["start_date"]
-                    + ","
-                    + item["end_date"]
-                    + ","
-                    + str(item["type"])
-                )
-                line = urllib.parse.quote(line) + ","
-                catalog += f"{urllib.parse.quote(line)}"
-
-        catalog = catalog.replace("+", "%20")
-
-        response = f"&cstmz_itm_ctlg_lut={self.time_lut}"
-        response += f"&cstmz_itm_ctlg={catalog[:-3]}"
-
-        return response
+        return await self.catalog.get(CATALOG_CSTMZ_ITM, self.version, self.time_lut)
 
     async def handle_buy_cstmz_itm_request(self, data: Dict) -> Dict:
         profile = await self.data.profile.get_profile(data["pd_id"], self.version)
@@ -300,54 +206,7 @@ class DivaBase:
         return response
 
     async def handle_qst_inf_request(self, data: Dict) -> Dict:
-        quest = ""
-
-        questList = await self.data.static.get_enabled_quests(self.version)
-        if not questList:
-            with open(r"titles/diva/data/QuestInfo.dat", encoding="utf-8") as shop:
-                lines = shop.readlines()
-                for line in lines:
-                    quest += f"{urllib.parse.quote(line)},"
-
-            response = ""
-            response += f"&qi_lut={self.time_lut}"
-            response += f"&qhi_str={quest[:-1]}"
-        else:
-            for quests in questList:
-                line = (
-                    str(quests["questId"])
-                    + ","
-                    + str(quests["quest_order"])
-                    + ","
-                    + str(quests["kind"])
-                    + ","
-                    + str(quests["unknown_0"])
-                    + ","
-                    + quests["start_datetime"]
-                    + ","
-                    + quests["end_datetime"]
-                    + ","
-                    + quests["name"]
-                    + ","
-                    + str(quests["unknown_1"])
-                    + ","
-                    + str(quests["unknown_2"])
-                    + ","
-                    + str(quests["quest_enable"])
-                )
-                quest += f"{urllib.parse.quote(line)}%0A,"
-
-            responseline = f"{quest[:-1]},"
-            for i in range(len(questList), 59):
-                responseline += "%2A%2A%2A%0A,"
-
-            response = ""
-            response += f"&qi_lut={self.time_lut}"
-            response += f"&qhi_str={responseline}%2A%2A%2A"
-
-        response += "&qrai_str=%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1,%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1,%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1"
-
-        return response
+        return await self.catalog.get(CATALOG_QUEST, self.version, self.time_lut)
 
     async def handle_nv_ranking_request(self, data: Dict) -> Dict:
         return f""
@@ -668,69 +527,47 @@ class DivaBase:
 
         return pv_result
 
-    async def task_generateScoreData(self, data: Dict, pd_by_pv_id, song):
-        
-        if int(song) > 0:
-            # the request do not send a edition so just perform a query best score and ranking for each edition.
-            # 0=ORIGINAL, 1=EXTRA
-            pd_db_song_0 = await self.data.score.get_best_user_score(
-                data["pd_id"], int(song), data["difficulty"], edition=0
-            )
-            pd_db_song_1 = await self.data.score.get_best_user_score(
-                data["pd_id"], int(song), data["difficulty"], edition=1
-            )
-
-            pd_db_ranking_0, pd_db_ranking_1 = None, None
-            if pd_db_song_0:
-                pd_db_ranking_0 = await self.data.score.get_global_ranking(
-                    data["pd_id"], int(song), data["difficulty"], edition=0
-                )
-
-            if pd_db_song_1:
-                pd_db_ranking_1 = await self.data.score.get_global_ranking(
-                    data["pd_id"], int(song), data["difficulty"], edition=1
-                )
-
-            pd_db_customize = await self.data.pv_customize.get_pv_customize(
-                data["pd_id"], int(song)
-            )
-
-            # generate the pv_result string with the ORIGINAL edition and the EXTRA edition appended
-            pv_result = self._get_pv_pd_result(
-                int(song), pd_db_song_0, pd_db_ranking_0, pd_db_customize, edition=0
-            )
-            pv_result += "," + self._get_pv_pd_result(
-                int(song), pd_db_song_1, pd_db_ranking_1, pd_db_customize, edition=1
-            )
-
-            self.logger.debug(f"pv_result = {pv_result}")
-            pd_by_pv_id.append(urllib.parse.quote(pv_result))
-        else:
-            pd_by_pv_id.append(urllib.parse.quote(f"{song}***"))
-        pd_by_pv_id.append(",")
-
     async def handle_get_pv_pd_request(self, data: Dict) -> Dict:
+        pd_id = int(data["pd_id"])
         song_id = data["pd_pv_id_lst"].split(",")
-        pv = ""
+        pv_ids = [int(song) for song in song_id if int(song) > 0]
+        difficulty = int(data["difficulty"])
+
+        # the request do not send a edition so fetch the best scores and rankings of every edition.
+        # 0=ORIGINAL, 1=EXTRA
+        pd_db_songs, pd_db_customizes, _ = await fetch_concurrently(
+            self.data.score.get_best_user_scores(pd_id, pv_ids, difficulty),
+            self.data.pv_customize.get_pv_customizes(pd_id, pv_ids),
+            self.ranking.load(pv_ids, difficulty),
+        )
+        songs_by_pv = {(row["pv_id"], row["edition"]): row for row in pd_db_songs or []}
+        customize_by_pv = {row["pv_id"]: row for row in pd_db_customizes or []}
 
-        threads = []
         pd_by_pv_id = []
-
         for song in song_id:
-            thread_ScoreData = Thread(target=await self.task_generateScoreData(data, pd_by_pv_id, song))
-            threads.append(thread_ScoreData)
-
-        for x in threads:
-            x.start()
-
-        for x in threads:
-            x.join()
+            if int(song) <= 0:
+                pd_by_pv_id.append(urllib.parse.quote(f"{song}***"))
+                continue
 
-        for x in pd_by_pv_id:
-            pv += x
+            # generate the pv_result string with the ORIGINAL edition and the EXTRA edition appended
+            results = []
+            for edition in (0, 1):
+                pd_db_song = songs_by_pv.get((int(song), edition))
+                pd_db_ranking = None
+                if pd_db_song:
+                    rank = self.ranking.rank(pd_id, int(song), difficulty, edition)
+                    pd_db_ranking = {"ranking": rank or 0}
+
+                results.append(self._get_pv_pd_result(
+                    int(song), pd_db_song, pd_db_ranking, customize_by_pv.get(int(song)), edition=edition
+                ))
+
+            pv_result = ",".join(results)
+            self.logger.debug(f"pv_result = {pv_result}")
+            pd_by_pv_id.append(urllib.parse.quote(pv_result))
 
         response = ""
-        response += f"&pd_by_pv_id={pv[:-1]}"
+        response += f"&pd_by_pv_id={','.join(pd_by_pv_id)}"
         response += "&pdddt_flg=0"
         response += f"&pdddt_tm={self.time_lut}"
 
@@ -740,7 +577,8 @@ class DivaBase:
         return f""
 
     async def handle_stage_result_request(self, data: Dict) -> Dict:
-        profile = await self.data.profile.get_profile(data["pd_id"], self.version)
+        pd_id = int(data["pd_id"])
+        profile = await self.data.profile.get_profile(pd_id, self.version)
 
         pd_song_list = data["stg_ply_pv_id"].split(",")
         pd_song_difficulty = data["stg_difficulty"].split(",")
@@ -759,14 +597,14 @@ class DivaBase:
         for index, value in enumerate(pd_song_list):
             if "-1" not in pd_song_list[index]:
                 profile_pd_db_song = await self.data.score.get_best_user_score(
-                    data["pd_id"],
+                    pd_id,
                     pd_song_list[index],
                     pd_song_difficulty[index],
                     pd_song_edition[index],
                 )
                 if profile_pd_db_song is None:
                     await self.data.score.put_best_score(
-                        data["pd_id"],
+                        pd_id,
                         self.version,
                         pd_song_list[index],
                         pd_song_difficulty[index],
@@ -782,8 +620,15 @@ class DivaBase:
                         pd_song_worst_cnt[index],
                         pd_song_max_combo[index],
                     )
+                    self.ranking.update(
+                        pd_id,
+                        int(pd_song_list[index]),
+                        int(pd_song_difficulty[index]),
+                        int(pd_song_edition[index]),
+                        int(pd_song_max_score[index]),
+                    )
                     await self.data.score.put_playlog(
-                        data["pd_id"],
+                        pd_id,
                         self.version,
                         pd_song_list[index],
                         pd_song_difficulty[index],
@@ -801,7 +646,7 @@ class DivaBase:
                     )
                 elif int(pd_song_max_score[index]) >= int(profile_pd_db_song["score"]):
                     await self.data.score.put_best_score(
-                        data["pd_id"],
+                        pd_id,
                         self.version,
                         pd_song_list[index],
                         pd_song_difficulty[index],
@@ -817,8 +662,15 @@ class DivaBase:
                         pd_song_worst_cnt[index],
                         pd_song_max_combo[index],
                     )
+                    self.ranking.update(
+                        pd_id,
+                        int(pd_song_list[index]),
+                        int(pd_song_difficulty[index]),
+                        int(pd_song_edition[index]),
+                        int(pd_song_max_score[index]),
+                    )
                     await self.data.score.put_playlog(
-                        data["pd_id"],
+                        pd_id,
                         self.version,
                         pd_song_list[index],
                         pd_song_difficulty[index],
@@ -836,7 +688,7 @@ class DivaBase:
                     )
                 elif int(pd_song_max_score[index]) != int(profile_pd_db_song["score"]):
                     await self.data.score.put_playlog(
-                        data["pd_id"],
+                        pd_id,
                         self.version,
                         pd_song_list[index],
                         pd_song_difficulty[index],
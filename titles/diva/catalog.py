@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import urllib.parse
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from core.data import get_generation
+from .database import DivaData
+
+# Cache namespace invalidated by read.py after importing static data
+DIVA_STATIC_NAMESPACE = "diva_static"
+DIVA_DATA_DIR = "titles/diva/data"
+
+CATALOG_PV_LIST = "pv_list"
+CATALOG_SHOP = "shop"
+CATALOG_CSTMZ_ITM = "cstmz_itm"
+CATALOG_QUEST = "quest"
+
+_QUEST_RAI_STR = "&qrai_str=%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1,%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1,%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1%2C%2D1"
+
+
+class DivaCatalog:
+    """
+    Ready to send pv_list, shop_catalog, cstmz_itm_ctlg and qst_inf payloads.
+    Each one is built the first time it is asked for and then reused for every
+    request with the same version and time_lut, until read.py imports new static
+    data. Payloads built while the database was failing are not kept.
+    """
+
+    def __init__(self, data: DivaData) -> None:
+        self.data = data
+        self.logger = logging.getLogger("diva")
+
+        # (catalog, version, time_lut) -> payload
+        self.payloads: Dict[Tuple[str, int, str], str] = {}
+        self.generation: Optional[int] = None
+        self.lock = asyncio.Lock()
+
+        self.builders: Dict[str, Callable[[int, str], Awaitable[Tuple[str, bool]]]] = {
+            CATALOG_PV_LIST: self.build_pv_list,
+            CATALOG_SHOP: self.build_shop_catalog,
+            CATALOG_CSTMZ_ITM: self.build_cstmz_itm_catalog,
+            CATALOG_QUEST: self.build_quest_info,
+        }
+
+    async def get(self, catalog: str, version: int, time_lut: str) -> str:
+        generation = get_generation(DIVA_STATIC_NAMESPACE, self.data.config)
+        if generation != self.generation:
+            if self.generation is not None:
+                self.logger.info("Static data was reimported, rebuilding catalogs")
+
+            self.payloads.clear()
+            self.generation = generation
+
+        key = (catalog, version, time_lut)
+        payload = self.payloads.get(key)
+        if payload is not None:
+            return payload
+
+        # Requests arriving while a catalog is built wait for it instead of building it again
+        async with self.lock:
+            payload = self.payloads.get(key)
+            if payload is not None:
+                return payload
+
+            payload, complete = await self.builders[catalog](version, time_lut)
+            if complete and generation == self.generation:
+                self.payloads[key] = payload
+
+        return payload
+
+    async def build_pv_list(self, version: int, time_lut: str) -> Tuple[str, bool]:
+        pv_lists = []
+        for i in range(5):
+            with open(f"{DIVA_DATA_DIR}/PvList{i}.dat", encoding="utf-8") as f:
+                pv_lists.append(f.read())
+
+        response = ""
+        response += f"&pvl_lut={time_lut}"
+        response += f"&pv_lst={','.join(pv_lists)}"
+
+        return response, True
+
+    async def build_shop_catalog(self, version: int, time_lut: str) -> Tuple[str, bool]:
+        catalog = ""
+
+        shopList = await self.data.static.get_enabled_shops(version)
+        if not shopList:
+            with open(f"{DIVA_DATA_DIR}/ShopCatalog.dat", encoding="utf-8") as shop:
+                for line in shop.readlines():
+                    line = urllib.parse.quote(line) + ","
+                    catalog += f"{urllib.parse.quote(line)}"
+
+        else:
+            for shop in shopList:
+                line = (
+                    str(shop["shopId"])
+                    + ","
+                    + str(shop["unknown_0"])
+                    + ","
+                    + shop["name"]
+                    + ","
+                    + str(shop["points"])
+                    + ","
+                    + shop["start_date"]
+                    + ","
+                    + shop["end_date"]
+                    + ","
+                    + str(shop["type"])
+                )
+                line = urllib.parse.quote(line) + ","
+                catalog += f"{urllib.parse.quote(line)}"
+
+        catalog = catalog.replace("+", "%20")
+
+        response = f"&shp_ctlg_lut={time_lut}"
+        response += f"&shp_ctlg={catalog[:-3]}"
+
+        return response, shopList is not None
+
+    async def build_cstmz_itm_catalog(self, version: int, time_lut: str) -> Tuple[str, bool]:
+        catalog = ""
+
+        itemList = await self.data.static.get_enabled_items(version)
+        if not itemList:
+            with open(f"{DIVA_DATA_DIR}/ItemCatalog.dat", encoding="utf-8") as item:
+                for line in item.readlines():
+                    line = urllib.parse.quote(line) + ","
+                    catalog += f"{urllib.parse.quote(line)}"
+
+        else:
+            for item in itemList:
+                line = (
+                    str(item["itemId"])
+                    + ","
+                    + str(item["unknown_0"])
+                    + ","
+                    + item["name"]
+                    + ","
+                    + str(item["points"])
+                    + ","
+                    + item["start_date"]
+                    + ","
+                    + item["end_date"]
+                    + ","
+                    + str(item["type"])
+                )
+                line = urllib.parse.quote(line) + ","
+                catalog += f"{urllib.parse.quote(line)}"
+
+        catalog = catalog.replace("+", "%20")
+
+        response = f"&cstmz_itm_ctlg_lut={time_lut}"
+        response += f"&cstmz_itm_ctlg={catalog[:-3]}"
+
+        return response, itemList is not None
+
+    async def build_quest_info(self, version: int, time_lut: str) -> Tuple[str, bool]:
+        quest = ""
+
+        questList = await self.data.static.get_enabled_quests(version)
+        if not questList:
+            with open(f"{DIVA_DATA_DIR}/QuestInfo.dat", encoding="utf-8") as shop:
+                for line in shop.readlines():
+                    quest += f"{urllib.parse.quote(line)},"
+
+            response = ""
+            response += f"&qi_lut={time_lut}"
+            response += f"&qhi_str={quest[:-1]}"
+        else:
+            for quests in questList:
+                line = (
+                    str(quests["questId"])
+                    + ","
+                    + str(quests["quest_order"])
+                    + ","
+                    + str(quests["kind"])
+                    + ","
+                    + str(quests["unknown_0"])
+                    + ","
+                    + quests["start_datetime"]
+                    + ","
+                    + quests["end_datetime"]
+                    + ","
+                    + quests["name"]
+                    + ","
+                    + str(quests["unknown_1"])
+                    + ","
+                    + str(quests["unknown_2"])
+                    + ","
+                    + str(quests["quest_enable"])
+                )
+                quest += f"{urllib.parse.quote(line)}%0A,"
+
+            responseline = f"{quest[:-1]},"
+            for i in range(len(questList), 59):
+                responseline += "%2A%2A%2A%0A,"
+
+            response = ""
+            response += f"&qi_lut={time_lut}"
+            response += f"&qhi_str={responseline}%2A%2A%2A"
+
+        response += _QUEST_RAI_STR
+
+        return response, questList is not None
+
+
+_catalog: Optional[DivaCatalog] = None
+
+
+def get_catalog(data: DivaData) -> DivaCatalog:
+    """
+    The catalog shared by every DIVA handler in this process
+    """
+    global _catalog
+    if _catalog is None:
+        _catalog = DivaCatalog(data)
+
+    return _catalog
@@ -0,0 +1,112 @@
+import time
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from .database import DivaData
+
+# Seconds a chart's scores are used before loading them again, so scores
+# written by other server processes show up eventually
+RANK_INDEX_REFRESH = 300
+# Editions every pv_pd entry reports on, 0=ORIGINAL, 1=EXTRA
+EDITIONS = (0, 1)
+
+
+class DivaChartScores:
+    def __init__(self) -> None:
+        # Ascending best scores of every user on the chart
+        self.scores: List[int] = []
+        self.users: Dict[int, int] = {}
+        self.loaded = time.monotonic()
+
+    def add(self, user_id: int, score: int) -> None:
+        old = self.users.get(user_id)
+        if old is not None:
+            if score <= old:
+                return
+
+            del self.scores[bisect_left(self.scores, old)]
+
+        self.users[user_id] = score
+        insort(self.scores, score)
+
+    def rank(self, user_id: int) -> Optional[int]:
+        score = self.users.get(user_id)
+        if score is None:
+            return None
+
+        # Same as counting the best scores at or above the user's one
+        return len(self.scores) - bisect_left(self.scores, score)
+
+
+class DivaScoreRankIndex:
+    """
+    Countrywide ranking of every (pv, difficulty, edition) chart, kept as a sorted
+    list of best scores. Charts are loaded the first time a pv_pd request asks for
+    them, all of a request's charts with one query, and stage results are added
+    as they come in.
+    """
+
+    def __init__(self, data: DivaData) -> None:
+        self.data = data
+        self.charts: Dict[Tuple[int, int, int], DivaChartScores] = {}
+
+    async def load(self, pv_ids: List[int], difficulty: int) -> None:
+        now = time.monotonic()
+        missing = [
+            pv_id for pv_id in set(pv_ids)
+            if any(
+                (pv_id, difficulty, edition) not in self.charts
+                or now - self.charts[(pv_id, difficulty, edition)].loaded > RANK_INDEX_REFRESH
+                for edition in EDITIONS
+            )
+        ]
+        if not missing:
+            return
+
+        rows = await self.data.score.get_chart_scores(missing, difficulty)
+        if rows is None:
+            return
+
+        charts = {(pv_id, difficulty, edition): DivaChartScores() for pv_id in missing for edition in EDITIONS}
+        for row in rows:
+            key = (row["pv_id"], difficulty, row["edition"])
+            if key not in charts:
+                charts[key] = DivaChartScores()
+
+            # The score table holds one best score per user and chart, so no duplicates to check for
+            charts[key].users[row["user"]] = row["score"]
+            charts[key].scores.append(row["score"])
+
+        for chart in charts.values():
+            chart.scores.sort()
+
+        self.charts.update(charts)
+
+    def rank(self, user_id: int, pv_id: int, difficulty: int, edition: int) -> Optional[int]:
+        chart = self.charts.get((pv_id, difficulty, edition))
+        if chart is None:
+            return None
+
+        return chart.rank(user_id)
+
+    def update(self, user_id: int, pv_id: int, difficulty: int, edition: int, score: int) -> None:
+        """
+        Add a new best score, charts that aren't loaded yet pick it up when they are
+        """
+        chart = self.charts.get((pv_id, difficulty, edition))
+        if chart is not None:
+            chart.add(user_id, score)
+
+
+_rank_index: Optional[DivaScoreRankIndex] = None
+
+
+def get_rank_index(data: DivaData) -> DivaScoreRankIndex:
+    """
+    The ranking index shared by every DIVA handler in this process
+    """
+    global _rank_index
+    if _rank_index is None:
+        _rank_index = DivaScoreRankIndex(data)
+
+    return _rank_index
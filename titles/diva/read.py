@@ -4,8 +4,10 @@ import urllib
 
 from read import BaseReader
 from core.config import CoreConfig
+from core.data import invalidate
 from titles.diva.database import DivaData
 from titles.diva.const import DivaConstants
+from titles.diva.catalog import DIVA_STATIC_NAMESPACE
 
 
 class DivaReader(BaseReader):
@@ -55,6 +57,9 @@ class DivaReader(BaseReader):
             for dir in opt_dirs:
                 await self.read_rom(f"{dir}/rom")
 
+        # Running servers keep the shop, customize item and quest catalogs prebuilt, tell them to rebuild
+        invalidate(DIVA_STATIC_NAMESPACE, self.config)
+
     async def read_ram(self, ram_root_dir: str) -> None:
         self.logger.info(f"Read RAM from {ram_root_dir}")
 
@@ -183,6 +183,52 @@ class DivaScoreData(BaseData):
             return None
         return result.fetchone()
 
+    async def get_best_user_scores(
+        self, user_id: int, pv_ids: List[int], difficulty: int
+    ) -> Optional[List[Row]]:
+        """
+        Best scores of a user for many PVs at once, every edition included
+        """
+        if not pv_ids:
+            return []
+
+        sql = score.select(
+            and_(
+                score.c.user == user_id,
+                score.c.pv_id.in_(pv_ids),
+                score.c.difficulty == difficulty,
+            )
+        )
+
+        result = await self.execute(sql)
+        if result is None:
+            return None
+        return result.fetchall()
+
+    async def get_chart_scores(
+        self, pv_ids: List[int], difficulty: int
+    ) -> Optional[List[Row]]:
+        """
+        Every user's best score on the given charts, used to build the ranking index
+        """
+        if not pv_ids:
+            return []
+
+        sql = select(
+            [score.c.user, score.c.pv_id, score.c.edition, score.c.score]
+        ).where(
+            and_(
+                score.c.pv_id.in_(pv_ids),
+                score.c.difficulty == difficulty,
+                score.c.score.isnot(None),
+            )
+        )
+
+        result = await self.execute(sql)
+        if result is None:
+            return None
+        return result.fetchall()
+
     async def get_top3_scores(
         self, pv_id: int, difficulty: int, edition: int
     ) -> Optional[List[Row]]:
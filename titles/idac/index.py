@@ -13,6 +13,7 @@ import asyncio
 
 from core.config import CoreConfig
 from core.title import BaseServlet, JSONResponseNoASCII
+from core.metrics import PHASE_DECODE, PHASE_ENCODE, PHASE_HANDLER, mark_request_phase, set_request_labels
 from core.utils import Utils
 from titles.idac.base import IDACBase
 from titles.idac.season2 import IDACSeason2
@@ -91,6 +92,7 @@ class IDACServlet(BaseServlet):
 
     async def render_POST(self, request: Request) -> bytes:
         req_raw = await request.body()
+        mark_request_phase(PHASE_DECODE)
         internal_ver = 0
         version: int = request.path_params.get('version')
         category: str = request.path_params.get('category')
@@ -119,6 +121,9 @@ class IDACServlet(BaseServlet):
             self.logger.warning(f"Unhandled v{version} request {endpoint}")
             return JSONResponse('{"status_code": "0"}')
 
+        set_request_labels(IDACConstants.GAME_CODE, internal_ver, func_to_find)
+        mark_request_phase(PHASE_HANDLER)
+
         resp = None
         try:
             handler = getattr(self.versions[internal_ver], func_to_find)
@@ -129,6 +134,8 @@ class IDACServlet(BaseServlet):
             self.logger.error(f"Error handling v{version} method {endpoint} - {e}")
             return JSONResponse('{"status_code": "0"}')
 
+        mark_request_phase(PHASE_ENCODE)
+
         if resp is None:
             resp = {"status_code": "0"}
 
@@ -1,4 +1,4 @@
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 from sqlalchemy import (
     Table,
     Column,
@@ -13,7 +13,10 @@ from sqlalchemy.engine import Row
 from sqlalchemy.sql import func, select
 from sqlalchemy.dialects.mysql import insert
 
+from core.data.cache import async_cached, invalidate
 from core.data.schema import BaseData, metadata
+from core.data.schema.arcade import arcade
+from titles.idac.schema.profile import profile
 
 car = Table(
     "idac_user_car",
@@ -573,6 +576,112 @@ class IDACItemData(BaseData):
             return None
         return result.fetchall()
 
+    @async_cached(lifetime=30, namespace="idac_ranking")
+    async def get_time_trial_rankings_by_courses(
+        self, version: int, course_ids: Tuple[int, ...], limit: int = 10
+    ) -> Optional[List[Row]]:
+        """
+        Top `limit` time trial entries for every course in `course_ids`, each row
+        already joined with the driver's username, country and store name.
+        """
+        best = (
+            select(
+                trial.c.course_id,
+                trial.c.user,
+                func.min(trial.c.goal_time).label("min_goal_time"),
+            )
+            .where(and_(trial.c.version == version, trial.c.course_id.in_(course_ids)))
+            .group_by(trial.c.course_id, trial.c.user)
+            .subquery()
+        )
+
+        ranked = (
+            select(
+                trial,
+                profile.c.username,
+                profile.c.country,
+                arcade.c.name.label("store_name"),
+                func.row_number()
+                .over(partition_by=trial.c.course_id, order_by=trial.c.goal_time)
+                .label("course_rank"),
+            )
+            .select_from(
+                trial.join(
+                    best,
+                    and_(
+                        trial.c.course_id == best.c.course_id,
+                        trial.c.user == best.c.user,
+                        trial.c.goal_time == best.c.min_goal_time,
+                    ),
+                )
+                .join(
+                    profile,
+                    and_(profile.c.user == trial.c.user, profile.c.version == version),
+                )
+                .outerjoin(arcade, arcade.c.id == profile.c.store)
+            )
+            .where(trial.c.version == version)
+            .subquery()
+        )
+
+        sql = (
+            select(ranked)
+            .where(ranked.c.course_rank <= limit)
+            .order_by(ranked.c.course_id, ranked.c.course_rank)
+        )
+
+        result = await self.execute(sql)
+        if result is None:
+            return None
+        return result.fetchall()
+
+    @async_cached(lifetime=30, namespace="idac_ranking")
+    async def get_time_trial_best_cars_with_profiles_by_course(
+        self, version: int, course_id: int
+    ) -> Optional[List[Row]]:
+        """
+        Same as get_time_trial_best_cars_by_course, joined with the username,
+        country and store name of whoever set each record.
+        """
+        best = (
+            select(
+                trial.c.style_car_id,
+                func.min(trial.c.goal_time).label("min_goal_time"),
+            )
+            .where(and_(trial.c.version == version, trial.c.course_id == course_id))
+            .group_by(trial.c.style_car_id)
+            .subquery()
+        )
+
+        sql = (
+            select(
+                trial,
+                profile.c.username,
+                profile.c.country,
+                arcade.c.name.label("store_name"),
+            )
+            .select_from(
+                trial.join(
+                    best,
+                    and_(
+                        trial.c.style_car_id == best.c.style_car_id,
+                        trial.c.goal_time == best.c.min_goal_time,
+                    ),
+                )
+                .join(
+                    profile,
+                    and_(profile.c.user == trial.c.user, profile.c.version == version),
+                )
+                .outerjoin(arcade, arcade.c.id == profile.c.store)
+            )
+            .where(and_(trial.c.version == version, trial.c.course_id == course_id))
+        )
+
+        result = await self.execute(sql)
+        if result is None:
+            return None
+        return result.fetchall()
+
     async def get_time_trial_best_ranking_by_course(
         self, version: int, aime_id: int, course_id: int
     ) -> Optional[Row]:
@@ -874,6 +983,8 @@ class IDACItemData(BaseData):
         if result is None:
             self.logger.warning(f"put_time_trial: Failed to update! aime_id: {aime_id}")
             return None
+
+        invalidate("idac_ranking", self.config)
         return result.lastrowid
 
     async def put_challenge(self, aime_id: int, challenge_data: Dict) -> Optional[int]:
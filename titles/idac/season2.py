@@ -6,6 +6,7 @@ import json
 import logging
 
 from core.config import CoreConfig
+from core.data import fetch_concurrently
 from core.utils import Utils
 from titles.idac.const import IDACConstants
 from titles.idac.config import IDACConfig
@@ -386,57 +387,49 @@ class IDACSeason2(IDACBase):
         return time_release_data
 
     async def handle_advertise_getrankingdata_request(self, data: Dict, headers: Dict):
-        best_data = []
-        for last_update in data.get("last_update_date"):
-            course_id = last_update.get("course_id")
-
-            ranking = await self.data.item.get_time_trial_ranking_by_course(
-                self.version, course_id
-            )
-            ranking_data = []
-            for i, rank in enumerate(ranking):
-                user_id = rank["user"]
-
-                # get the username, country and store from the profile
-                profile = await self.data.profile.get_profile(user_id, self.version)
-                arcade = await self.data.arcade.get_arcade(profile["store"])
-
-                if arcade is None:
-                    arcade = {}
-                    arcade["name"] = self.core_cfg.server.name
-
-                # should never happen
-                if profile is None:
-                    continue
+        course_ids = tuple(
+            int(last_update.get("course_id"))
+            for last_update in data.get("last_update_date")
+        )
 
-                ranking_data.append(
-                    {
-                        "course_id": course_id,
-                        "rank": i + 1,
-                        "username": profile["username"],
-                        "value": rank["goal_time"],
-                        # gat the store name from the profile
-                        "store": arcade["name"],
-                        # get the country id from the profile, 9 is JPN
-                        "country": profile["country"],
-                        "style_car_id": rank["style_car_id"],
-                        # convert the datetime to a timestamp
-                        "play_dt": int(rank["play_dt"].timestamp()),
-                        "section_time_1": rank["section_time_1"],
-                        "section_time_2": rank["section_time_2"],
-                        "section_time_3": rank["section_time_3"],
-                        "section_time_4": rank["section_time_4"],
-                        "mission": rank["mission"],
-                    }
-                )
+        # fetch every requested course ranking, joined with the profiles, in one go
+        rankings = await self.data.item.get_time_trial_rankings_by_courses(
+            self.version, course_ids
+        )
+        if rankings is None:
+            rankings = []
 
-            best_data.append(
+        ranking_data = {course_id: [] for course_id in course_ids}
+        for rank in rankings:
+            ranking_data[rank["course_id"]].append(
                 {
-                    "course_id": course_id,
-                    "ranking_data": ranking_data,
+                    "course_id": rank["course_id"],
+                    "rank": rank["course_rank"],
+                    "username": rank["username"],
+                    "value": rank["goal_time"],
+                    # gat the store name from the profile
+                    "store": rank["store_name"] or self.core_cfg.server.name,
+                    # get the country id from the profile, 9 is JPN
+                    "country": rank["country"],
+                    "style_car_id": rank["style_car_id"],
+                    # convert the datetime to a timestamp
+                    "play_dt": int(rank["play_dt"].timestamp()),
+                    "section_time_1": rank["section_time_1"],
+                    "section_time_2": rank["section_time_2"],
+                    "section_time_3": rank["section_time_3"],
+                    "section_time_4": rank["section_time_4"],
+                    "mission": rank["mission"],
                 }
             )
 
+        best_data = [
+            {
+                "course_id": course_id,
+                "ranking_data": ranking_data[course_id],
+            }
+            for course_id in course_ids
+        ]
+
         return {
             "status_code": "0",
             "national_best_data": best_data,
@@ -592,8 +585,38 @@ class IDACSeason2(IDACBase):
     async def handle_user_getdata_request(self, data: Dict, headers: Dict):
         user_id = int(headers["session"])
 
+        # none of these depend on each other, so load them all at once
+        (
+            p,
+            r,
+            a,
+            s,
+            c,
+            tickets,
+            courses,
+            theory,
+            theory_courses,
+            theory_partners,
+            theory_running,
+            vs_info,
+            cars,
+        ) = await fetch_concurrently(
+            self.data.profile.get_profile(user_id, self.version),
+            self.data.profile.get_profile_rank(user_id, self.version),
+            self.data.profile.get_profile_avatar(user_id),
+            self.data.profile.get_profile_stock(user_id, self.version),
+            self.data.profile.get_profile_config(user_id),
+            self.data.item.get_tickets(user_id),
+            self.data.item.get_courses(user_id),
+            self.data.profile.get_profile_theory(user_id, self.version),
+            self.data.item.get_theory_courses(user_id),
+            self.data.item.get_theory_partners(user_id),
+            self.data.item.get_theory_running(user_id),
+            self.data.item.get_vs_infos(user_id),
+            self.data.item.get_cars(self.version, user_id, only_pickup=True),
+        )
+
         # get the user's profile, can never be None
-        p = await self.data.profile.get_profile(user_id, self.version)
         user_data = p._asdict()
         arcade = await self.data.arcade.get_arcade(user_data["store"])
 
@@ -608,7 +631,6 @@ class IDACSeason2(IDACBase):
         user_data["create_date"] = int(user_data["create_date"].timestamp())
 
         # get the user's rank
-        r = await self.data.profile.get_profile_rank(user_id, self.version)
         rank_data = r._asdict()
         del rank_data["id"]
         del rank_data["user"]
@@ -618,28 +640,23 @@ class IDACSeason2(IDACBase):
         user_data["mode_rank_data"] = rank_data
 
         # get the user's avatar
-        a = await self.data.profile.get_profile_avatar(user_id)
         avatar_data = a._asdict()
         del avatar_data["id"]
         del avatar_data["user"]
 
         # get the user's stock
-        s = await self.data.profile.get_profile_stock(user_id, self.version)
         stock_data = s._asdict()
         del stock_data["id"]
         del stock_data["user"]
         del stock_data["version"]
 
         # get the user's config
-        c = await self.data.profile.get_profile_config(user_id)
         config_data = c._asdict()
         del config_data["id"]
         del config_data["user"]
         config_data["id"] = config_data.pop("config_id")
 
         # get the user's ticket
-        tickets: list = await self.data.item.get_tickets(user_id)
-
         """
         ticket_id:
         3 = Car Dressup Points
@@ -658,7 +675,6 @@ class IDACSeason2(IDACBase):
             )
 
         # get the user's course, required for the "course proeficiency"
-        courses = await self.data.item.get_courses(user_id)
         course_data = []
         for course in courses:
             course_data.append(
@@ -673,7 +689,6 @@ class IDACSeason2(IDACBase):
 
         # get the profile theory data
         theory_data = {}
-        theory = await self.data.profile.get_profile_theory(user_id, self.version)
         if theory is not None:
             theory_data = theory._asdict()
             del theory_data["id"]
@@ -682,7 +697,6 @@ class IDACSeason2(IDACBase):
 
         # get the users theory course data
         theory_course_data = []
-        theory_courses = await self.data.item.get_theory_courses(user_id)
         for course in theory_courses:
             tmp = course._asdict()
             del tmp["id"]
@@ -693,7 +707,6 @@ class IDACSeason2(IDACBase):
 
         # get the users theory partner data
         theory_partner_data = []
-        theory_partners = await self.data.item.get_theory_partners(user_id)
         for partner in theory_partners:
             tmp = partner._asdict()
             del tmp["id"]
@@ -703,7 +716,6 @@ class IDACSeason2(IDACBase):
 
         # get the users theory running pram data
         theory_running_pram_data = []
-        theory_running = await self.data.item.get_theory_running(user_id)
         for running in theory_running:
             tmp = running._asdict()
             del tmp["id"]
@@ -713,7 +725,6 @@ class IDACSeason2(IDACBase):
 
         # get the users vs info data
         vs_info_data = []
-        vs_info = await self.data.item.get_vs_infos(user_id)
         for vs in vs_info:
             vs_info_data.append(
                 {
@@ -737,7 +748,6 @@ class IDACSeason2(IDACBase):
             )
 
         # get the user's car
-        cars = await self.data.item.get_cars(self.version, user_id, only_pickup=True)
         fulltune_count = 0
         total_car_parts_count = 0
         car_data = []
@@ -969,32 +979,21 @@ class IDACSeason2(IDACBase):
             style_car_id = car["style_car_id"]
 
         # Not sure if this is actually correct
-        ranking = await self.data.item.get_time_trial_ranking_by_course(
-            self.version, course_id
+        ranking = await self.data.item.get_time_trial_rankings_by_courses(
+            self.version, (course_id,)
         )
-        course_best_data = []
-        for i, rank in enumerate(ranking):
-            car_user_id = rank["user"]
-
-            # get the username, country and store from the profile
-            profile = await self.data.profile.get_profile(car_user_id, self.version)
-            arcade = await self.data.arcade.get_arcade(profile["store"])
-
-            if arcade is None:
-                arcade = {}
-                arcade["name"] = self.core_cfg.server.name
-
-            # should never happen
-            if profile is None:
-                continue
+        if ranking is None:
+            ranking = []
 
+        course_best_data = []
+        for rank in ranking:
             course_best_data.append(
                 {
                     "course_id": course_id,
-                    "rank": i + 1,
-                    "member": car_user_id,
+                    "rank": rank["course_rank"],
+                    "member": rank["user"],
                     "value": rank["goal_time"],
-                    "store": arcade["name"],
+                    "store": rank["store_name"] or self.core_cfg.server.name,
                     # use car_id from request?
                     "car_id": 0,
                     "style_car_id": rank["style_car_id"],
@@ -1007,32 +1006,21 @@ class IDACSeason2(IDACBase):
                 }
             )
 
-        best_cars = await self.data.item.get_time_trial_best_cars_by_course(
+        best_cars = await self.data.item.get_time_trial_best_cars_with_profiles_by_course(
             self.version, course_id
         )
+        if best_cars is None:
+            best_cars = []
 
         car_list = []
         for i, rank in enumerate(best_cars):
-            car_user_id = rank["user"]
-            # get the username, country and store from the profile
-            profile = await self.data.profile.get_profile(car_user_id, self.version)
-            arcade = await self.data.arcade.get_arcade(profile["store"])
-
-            if arcade is None:
-                arcade = {}
-                arcade["name"] = self.core_cfg.server.name
-
-            # should never happen
-            if profile is None:
-                continue
-
             car_list.append(
                 {
                     "rank": i + 1,
                     # no clue
-                    "member": car_user_id,
+                    "member": rank["user"],
                     "value": rank["goal_time"],
-                    "store": arcade["name"],
+                    "store": rank["store_name"] or self.core_cfg.server.name,
                     # use car_id from request?
                     "car_id": 0,
                     "style_car_id": rank["style_car_id"],
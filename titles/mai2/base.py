@@ -2,17 +2,19 @@ import itertools
 import logging
 from base64 import b64decode
 from datetime import datetime, timedelta
-from os import W_OK, access, mkdir, path
+from os import W_OK, access
 from typing import Any, Dict, List
 
 import pytz
 
 from core.config import CoreConfig
+from core.data import fetch_concurrently
 from core.utils import Utils
 
 from .config import Mai2Config
 from .const import Mai2Constants
 from .database import Mai2Data
+from .photo import PHOTO_CHUNK_SIZE, PHOTO_MAX_CHUNKS, get_photo_store
 
 
 class Mai2Base:
@@ -206,8 +208,10 @@ class Mai2Base:
         return {"returnCode": 1, "apiName": "UpsertClientTestmodeApi"}
 
     async def handle_get_user_preview_api_request(self, data: Dict) -> Dict:
-        p = await self.data.profile.get_profile_detail(data["userId"], self.version, False)
-        w = await self.data.profile.get_web_option(data["userId"], self.version)
+        p, w = await fetch_concurrently(
+            self.data.profile.get_profile_detail(data["userId"], self.version, False),
+            self.data.profile.get_web_option(data["userId"], self.version),
+        )
         if p is None or w is None:
             return {}  # Register
         profile = p._asdict()
@@ -951,15 +955,15 @@ class Mai2Base:
             self.logger.warning(f"Sent extra chunks ({div_num} >= {div_len})")
             return {'returnCode': 0, 'apiName': 'UploadUserPhotoApi'}
 
-        if div_len >= 100:
-            self.logger.warning(f"Photo too large ({div_len} * 10240 = {div_len * 10240} bytes)")
+        if div_len >= PHOTO_MAX_CHUNKS:
+            self.logger.warning(f"Photo too large ({div_len} * {PHOTO_CHUNK_SIZE} = {div_len * PHOTO_CHUNK_SIZE} bytes)")
             return {'returnCode': 0, 'apiName': 'UploadUserPhotoApi'}
 
         ret_code = order_id + 1
         photo_chunk = b64decode(div_data)
 
-        if len(photo_chunk) > 10240 or (len(photo_chunk) < 10240 and div_num + 1 != div_len):
-            self.logger.warning(f"Incorrect data size after decoding (Expected 10240, got {len(photo_chunk)})")
+        if len(photo_chunk) > PHOTO_CHUNK_SIZE or (len(photo_chunk) < PHOTO_CHUNK_SIZE and div_num + 1 != div_len):
+            self.logger.warning(f"Incorrect data size after decoding (Expected {PHOTO_CHUNK_SIZE}, got {len(photo_chunk)})")
             return {'returnCode': 0, 'apiName': 'UploadUserPhotoApi'}
 
         photo_data = await self.data.profile.get_user_photo_by_user_playlog_track(user_id, playlog_id, track_num)
@@ -969,26 +973,14 @@ class Mai2Base:
         else:
             photo_id = photo_data['id']
 
-        out_folder = f"{self.game_config.uploads.photos_dir}/{photo_id}"
-        out_file = f"{out_folder}/{div_num}_{div_len - 1}.bin"
-
-        if not path.exists(out_folder):
-            mkdir(out_folder)
-
-        if not access(out_folder, W_OK):
-            self.logger.error(f"Cannot access {out_folder}")
+        if not access(self.game_config.uploads.photos_dir, W_OK):
+            self.logger.error(f"Cannot access {self.game_config.uploads.photos_dir}")
             return {'returnCode': 0, 'apiName': 'UploadUserPhotoApi'}
 
-        if path.exists(out_file):
-            self.logger.warning(f"Photo chunk {out_file} already exists, skipping")
-
-        else:
-            with open(out_file, "wb") as f:
-                written = f.write(photo_chunk)
-
-            if written != len(photo_chunk):
-                self.logger.error(f"Writing {out_file} failed! Wrote {written} bytes, expected {photo_chunk} bytes")
-                return {'returnCode': 0, 'apiName': 'UploadUserPhotoApi'}
+        # Written into the photo's file at its offset, the JPEG is finished when the last chunk arrives
+        photos = get_photo_store(self.game_config.uploads.photos_dir, self.data)
+        if not await photos.put_chunk(photo_id, div_num, div_len, photo_chunk):
+            return {'returnCode': 0, 'apiName': 'UploadUserPhotoApi'}
 
         return {'returnCode': ret_code, 'apiName': 'UploadUserPhotoApi'}
 
@@ -6,6 +6,7 @@ from typing import Any, Dict, List
 import pytz
 
 from core.config import CoreConfig
+from core.data import fetch_concurrently
 from core.utils import Utils
 from titles.mai2.base import Mai2Base
 from titles.mai2.config import Mai2Config
@@ -87,8 +88,10 @@ class Mai2DX(Mai2Base):
         }
 
     async def handle_get_user_preview_api_request(self, data: Dict) -> Dict:
-        p = await self.data.profile.get_profile_detail(data["userId"], self.version)
-        o = await self.data.profile.get_profile_option(data["userId"], self.version)
+        p, o = await fetch_concurrently(
+            self.data.profile.get_profile_detail(data["userId"], self.version),
+            self.data.profile.get_profile_option(data["userId"], self.version),
+        )
         if p is None or o is None:
             return {}  # Register
         profile = p._asdict()
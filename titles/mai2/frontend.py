@@ -2,19 +2,18 @@ from typing import List
 from starlette.routing import Route, Mount
 from starlette.requests import Request
 from starlette.responses import Response, RedirectResponse, FileResponse
-from os import path, walk, remove
+from os import path
 import yaml
 import jinja2
-from datetime import datetime, timedelta
-from PIL import ImageFile
+from datetime import datetime
 import re
-import shutil
 
 from core.frontend import FE_Base, UserSession, PermissionOffset
 from core.config import CoreConfig
 from .database import Mai2Data
 from .config import Mai2Config
 from .const import Mai2Constants
+from .photo import PHOTO_EXPIRE_DAYS, get_photo_store, is_photo_expired
 
 class Mai2Frontend(FE_Base):
     def __init__(
@@ -159,17 +158,12 @@ class Mai2Frontend(FE_Base):
 
             photos = await self.data.profile.get_user_photos_by_user(usr_sesh.user_id)
 
-            photos_fixed = []
-            for photo in photos:
-                if datetime.now().timestamp() > (photo['when_upload'] + timedelta(days=7)).timestamp():
-                    await self.data.profile.delete_user_photo_by_id(photo['id'])
-
-                    if path.exists(f"{self.game_cfg.uploads.photos_dir}/{photo['id']}.jpeg"):
-                        remove(f"{self.game_cfg.uploads.photos_dir}/{photo['id']}.jpeg")
-
-                    if path.exists(f"{self.game_cfg.uploads.photos_dir}/{photo['id']}"):
-                        shutil.rmtree(f"{self.game_cfg.uploads.photos_dir}/{photo['id']}")
+            # Expired photos are deleted by the sweeper, hide the ones it has not gotten to yet
+            get_photo_store(self.game_cfg.uploads.photos_dir, self.data).start_sweeper()
 
+            photos_fixed = []
+            for photo in photos or []:
+                if is_photo_expired(photo['when_upload']):
                     continue
 
                 photos_fixed.append({
@@ -184,7 +178,7 @@ class Mai2Frontend(FE_Base):
                 game_list=self.environment.globals["game_list"],
                 sesh=vars(usr_sesh),
                 photos=photos_fixed,
-                expire_days=7,
+                expire_days=PHOTO_EXPIRE_DAYS,
             ), media_type="text/html; charset=utf-8")
         else:
             return RedirectResponse("/gate/", 303)
@@ -368,55 +362,13 @@ class Mai2Frontend(FE_Base):
         if photo_info["user"] != usr_sesh.user_id:
             return Response(status_code=403)
 
-        out_folder = f"{self.game_cfg.uploads.photos_dir}/{photo_id}"
-
-        if datetime.now().timestamp() > (photo_info['when_upload'] + timedelta(days=7)).timestamp():
-            await self.data.profile.delete_user_photo_by_id(photo_info['id'])
-            if path.exists(f"{out_folder}.jpeg"):
-                remove(f"{out_folder}.jpeg")
-
-            if path.exists(f"{out_folder}"):
-                shutil.rmtree(out_folder)
-
+        if is_photo_expired(photo_info['when_upload']):
             return Response(status_code=404)
 
-        if path.exists(f"{out_folder}"):
-            self.logger.info(f"Photo Path Exist.")
-            max_idx = 0
-            p = ImageFile.Parser()
-            for _, _, files in walk(f"{out_folder}"):
-                if not files:
-                    break
-
-                matcher = re.match(r"^(\d+)_(\d+)\.bin$", files[0])
-                if not matcher:
-                    break
-
-                max_idx = int(matcher.groups()[1])
-
-                if max_idx + 1 != len(files):
-                    self.logger.error(f"Expected {max_idx + 1} files, found {len(files)}")
-                    max_idx = 0
-                    break
-
-            if max_idx == 0:
-                return Response(status_code=500)
-
-            for i in range(max_idx + 1):
-                with open(f"{out_folder}/{i}_{max_idx}.bin", "rb") as f:
-                    p.feed(f.read())
-            try:
-                im = p.close()
-                im.save(f"{out_folder}.jpeg")
-                self.logger.info(f"{out_folder}.jpeg generated.")
-
-            except Exception as e:
-                self.logger.error(f"{photo_id} failed PIL validation! - {e}")
-
-            shutil.rmtree(out_folder)
+        photos = get_photo_store(self.game_cfg.uploads.photos_dir, self.data)
+        await photos.assemble_legacy(photo_id)
 
-        if path.exists(f"{out_folder}.jpeg"):
-            self.logger.info(f"{out_folder}.jpeg exists")
-            return FileResponse(f"{out_folder}.jpeg")
+        if path.exists(photos.jpeg_path(photo_id)):
+            return FileResponse(photos.jpeg_path(photo_id), media_type="image/jpeg")
 
         return Response(status_code=404)
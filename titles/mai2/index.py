@@ -10,14 +10,14 @@ import string
 from logging.handlers import TimedRotatingFileHandler
 from os import path, mkdir
 from typing import Tuple, List, Dict
-from Crypto.Hash import MD5
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad
 
 from core.config import CoreConfig
-from core.crypto import CipherAES
+from core.crypto import CipherAES, EndpointHashJob, build_endpoint_hash_tables
+from core.metrics import PHASE_DECODE, PHASE_ENCODE, PHASE_HANDLER, UNKNOWN_ENDPOINT, mark_request_phase, set_request_labels
 from core.utils import Utils
-from core.title import BaseServlet
+from core.title import BaseServlet, DispatchTable
 from .config import Mai2Config
 from .const import Mai2Constants
 from .base import Mai2Base
@@ -98,7 +98,14 @@ class Mai2Servlet(BaseServlet):
                 level=self.game_cfg.server.loglevel, logger=self.logger, fmt=log_fmt_str
             )
             self.logger.initted = True
-        
+
+        # One handler instance per version, built once and shared by every request
+        self.dispatch = [
+            DispatchTable(version(core_cfg, self.game_cfg)) if version is not None else None
+            for version in self.versions
+        ]
+
+        hash_jobs: Dict[int, EndpointHashJob] = {}
         for version, keys in self.game_cfg.crypto.keys.items():
             if version < Mai2Constants.VER_MAIMAI_DX:
                 continue
@@ -106,28 +113,22 @@ class Mai2Servlet(BaseServlet):
             if len(keys) < 3:
                 continue
 
-            self.hash_table[version] = {}
             method_list = [
                 method
                 for method in dir(self.versions[version])
                 if not method.startswith("__")
             ]
 
-            for method in method_list:
-                # handle_method_api_request -> HandleMethodApiRequest
-                # remove the first 6 chars and the final 7 chars to get the canonical
-                # endpoint name.
-                method_fixed = inflection.camelize(method)[6:-7]
-                hash = MD5.new((method_fixed + keys[2]).encode())
+            # handle_method_api_request -> HandleMethodApiRequest
+            # remove the first 6 chars and the final 7 chars to get the canonical
+            # endpoint name.
+            names = tuple(inflection.camelize(method)[6:-7] for method in method_list)
+            hash_jobs[version] = EndpointHashJob("md5", names, keys[2].encode())
 
-                # truncate unused bytes like the game does
-                hashed_name = hash.hexdigest()
-                self.hash_table[version][hashed_name] = method_fixed
+        self.hash_table = build_endpoint_hash_tables(hash_jobs, self.core_cfg.server.cache_dir)
 
-                self.logger.debug(
-                    "Hashed v%s method %s with %s to get %s",
-                    version, method_fixed, keys[2], hashed_name
-                )
+        for version, table in self.hash_table.items():
+            self.logger.debug("Hashed %s v%s methods with %s", len(table), version, hash_jobs[version].key)
 
 
     @classmethod
@@ -212,6 +213,7 @@ class Mai2Servlet(BaseServlet):
             return Response(zlib.compress(b'{"returnCode": "1"}'))
         
         req_raw = await request.body()
+        mark_request_phase(PHASE_DECODE)
         internal_ver = 0
         client_ip = Utils.get_ip_addr(request)
         
@@ -256,22 +258,24 @@ class Mai2Servlet(BaseServlet):
         self.logger.info(f"v{version} {endpoint} request from {client_ip}")
         self.logger.debug(req_data)
 
-        func_to_find = "handle_" + inflection.underscore(endpoint) + "_request"
-        handler_cls = self.versions[internal_ver](self.core_cfg, self.game_cfg)
+        dispatch = self.dispatch[internal_ver]
+        handler = dispatch.get(endpoint) if dispatch is not None else None
+        mark_request_phase(PHASE_HANDLER)
 
-        if not hasattr(handler_cls, func_to_find):
+        if handler is None:
             self.logger.warning(f"Unhandled v{version} request {endpoint}")
             resp = {"returnCode": 1}
 
         else:
             try:
-                handler = getattr(handler_cls, func_to_find)
                 resp = await handler(req_data)
 
             except Exception as e:
                 self.logger.error(f"Error handling v{version} method {endpoint} - {e}")
                 return Response(zlib.compress(b'{"returnCode": "0"}'))
 
+        mark_request_phase(PHASE_ENCODE)
+
         if resp is None:
             resp = {"returnCode": 1}
 
@@ -288,6 +292,7 @@ class Mai2Servlet(BaseServlet):
             return Response(zlib.compress(b'{"returnCode": "1"}'))
 
         req_raw = await request.body()
+        mark_request_phase(PHASE_DECODE)
         internal_ver = 0
         client_ip = Utils.get_ip_addr(request)
         encrypted = False
@@ -426,22 +431,29 @@ class Mai2Servlet(BaseServlet):
             if game_code == Mai2Constants.GAME_CODE_DX_INT
             else endpoint
         )
-        func_to_find = "handle_" + inflection.underscore(endpoint) + "_request"
-        handler_cls = self.versions[internal_ver](self.core_cfg, self.game_cfg)
+        dispatch = self.dispatch[internal_ver]
+        handler = dispatch.get(endpoint) if dispatch is not None else None
+        set_request_labels(
+            game_code if game_code in (Mai2Constants.GAME_CODE_DX, Mai2Constants.GAME_CODE_DX_INT, Mai2Constants.GAME_CODE_DX_CHN) else UNKNOWN_ENDPOINT,
+            internal_ver,
+            endpoint if handler is not None else UNKNOWN_ENDPOINT,
+        )
+        mark_request_phase(PHASE_HANDLER)
 
-        if not hasattr(handler_cls, func_to_find):
+        if handler is None:
             self.logger.warning(f"Unhandled v{version} request {endpoint}")
             resp = {"returnCode": 1}
 
         else:
             try:
-                handler = getattr(handler_cls, func_to_find)
                 resp = await handler(req_data)
 
             except Exception as e:
                 self.logger.error(f"Error handling v{version} method {endpoint} - {e}")
                 return Response(zlib.compress(b'{"stat": "0"}'))
 
+        mark_request_phase(PHASE_ENCODE)
+
         if resp is None:
             resp = {"returnCode": 1}
 
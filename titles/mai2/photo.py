@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from os import listdir, path, remove, replace
+from typing import Dict, Optional
+
+from PIL import Image
+
+from .database import Mai2Data
+
+# Size of every divData chunk except the last one, after decoding
+PHOTO_CHUNK_SIZE = 10240
+PHOTO_MAX_CHUNKS = 100
+PHOTO_EXPIRE_DAYS = 7
+# Seconds between sweeps for expired photos
+PHOTO_SWEEP_INTERVAL = 3600
+
+
+class Mai2PhotoStore:
+    """
+    On-disk storage for end-of-credit memorial photos. Chunks are written
+    straight to their offset in one preallocated {id}.part file by a single
+    writer thread. Once the last chunk is in, the file is trimmed, checked
+    with PIL and renamed to {id}.jpeg, which is served as-is from then on.
+    A background task deletes photos older than PHOTO_EXPIRE_DAYS.
+    """
+
+    def __init__(self, photos_dir: str, data: Mai2Data) -> None:
+        self.photos_dir = photos_dir
+        self.data = data
+        self.logger = logging.getLogger("mai2")
+
+        # One thread, so chunks of a photo are written in the order they arrived
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mai2_photo")
+        self.sweeper: Optional[asyncio.Task] = None
+
+    def part_path(self, photo_id: str) -> str:
+        return f"{self.photos_dir}/{photo_id}.part"
+
+    def jpeg_path(self, photo_id: str) -> str:
+        return f"{self.photos_dir}/{photo_id}.jpeg"
+
+    def chunk_dir(self, photo_id: str) -> str:
+        # Photos uploaded before the .part file was used, one file per chunk
+        return f"{self.photos_dir}/{photo_id}"
+
+    async def put_chunk(self, photo_id: str, div_num: int, div_len: int, chunk: bytes) -> bool:
+        self.start_sweeper()
+
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self.writer, self._write_chunk, photo_id, div_num, div_len, chunk
+            )
+
+        except OSError as e:
+            self.logger.error(f"Writing chunk {div_num + 1}/{div_len} of photo {photo_id} failed! - {e}")
+            return False
+
+        return True
+
+    def _write_chunk(self, photo_id: str, div_num: int, div_len: int, chunk: bytes) -> None:
+        if path.exists(self.jpeg_path(photo_id)):
+            # A retried chunk of a finished photo, don't start a new .part file for it
+            self.logger.warning(f"Photo {photo_id} already exists, skipping chunk {div_num + 1}/{div_len}")
+            return
+
+        part = self.part_path(photo_id)
+
+        with open(part, "r+b" if path.exists(part) else "w+b") as f:
+            f.seek(0, 2)
+            if f.tell() < div_len * PHOTO_CHUNK_SIZE:
+                f.truncate(div_len * PHOTO_CHUNK_SIZE)
+
+            f.seek(div_num * PHOTO_CHUNK_SIZE)
+            f.write(chunk)
+
+            if div_num + 1 == div_len:
+                # The last chunk is usually short, drop the rest of the preallocated space
+                f.truncate(div_num * PHOTO_CHUNK_SIZE + len(chunk))
+
+        if div_num + 1 == div_len:
+            self._finish(photo_id)
+
+    def _finish(self, photo_id: str) -> None:
+        part = self.part_path(photo_id)
+
+        try:
+            with Image.open(part) as im:
+                im.verify()
+
+        except Exception as e:
+            self.logger.error(f"{photo_id} failed PIL validation! - {e}")
+            remove(part)
+            return
+
+        replace(part, self.jpeg_path(photo_id))
+        self.logger.info(f"{self.jpeg_path(photo_id)} generated.")
+
+    async def assemble_legacy(self, photo_id: str) -> None:
+        """
+        Turn a photo stored as a folder of chunk files into a .jpeg
+        """
+        if path.isdir(self.chunk_dir(photo_id)):
+            await asyncio.get_running_loop().run_in_executor(self.writer, self._assemble_legacy, photo_id)
+
+    def _assemble_legacy(self, photo_id: str) -> None:
+        folder = self.chunk_dir(photo_id)
+        if not path.isdir(folder):
+            return
+
+        chunks: Dict[int, str] = {}
+        div_len = 0
+        for file in listdir(folder):
+            matcher = re.match(r"^(\d+)_(\d+)\.bin$", file)
+            if matcher:
+                chunks[int(matcher.groups()[0])] = file
+                div_len = int(matcher.groups()[1]) + 1
+
+        if div_len == 0 or len(chunks) != div_len:
+            self.logger.error(f"Expected {div_len} chunks for photo {photo_id}, found {len(chunks)}")
+            return
+
+        with open(self.part_path(photo_id), "wb") as out:
+            for i in range(div_len):
+                with open(f"{folder}/{chunks[i]}", "rb") as f:
+                    out.write(f.read())
+
+        self._finish(photo_id)
+        shutil.rmtree(folder)
+
+    def _remove_files(self, photo_id: str) -> None:
+        for file in (self.jpeg_path(photo_id), self.part_path(photo_id)):
+            if path.exists(file):
+                remove(file)
+
+        if path.isdir(self.chunk_dir(photo_id)):
+            shutil.rmtree(self.chunk_dir(photo_id))
+
+    def start_sweeper(self) -> None:
+        if self.sweeper is None or self.sweeper.done():
+            self.sweeper = asyncio.create_task(self.sweep_forever())
+
+    async def sweep_forever(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+
+            except Exception as e:
+                self.logger.error(f"Failed to sweep expired photos - {e}")
+
+            await asyncio.sleep(PHOTO_SWEEP_INTERVAL)
+
+    async def sweep(self) -> None:
+        cutoff = datetime.now() - timedelta(days=PHOTO_EXPIRE_DAYS)
+        expired = await self.data.profile.get_user_photos_uploaded_before(cutoff)
+        if not expired:
+            return
+
+        photo_ids = [photo["id"] for photo in expired]
+        if not await self.data.profile.delete_user_photos_by_id(photo_ids):
+            return
+
+        loop = asyncio.get_running_loop()
+        for photo_id in photo_ids:
+            await loop.run_in_executor(self.writer, self._remove_files, photo_id)
+
+        self.logger.info(f"Removed {len(photo_ids)} expired photos")
+
+
+_photo_stores: Dict[str, Mai2PhotoStore] = {}
+
+
+def get_photo_store(photos_dir: str, data: Mai2Data) -> Mai2PhotoStore:
+    """
+    The photo store for a directory, shared by the game handlers and the frontend
+    """
+    if photos_dir not in _photo_stores:
+        _photo_stores[photos_dir] = Mai2PhotoStore(photos_dir, data)
+
+    return _photo_stores[photos_dir]
+
+
+def is_photo_expired(when_upload: datetime) -> bool:
+    return datetime.now() > when_upload + timedelta(days=PHOTO_EXPIRE_DAYS)
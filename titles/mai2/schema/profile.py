@@ -1023,6 +1023,18 @@ class Mai2ProfileData(BaseData):
         if not result:
             self.logger.error(f"Failed to delete photo {photo_id}")
 
+    async def get_user_photos_uploaded_before(self, when: datetime) -> Optional[List[Row]]:
+        result = await self.execute(photo.select(photo.c.when_upload < when))
+        if result:
+            return result.fetchall()
+
+    async def delete_user_photos_by_id(self, photo_ids: List[str]) -> bool:
+        result = await self.execute(photo.delete(photo.c.id.in_(photo_ids)))
+        if not result:
+            self.logger.error(f"Failed to delete {len(photo_ids)} photos")
+            return False
+        return True
+
     async def update_name(self, user_id: int, new_name: str) -> bool:
         sql = detail.update(detail.c.user == user_id).values(
             userName=new_name
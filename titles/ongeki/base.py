@@ -11,6 +11,7 @@ from core.config import CoreConfig
 from titles.ongeki.config import OngekiConfig
 from titles.ongeki.const import OngekiConstants
 from titles.ongeki.database import OngekiData
+from titles.ongeki.leaderboard import get_leaderboards
 
 
 class OngekiBattleGrade(Enum):
@@ -94,6 +95,7 @@ class OngekiBase:
         self.core_cfg = core_cfg
         self.game_cfg = game_cfg
         self.data = OngekiData(core_cfg)
+        self.leaderboards = get_leaderboards(self.data)
         self.date_time_format = "%Y-%m-%d %H:%M:%S"
         self.date_time_format_ext = (
             "%Y-%m-%d %H:%M:%S.%f"  # needs to be lopped off at [:-5]
@@ -467,25 +469,14 @@ class OngekiBase:
         }
 
     async def handle_get_user_tech_event_ranking_api_request(self, data: Dict) -> Dict:
-        user_tech_event_ranks = await self.data.item.get_tech_event_ranking(self.version, data["userId"])
-        if user_tech_event_ranks is None: 
+        evt_ranking = await self.leaderboards.get_user_tech_event_ranks(self.version, data["userId"])
+        if evt_ranking is None:
             return {
             "userId": data["userId"],
             "length": 0,
             "userTechEventRankingList": [],
         }
 
-        # collect the whole table and clear other players, to preserve proper ranking
-        evt_ranking = []
-        for evt in user_tech_event_ranks:
-            tmp = evt._asdict()
-            if tmp["user"] != data["userId"]:
-                tmp.clear()
-            else:
-                tmp.pop("id")
-                tmp.pop("user")
-                evt_ranking.append(tmp)
-
         return {
             "userId": data["userId"],
             "length": len(evt_ranking),
@@ -642,22 +633,11 @@ class OngekiBase:
         return {"userId": data["userId"], "userData": user_data}
 
     async def handle_get_user_event_ranking_api_request(self, data: Dict) -> Dict:
-        user_event_ranking_list = await self.data.item.get_ranking_event_ranks(self.version, data["userId"])
-        if user_event_ranking_list is None:
+        # In official spec ranks are calculated server side in the maintenance period, we keep them up to date as points come in
+        prep_event_ranking = await self.leaderboards.get_user_event_ranks(self.version, data["userId"])
+        if prep_event_ranking is None:
             return {}
 
-        # We collect the whole ranking table, and clear out any not needed data, this way we preserve the proper ranking 
-        # In official spec this should be done server side, in maintenance period
-        prep_event_ranking = []
-        for evt in user_event_ranking_list:
-            tmp = evt._asdict()
-            if tmp["user"] != data["userId"]:
-                tmp.clear()
-            else:
-                tmp.pop("id")
-                tmp.pop("user")
-                prep_event_ranking.append(tmp)
-
         return {
             "userId": data["userId"],
             "length": len(prep_event_ranking),
@@ -1078,7 +1058,8 @@ class OngekiBase:
 
         if "userEventPointList" in upsert:
             for x in upsert["userEventPointList"]:
-                await self.data.item.put_event_point(user_id, self.version, x)
+                if await self.data.item.put_event_point(user_id, self.version, x) is not None:
+                    self.leaderboards.put_event_point(user_id, self.version, x)
 
         if "userMissionPointList" in upsert:
             for x in upsert["userMissionPointList"]:
@@ -1115,7 +1096,8 @@ class OngekiBase:
                 await self.data.item.put_tech_event(user_id, self.version, x)
 
                 # This should be updated once a day in maintenance window, but for time being we will push the update on each upsert
-                await self.data.item.put_tech_event_ranking(user_id, self.version, x)
+                if await self.data.item.put_tech_event_ranking(user_id, self.version, x) is not None:
+                    self.leaderboards.put_tech_event(user_id, self.version, x)
 
         if "userKopList" in upsert:
             for x in upsert["userKopList"]:
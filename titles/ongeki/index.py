@@ -11,14 +11,14 @@ import zlib
 from logging.handlers import TimedRotatingFileHandler
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad
-from Crypto.Protocol.KDF import PBKDF2
-from Crypto.Hash import SHA1
 from os import path
 from typing import Tuple, Dict, List
 
 from core.config import CoreConfig
 from core.utils import Utils
-from core.title import BaseServlet
+from core.crypto import EndpointHashJob, build_endpoint_hash_tables
+from core.metrics import PHASE_DECODE, PHASE_ENCODE, PHASE_HANDLER, UNKNOWN_ENDPOINT, mark_request_phase, set_request_labels
+from core.title import BaseServlet, DispatchTable
 from .config import OngekiConfig
 from .const import OngekiConstants
 from .base import OngekiBase
@@ -54,6 +54,8 @@ class OngekiServlet(BaseServlet):
             OngekiBrightMemoryAct3(core_cfg, self.game_cfg),
         ]
 
+        self.dispatch = [DispatchTable(handler) for handler in self.versions]
+
         self.logger = logging.getLogger("ongeki")
 
         if not hasattr(self.logger, "inited"):
@@ -80,35 +82,25 @@ class OngekiServlet(BaseServlet):
             )
             self.logger.inited = True
 
+        hash_jobs: Dict[int, EndpointHashJob] = {}
         for version, keys in self.game_cfg.crypto.keys.items():
             if len(keys) < 3:
                 continue
 
-            self.hash_table[version] = {}
-
             method_list = [
                 method
                 for method in dir(self.versions[version])
                 if not method.startswith("__")
             ]
-            for method in method_list:
-                method_fixed = inflection.camelize(method)[6:-7]
-                # number of iterations is 64 on Bright Memory
-                iter_count = 64
-                hash = PBKDF2(
-                    method_fixed,
-                    bytes.fromhex(keys[2]),
-                    128,
-                    count=iter_count,
-                    hmac_hash_module=SHA1,
-                )
+            names = tuple(inflection.camelize(method)[6:-7] for method in method_list)
 
-                hashed_name = hash.hex()[:32] # truncate unused bytes like the game does
-                self.hash_table[version][hashed_name] = method_fixed
+            # number of iterations is 64 on Bright Memory
+            hash_jobs[version] = EndpointHashJob("pbkdf2", names, bytes.fromhex(keys[2]), 64)
 
-                self.logger.debug(
-                    f"Hashed v{version} method {method_fixed} with {bytes.fromhex(keys[2])} to get {hash.hex()[:32]}"
-                )
+        self.hash_table = build_endpoint_hash_tables(hash_jobs, self.core_cfg.server.cache_dir)
+
+        for version, table in self.hash_table.items():
+            self.logger.debug(f"Hashed {len(table)} v{version} methods with {hash_jobs[version].key}")
 
     @classmethod
     def is_game_enabled(cls, game_code: str, core_cfg: CoreConfig, cfg_dir: str) -> bool:
@@ -152,6 +144,7 @@ class OngekiServlet(BaseServlet):
             return Response(zlib.compress(b'{"returnCode": 1}'))
 
         req_raw = await request.body()
+        mark_request_phase(PHASE_DECODE)
         encrypted = False
         internal_ver = 0
         client_ip = Utils.get_ip_addr(request)
@@ -240,20 +233,23 @@ class OngekiServlet(BaseServlet):
         )
         self.logger.debug(req_data)
 
-        func_to_find = "handle_" + inflection.underscore(endpoint) + "_request"
+        handler = self.dispatch[internal_ver].get(endpoint)
+        set_request_labels(OngekiConstants.GAME_CODE, internal_ver, endpoint if handler is not None else UNKNOWN_ENDPOINT)
+        mark_request_phase(PHASE_HANDLER)
 
-        if not hasattr(self.versions[internal_ver], func_to_find):
+        if handler is None:
             self.logger.warning(f"Unhandled v{version} request {endpoint}")
             return Response(zlib.compress(b'{"returnCode": 1}'))
 
         try:
-            handler = getattr(self.versions[internal_ver], func_to_find)
             resp = await handler(req_data)
 
         except Exception as e:
             self.logger.error(f"Error handling v{version} method {endpoint} - {e}")
             return Response(zlib.compress(b'{"stat": "0"}'))
 
+        mark_request_phase(PHASE_ENCODE)
+
         if resp == None:
             resp = {"returnCode": 1}
 
@@ -0,0 +1,300 @@
+import asyncio
+import logging
+import heapq
+import time
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .database import OngekiData
+
+# Seconds between rebuilding every leaderboard from the database, which picks up
+# rows written by other server processes or outside of upsert_user_all
+LEADERBOARD_RECONCILE_INTERVAL = 600
+
+
+class Leaderboard:
+    """
+    Ranking of one event, kept as a list of sort keys in ascending order, best
+    first. Ties are broken by user id, so every rank is unique like the
+    row_number() it replaces.
+    """
+
+    def __init__(self, sort_key: Callable[[int, Dict], Tuple]) -> None:
+        self.sort_key = sort_key
+        self.keys: List[Tuple] = []
+        self.entries: Dict[int, Dict] = {}
+
+    def put(self, user_id: int, entry: Dict) -> None:
+        old = self.entries.get(user_id)
+        if old is not None:
+            del self.keys[bisect_left(self.keys, self.sort_key(user_id, old))]
+
+        self.entries[user_id] = entry
+        insort(self.keys, self.sort_key(user_id, entry))
+
+    def remove(self, user_id: int) -> None:
+        old = self.entries.pop(user_id, None)
+        if old is not None:
+            del self.keys[bisect_left(self.keys, self.sort_key(user_id, old))]
+
+    def rank(self, user_id: int) -> Optional[int]:
+        entry = self.entries.get(user_id)
+        if entry is None:
+            return None
+
+        return self.count_ahead(self.sort_key(user_id, entry)) + 1
+
+    def count_ahead(self, key: Tuple) -> int:
+        """
+        Number of users ranked ahead of the given sort key
+        """
+        return bisect_left(self.keys, key)
+
+    def top(self, count: int) -> List[Tuple[int, Dict]]:
+        """
+        The best count users and their entries, best first
+        """
+        return [(key[-1], self.entries[key[-1]]) for key in self.keys[:count]]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def _event_point_key(user_id: int, entry: Dict) -> Tuple:
+    return (-entry["point"], user_id)
+
+
+def _tech_event_key(user_id: int, entry: Dict) -> Tuple:
+    return (-entry["totalTechScore"], -entry["totalPlatinumScore"], user_id)
+
+
+class OngekiLeaderboards:
+    """
+    Event point and tech event rankings, one per (version, eventId). Loaded from
+    the database on first use, updated as upsert_user_all saves rows, and rebuilt
+    every LEADERBOARD_RECONCILE_INTERVAL seconds. Each server process keeps its
+    own copy.
+    """
+
+    def __init__(self, data: OngekiData) -> None:
+        self.data = data
+        self.logger = logging.getLogger("ongeki")
+
+        self.event_points: Dict[Tuple[int, int], Leaderboard] = {}
+        self.tech_events: Dict[Tuple[int, int], Leaderboard] = {}
+        self.loaded = 0.0
+
+        self.lock = asyncio.Lock()
+        # Updates made while a rebuild is reading the tables, replayed on top of its result
+        self.pending: Optional[List[Tuple[str, int, int, Dict]]] = None
+        self.reconciler: Optional[asyncio.Task] = None
+
+    async def ensure_loaded(self) -> bool:
+        if self.reconciler is None or self.reconciler.done():
+            self.reconciler = asyncio.create_task(self.reconcile_forever())
+
+        if not self.loaded:
+            async with self.lock:
+                if not self.loaded:
+                    await self.rebuild()
+
+        return self.loaded > 0
+
+    async def reconcile_forever(self) -> None:
+        while True:
+            await asyncio.sleep(LEADERBOARD_RECONCILE_INTERVAL)
+
+            try:
+                async with self.lock:
+                    await self.rebuild()
+
+            except Exception as e:
+                self.logger.error(f"Failed to reconcile leaderboards - {e}")
+
+    async def rebuild(self) -> None:
+        self.pending = []
+        try:
+            event_rows = await self.data.item.get_all_event_points()
+            tech_rows = await self.data.item.get_all_tech_event_rankings()
+            if event_rows is None or tech_rows is None:
+                self.logger.error("Failed to load leaderboards, keeping the previous ones")
+                return
+
+            event_points: Dict[Tuple[int, int], Leaderboard] = {}
+            for row in event_rows:
+                board = event_points.setdefault((row["version"], row["eventId"]), Leaderboard(_event_point_key))
+                board.entries[row["user"]] = self._event_point_entry(row["version"], row)
+
+            tech_events: Dict[Tuple[int, int], Leaderboard] = {}
+            for row in tech_rows:
+                board = tech_events.setdefault((row["version"], row["eventId"]), Leaderboard(_tech_event_key))
+                board.entries[row["user"]] = self._tech_event_entry(row)
+
+            # Sorting once is cheaper than inserting every row on its own
+            for board in list(event_points.values()) + list(tech_events.values()):
+                board.keys = sorted(board.sort_key(user_id, entry) for user_id, entry in board.entries.items())
+
+            for kind, user_id, version, row in self.pending:
+                if kind == "event_point":
+                    self._put(event_points, _event_point_key, user_id, version, row["eventId"], self._event_point_entry(version, row))
+                else:
+                    self._put(tech_events, _tech_event_key, user_id, version, row["eventId"], self._tech_event_entry(row))
+
+            self.event_points = event_points
+            self.tech_events = tech_events
+            self.loaded = time.time()
+            self.logger.debug(
+                f"Loaded {len(event_rows)} event points into {len(event_points)} rankings "
+                f"and {len(tech_rows)} tech event scores into {len(tech_events)} rankings"
+            )
+
+        finally:
+            self.pending = None
+
+    @staticmethod
+    def _event_point_entry(version: int, row: Any) -> Dict:
+        return {
+            "version": version,
+            "eventId": row["eventId"],
+            "type": row["type"],
+            "date": row["date"],
+            "point": row["point"],
+        }
+
+    @staticmethod
+    def _tech_event_entry(row: Any) -> Dict:
+        return {
+            "date": row["date"],
+            "eventId": row["eventId"],
+            "totalTechScore": row["totalTechScore"],
+            "totalPlatinumScore": row["totalPlatinumScore"],
+        }
+
+    @staticmethod
+    def _put(
+        boards: Dict[Tuple[int, int], Leaderboard],
+        sort_key: Callable[[int, Dict], Tuple],
+        user_id: int,
+        version: int,
+        event_id: int,
+        entry: Dict,
+    ) -> None:
+        # A user has one row per event, which moves to the version they last played it on
+        for (board_version, board_event_id), board in boards.items():
+            if board_event_id == event_id and board_version != version:
+                board.remove(user_id)
+
+        boards.setdefault((version, event_id), Leaderboard(sort_key)).put(user_id, entry)
+
+    def put_event_point(self, user_id: int, version: int, row: Dict) -> None:
+        """
+        Add a row saved by put_event_point
+        """
+        if self.pending is not None:
+            self.pending.append(("event_point", user_id, version, row))
+
+        if self.loaded:
+            self._put(
+                self.event_points, _event_point_key, user_id, version, row["eventId"],
+                self._event_point_entry(version, row),
+            )
+
+    def put_tech_event(self, user_id: int, version: int, row: Dict) -> None:
+        """
+        Add a row saved by put_tech_event_ranking
+        """
+        if self.pending is not None:
+            self.pending.append(("tech_event", user_id, version, row))
+
+        if self.loaded:
+            self._put(
+                self.tech_events, _tech_event_key, user_id, version, row["eventId"],
+                self._tech_event_entry(row),
+            )
+
+    async def get_user_event_ranks(self, version: int, user_id: int) -> Optional[List[Dict]]:
+        """
+        The user's rank in every event they have points in, newest version first.
+        Users are ranked against everyone who played the event on this version or an older one.
+        """
+        if not await self.ensure_loaded():
+            return None
+
+        ranks = []
+        for (board_version, event_id), board in self.event_points.items():
+            entry = board.entries.get(user_id)
+            if board_version > version or entry is None:
+                continue
+
+            key = _event_point_key(user_id, entry)
+            ahead = sum(
+                other.count_ahead(key)
+                for (other_version, other_event_id), other in self.event_points.items()
+                if other_event_id == event_id and other_version <= version
+            )
+
+            ranks.append((board_version, {
+                "eventId": event_id,
+                "type": entry["type"],
+                "rank": ahead + 1,
+                "date": entry["date"],
+                "point": entry["point"],
+            }))
+
+        return [rank for _, rank in sorted(ranks, key=lambda x: x[0], reverse=True)]
+
+    async def get_user_tech_event_ranks(self, version: int, user_id: int) -> Optional[List[Dict]]:
+        if not await self.ensure_loaded():
+            return None
+
+        ranks = []
+        for (board_version, event_id), board in self.tech_events.items():
+            entry = board.entries.get(user_id)
+            if board_version != version or entry is None:
+                continue
+
+            ranks.append({
+                "date": entry["date"],
+                "eventId": event_id,
+                "rank": board.rank(user_id),
+                "totalTechScore": entry["totalTechScore"],
+                "totalPlatinumScore": entry["totalPlatinumScore"],
+            })
+
+        return ranks
+
+    async def get_event_top(self, version: int, event_id: int, count: int) -> List[Tuple[int, Dict]]:
+        """
+        The best count users of an event on this version or an older one, best first
+        """
+        if not await self.ensure_loaded():
+            return []
+
+        boards = [
+            board for (board_version, board_event_id), board in self.event_points.items()
+            if board_event_id == event_id and board_version <= version
+        ]
+        keys = heapq.merge(*(board.keys for board in boards))
+        entries = {user_id: entry for board in boards for user_id, entry in board.entries.items()}
+
+        return [(key[-1], entries[key[-1]]) for key, _ in zip(keys, range(count))]
+
+    async def get_tech_event_top(self, version: int, event_id: int, count: int) -> List[Tuple[int, Dict]]:
+        if not await self.ensure_loaded() or (version, event_id) not in self.tech_events:
+            return []
+
+        return self.tech_events[(version, event_id)].top(count)
+
+
+_leaderboards: Optional[OngekiLeaderboards] = None
+
+
+def get_leaderboards(data: OngekiData) -> OngekiLeaderboards:
+    """
+    The leaderboards shared by every O.N.G.E.K.I. version in this process
+    """
+    global _leaderboards
+    if _leaderboards is None:
+        _leaderboards = OngekiLeaderboards(data)
+
+    return _leaderboards
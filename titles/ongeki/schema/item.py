@@ -800,19 +800,28 @@ class OngekiItemData(BaseData):
         return result.lastrowid
 
 
-    async def get_ranking_event_ranks(self, version: int, aime_id: int) -> Optional[List[Dict]]:
-        # Calculates player rank on GameRequest from server, and sends it back, official spec would rank players in maintenance period, on TODO list
-        sql = select(event_point.c.id, event_point.c.user, event_point.c.eventId, event_point.c.type, func.row_number().over(partition_by=event_point.c.eventId, order_by=event_point.c.point.desc()).label('rank'), event_point.c.date, event_point.c.point).where(event_point.c.version <= version).order_by(event_point.c.version.desc())
+    async def get_all_event_points(self) -> Optional[List[Row]]:
+        """
+        Every user's event points, used to build the event leaderboards
+        """
+        sql = select(
+            event_point.c.user, event_point.c.version, event_point.c.eventId, event_point.c.type, event_point.c.date, event_point.c.point
+        )
         result = await self.execute(sql)
         if result is None:
-            self.logger.error(f"failed to rank aime_id: {aime_id} ranking event positions")
+            self.logger.error("get_all_event_points: Failed to load event points")
             return None
         return result.fetchall()
 
-    async def get_tech_event_ranking(self, version: int, aime_id: int) -> Optional[List[Dict]]:
-        sql = select(tech_ranking.c.id, tech_ranking.c.user, tech_ranking.c.date, tech_ranking.c.eventId, func.row_number().over(partition_by=tech_ranking.c.eventId, order_by=[tech_ranking.c.totalTechScore.desc(),tech_ranking.c.totalPlatinumScore.desc()]).label('rank'), tech_ranking.c.totalTechScore, tech_ranking.c.totalPlatinumScore).where(tech_ranking.c.version == version)
+    async def get_all_tech_event_rankings(self) -> Optional[List[Row]]:
+        """
+        Every user's tech event totals, used to build the tech event leaderboards
+        """
+        sql = select(
+            tech_ranking.c.user, tech_ranking.c.version, tech_ranking.c.date, tech_ranking.c.eventId, tech_ranking.c.totalTechScore, tech_ranking.c.totalPlatinumScore
+        )
         result = await self.execute(sql)
         if result is None:
-            self.logger.warning(f"aime_id: {aime_id} has no tech ranking ranks")
+            self.logger.error("get_all_tech_event_rankings: Failed to load tech event rankings")
             return None
         return result.fetchall()
@@ -3,11 +3,15 @@ from typing import Dict, List, Optional
 from sqlalchemy import Column, Table, UniqueConstraint
 from sqlalchemy.dialects.mysql import insert
 from sqlalchemy.engine import Row
+from sqlalchemy.engine.base import Connection
 from sqlalchemy.schema import ForeignKey
 from sqlalchemy.sql import select, func
 from sqlalchemy.types import TIMESTAMP, Boolean, Float, Integer, String
 
-from core.data.schema import BaseData, metadata
+from core.config import CoreConfig
+from core.data.schema import BaseData, PlayCountData, metadata, parse_play_day
+
+from ..const import OngekiConstants
 
 from datetime import datetime, timedelta
 
@@ -132,6 +136,10 @@ tech_count = Table(
 
 
 class OngekiScoreData(BaseData):
+    def __init__(self, cfg: CoreConfig, conn: Connection) -> None:
+        super().__init__(cfg, conn)
+        self.playcount = PlayCountData(cfg, conn)
+
     async def get_tech_count(self, aime_id: int) -> Optional[List[Dict]]:
         sql = select(tech_count).where(tech_count.c.user == aime_id)
         
@@ -212,16 +220,11 @@ class OngekiScoreData(BaseData):
         return result.lastrowid
 
     async def get_rankings(self, date: datetime) -> Optional[List[Row]]:
-        sql = (
-            select([func.count(playlog.c.id), playlog.c.musicId])
-                .where(playlog.c.playDate == date.date())
-                .group_by(playlog.c.musicId)
-                .order_by(func.count(playlog.c.id).desc())
-                .limit(10)
-        )
-        result = await self.execute(sql)
-        if result:
-            return result.fetchall()
+        rows = await self.playcount.get_top_daily(OngekiConstants.GAME_CODE, date.date())
+        if rows is None:
+            return None
+
+        return [(row["plays"], row["music_id"]) for row in rows]
 
     async def put_playlog(self, aime_id: int, playlog_data: Dict) -> Optional[int]:
         playlog_data["user"] = aime_id
@@ -232,4 +235,35 @@ class OngekiScoreData(BaseData):
         if result is None:
             self.logger.warning(f"put_playlog: Failed to add playlog! aime_id: {aime_id}")
             return None
+
+        if playlog_data.get("musicId") is not None:
+            # The playlog doesn't record a version, and the daily ranking covers every version anyway
+            await self.playcount.add_plays(
+                OngekiConstants.GAME_CODE, 0, [(parse_play_day(playlog_data.get("playDate")), playlog_data["musicId"])]
+            )
+
         return result.lastrowid
+
+    async def backfill_play_counts(self) -> bool:
+        """
+        Rebuild the play count rollups from the whole playlog table
+        """
+        day = func.date(playlog.c.playDate).label("day")
+        sql = (
+            select([day, playlog.c.musicId, func.count(playlog.c.id).label("plays")])
+            .where(playlog.c.musicId.isnot(None))
+            .group_by(day, playlog.c.musicId)
+        )
+
+        result = await self.execute(sql)
+        if result is None:
+            return False
+
+        daily: Dict = {}
+        totals: Dict = {}
+        for row in result.fetchall():
+            totals[(0, row["musicId"])] = totals.get((0, row["musicId"]), 0) + row["plays"]
+            if row["day"] is not None:
+                daily[(0, row["day"], row["musicId"])] = row["plays"]
+
+        return await self.playcount.replace_plays(OngekiConstants.GAME_CODE, daily, totals)
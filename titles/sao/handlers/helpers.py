@@ -1,4 +1,5 @@
 from typing import Tuple, List, Optional, Dict
+from functools import lru_cache
 import struct
 import logging
 from datetime import datetime
@@ -22,7 +23,40 @@ def prs_dt(s: Optional[str] = None) -> datetime:
         s = "19691231190000"
     return datetime.strptime(s, DT_FMT)
 
+# Precompiled big-endian layouts, keyed by field width. Decoding is unsigned, encoding is signed.
+# Note that "long" has always been encoded as 4 bytes and "bigint" as 8, despite their offsets.
+_DECODE_STRUCTS: Dict[int, struct.Struct] = {
+    BYTE_OFF: struct.Struct("!B"),
+    SHORT_OFF: struct.Struct("!H"),
+    INT_OFF: struct.Struct("!I"),
+    LONG_OFF: struct.Struct("!Q"),
+}
+_ENCODE_CODES: Dict[int, str] = {
+    BYTE_OFF: "b",
+    SHORT_OFF: "h",
+    INT_OFF: "i",
+    LONG_OFF: "l",
+    BIGINT_OFF: "q",
+}
+_BYTE = struct.Struct("!b")
+_SHORT = struct.Struct("!h")
+_INT = struct.Struct("!i")
+_LONG = struct.Struct("!l")
+_BIGINT = struct.Struct("!q")
+_STR_LEN = struct.Struct("!I")
+
+@lru_cache(maxsize=256)
+def _array_struct(fmt: str) -> struct.Struct:
+    return struct.Struct(fmt)
+
 def decode_num(data: bytes, offset: int, size: int) -> int:
+    layout = _DECODE_STRUCTS.get(size)
+    if layout is not None:
+        try:
+            return layout.unpack_from(data, offset)[0]
+        except struct.error:
+            pass # Not enough data left, let int.from_bytes deal with whatever is there
+
     try:
         return int.from_bytes(data[offset:offset + size], 'big')
     except:
@@ -48,21 +82,26 @@ def decode_str(data: bytes, offset: int) -> Tuple[str, int]:
     try:
         str_len = decode_int(data, offset)
         num_bytes_decoded = INT_OFF + str_len
-        str_out = data[offset + INT_OFF:offset + num_bytes_decoded].decode("utf-16-le", errors="replace")
+        str_out = str(memoryview(data)[offset + INT_OFF:offset + num_bytes_decoded], "utf-16-le", "replace")
         return (str_out, num_bytes_decoded)
     except:
-        logging.getLogger('sao').error(f"Failed to parse {data[offset:]} as string!")
+        logging.getLogger('sao').error(f"Failed to parse {bytes(data[offset:])} as string!")
         return ("", 0)
 
 def decode_arr_num(data: bytes, offset:int, element_size: int) -> Tuple[List[int], int]:
-    size = 0
-    num_obj = decode_int(data, offset + size)
-    size += INT_OFF
-    
+    num_obj = decode_int(data, offset)
+    size = INT_OFF + num_obj * element_size
+
+    if element_size in _DECODE_STRUCTS:
+        try:
+            layout = _array_struct(f"!{num_obj}{_DECODE_STRUCTS[element_size].format[-1]}")
+            return (list(layout.unpack_from(data, offset + INT_OFF)), size)
+        except struct.error:
+            pass
+
     ret: List[int] = []
-    for _ in range(num_obj):
-        ret.append(decode_num(data, offset + size, element_size))
-        size += element_size
+    for x in range(num_obj):
+        ret.append(decode_num(data, offset + INT_OFF + x * element_size, element_size))
     
     return (ret, size)
 
@@ -90,7 +129,7 @@ def encode_byte(data: int) -> bytes:
     if data is None:
         return b"\0"
     try:
-        return struct.pack("!b", int(data))
+        return _BYTE.pack(int(data))
     except Exception as e:
         logging.getLogger('sao').error(f"Failed to encode {data} as byte! - {e}")
         return b"\0"
@@ -99,7 +138,7 @@ def encode_short(data: int) -> bytes:
     if data is None:
         return b"\0\0"
     try:
-        return struct.pack("!h", int(data))
+        return _SHORT.pack(int(data))
     except Exception as e:
         logging.getLogger('sao').error(f"Failed to encode {data} as short! - {e}")
         return b"\0\0"
@@ -108,7 +147,7 @@ def encode_int(data: int) -> bytes:
     if data is None:
         return b"\0\0\0\0"
     try:
-        return struct.pack("!i", int(data))
+        return _INT.pack(int(data))
     except Exception as e:
         logging.getLogger('sao').error(f"Failed to encode {data} as int! - {e}")
         return b"\0\0\0\0"
@@ -116,49 +155,48 @@ def encode_int(data: int) -> bytes:
 def encode_long(data: int) -> bytes:
     if data is None:
         return b"\0\0\0\0\0\0\0\0"
-    return struct.pack("!l", int(data))
+    return _LONG.pack(int(data))
 
 def encode_bigint(data: int) -> bytes:
     if data is None:
         return b"\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0"
-    return struct.pack("!q", int(data))
+    return _BIGINT.pack(int(data))
 
 def encode_str(s: str) -> bytes:
     if s is None:
         return b"\0\0\0\0"
     try:
         str_bytes = str(s).encode("utf-16-le", errors="replace")
-        str_len_bytes = struct.pack("!I", len(str_bytes))
-        return str_len_bytes + str_bytes
+        return _STR_LEN.pack(len(str_bytes)) + str_bytes
     except Exception as e:
         logging.getLogger('sao').error(f"Failed to encode {s} as bytes! - {e}")
         return b""
 
+_NUM_ENCODERS = {
+    BYTE_OFF: encode_byte,
+    SHORT_OFF: encode_short,
+    INT_OFF: encode_int,
+    LONG_OFF: encode_long,
+    BIGINT_OFF: encode_bigint,
+}
+
 def encode_arr_num(data: List[int], element_size: int) -> bytes:
     if data is None:
         return b"\0\0\0\0"
-    ret = encode_int(len(data))
-        
-    if element_size == BYTE_OFF:
-        for x in data:
-            ret += encode_byte(x)
-    elif element_size == SHORT_OFF:
-        for x in data:
-            ret += encode_short(x)
-    elif element_size == INT_OFF:
-        for x in data:
-            ret += encode_int(x)
-    elif element_size == LONG_OFF:
-        for x in data:
-            ret += encode_long(x)
-    elif element_size == BIGINT_OFF:
-        for x in data:
-            ret += encode_bigint(x)
-    else:
+
+    if element_size not in _NUM_ENCODERS:
         logging.getLogger('sao').error(f"Unknown element size {element_size}")
         return b"\x00" * INT_OFF
 
-    return ret
+    # Pack the whole array at once, and only go element by element if something needs special handling
+    try:
+        if None not in data:
+            return _array_struct(f"!i{len(data)}{_ENCODE_CODES[element_size]}").pack(len(data), *map(int, data))
+    except Exception:
+        pass
+
+    encoder = _NUM_ENCODERS[element_size]
+    return b"".join([encode_int(len(data))] + [encoder(x) for x in data])
 
 def encode_bool(b: bool) -> bytes:
     if b is None:
@@ -168,6 +206,109 @@ def encode_bool(b: bool) -> bytes:
 def encode_date_str(d: datetime) -> bytes:
     return encode_str(fmt_dt(d))
 
+# Field types usable in a FieldLayout. Fixed width types map to their decode/encode struct codes.
+_FIXED_FIELDS: Dict[str, Tuple[str, str, int]] = {
+    "byte": ("B", "b", BYTE_OFF),
+    "bool": ("B", "b", BYTE_OFF),
+    "short": ("H", "h", SHORT_OFF),
+    "int": ("I", "i", INT_OFF),
+}
+_FIELD_ENCODERS = {
+    "byte": encode_byte,
+    "bool": encode_bool,
+    "short": encode_short,
+    "int": encode_int,
+    "str": encode_str,
+    "date": encode_date_str,
+}
+_FIELD_DECODERS = {
+    "str": decode_str,
+    "date": decode_date_str,
+}
+
+class FieldLayout:
+    """
+    Declarative wire layout for a helper class, as a list of (attribute, type) pairs.
+    Runs of consecutive fixed width fields are compiled once into a single struct.Struct,
+    so decoding and encoding them is one unpack_from/pack call instead of one per field.
+    Strings and dates between those runs are handled by decode_str/encode_str as usual.
+    """
+    def __init__(self, *fields: Tuple[str, str]) -> None:
+        self.fields = fields
+        self.steps: List[Tuple] = []
+
+        run: List[Tuple[str, str]] = []
+        for name, kind in fields:
+            if kind in _FIXED_FIELDS:
+                run.append((name, kind))
+                continue
+
+            if kind not in _FIELD_DECODERS:
+                raise ValueError(f"Unknown field type {kind} for {name}")
+
+            self._add_run(run)
+            run = []
+            self.steps.append((kind, name))
+
+        self._add_run(run)
+
+    def _add_run(self, run: List[Tuple[str, str]]) -> None:
+        if not run:
+            return
+
+        names = tuple(name for name, _ in run)
+        kinds = tuple(kind for _, kind in run)
+        decoder = struct.Struct("!" + "".join(_FIXED_FIELDS[k][0] for k in kinds))
+        encoder = struct.Struct("!" + "".join(_FIXED_FIELDS[k][1] for k in kinds))
+        self.steps.append(("fixed", names, kinds, decoder, encoder))
+
+    def decode(self, obj: "BaseHelper", data: bytes, offset: int) -> int:
+        """
+        Set every field of obj from data, returning the number of bytes read
+        """
+        off = offset
+        for step in self.steps:
+            if step[0] != "fixed":
+                value, size = _FIELD_DECODERS[step[0]](data, off)
+                setattr(obj, step[1], value)
+                off += size
+                continue
+
+            _, names, kinds, decoder, _ = step
+            try:
+                values = decoder.unpack_from(data, off)
+
+            except struct.error:
+                values = []
+                field_off = off
+                for kind in kinds:
+                    values.append(decode_num(data, field_off, _FIXED_FIELDS[kind][2]))
+                    field_off += _FIXED_FIELDS[kind][2]
+
+            for name, kind, value in zip(names, kinds, values):
+                setattr(obj, name, bool(value) if kind == "bool" else value)
+            off += decoder.size
+
+        return off - offset
+
+    def encode(self, obj: "BaseHelper") -> bytes:
+        parts: List[bytes] = []
+        for step in self.steps:
+            if step[0] != "fixed":
+                parts.append(_FIELD_ENCODERS[step[0]](getattr(obj, step[1])))
+                continue
+
+            _, names, kinds, _, encoder = step
+            values = [getattr(obj, name) for name in names]
+            try:
+                parts.append(encoder.pack(*[0 if v is None else int(v) for v in values]))
+
+            except Exception:
+                # Let the per-field encoders log and zero out whatever doesn't fit
+                parts.append(b"".join(_FIELD_ENCODERS[k](v) for k, v in zip(kinds, values)))
+
+        return b"".join(parts)
+
 class PrintType(IntEnum):
     NONE = 0
     FromStorage = 1
@@ -303,12 +444,7 @@ def decode_arr_cls(data: bytes, offset: int, cls: BaseHelper):
     return (ret, size)
 
 def encode_arr_cls(data: List[BaseHelper]) -> bytes:
-    ret = encode_int(len(data))
-    
-    for x in data:
-        ret += x.make()
-    
-    return ret
+    return b"".join([encode_int(len(data))] + [x.make() for x in data])
 
 class MaterialCommonRewardUserData(BaseHelper):
     def __init__(self, data: bytes, offset: int) -> None:
@@ -2605,73 +2741,43 @@ class ReadProfileCard(BaseHelper):
         return resp
 
 class HeroLogUserData(BaseHelper):
+    layout = FieldLayout(
+        ("user_hero_log_id", "str"),
+        ("hero_log_id", "int"),
+        ("log_level", "short"),
+        ("max_log_level_extended_num", "short"),
+        ("log_exp", "int"),
+        ("possible_awakening_flag", "byte"),
+        ("awakening_stage", "short"),
+        ("awakening_exp", "int"),
+        ("skill_slot_correction_value", "byte"),
+        ("last_set_skill_slot1_skill_id", "short"),
+        ("last_set_skill_slot2_skill_id", "short"),
+        ("last_set_skill_slot3_skill_id", "short"),
+        ("last_set_skill_slot4_skill_id", "short"),
+        ("last_set_skill_slot5_skill_id", "short"),
+        ("property1_property_id", "int"),
+        ("property1_value1", "int"),
+        ("property1_value2", "int"),
+        ("property2_property_id", "int"),
+        ("property2_value1", "int"),
+        ("property2_value2", "int"),
+        ("property3_property_id", "int"),
+        ("property3_value1", "int"),
+        ("property3_value2", "int"),
+        ("property4_property_id", "int"),
+        ("property4_value1", "int"),
+        ("property4_value2", "int"),
+        ("converted_card_num", "short"),
+        ("shop_purchase_flag", "byte"),
+        ("protect_flag", "byte"),
+        ("get_date", "date"),
+    )
+
     def __init__(self, data: bytes, offset: int) -> None:
         super().__init__(data, offset)
-        off = offset
-        self.user_hero_log_id, new_off = decode_str(data, off)
-        off += new_off
-        self.hero_log_id = decode_int(data, off)
-        off += INT_OFF
-        self.log_level = decode_short(data, off)
-        off += SHORT_OFF
-        self.max_log_level_extended_num = decode_short(data, off)
-        off += SHORT_OFF
-        self.log_exp = decode_int(data, off)
-        off += INT_OFF
-        self.possible_awakening_flag = decode_byte(data, off)
-        off += BYTE_OFF
-        self.awakening_stage = decode_short(data, off)
-        off += SHORT_OFF
-        self.awakening_exp = decode_int(data, off)
-        off += INT_OFF
-        self.skill_slot_correction_value = decode_byte(data, off)
-        off += BYTE_OFF
-        self.last_set_skill_slot1_skill_id = decode_short(data, off)
-        off += SHORT_OFF
-        self.last_set_skill_slot2_skill_id = decode_short(data, off)
-        off += SHORT_OFF
-        self.last_set_skill_slot3_skill_id = decode_short(data, off)
-        off += SHORT_OFF
-        self.last_set_skill_slot4_skill_id = decode_short(data, off)
-        off += SHORT_OFF
-        self.last_set_skill_slot5_skill_id = decode_short(data, off)
-        off += SHORT_OFF
-        self.property1_property_id = decode_int(data, off)
-        off += INT_OFF
-        self.property1_value1 = decode_int(data, off)
-        off += INT_OFF
-        self.property1_value2 = decode_int(data, off)
-        off += INT_OFF
-        self.property2_property_id = decode_int(data, off)
-        off += INT_OFF
-        self.property2_value1 = decode_int(data, off)
-        off += INT_OFF
-        self.property2_value2 = decode_int(data, off)
-        off += INT_OFF
-        self.property3_property_id = decode_int(data, off)
-        off += INT_OFF
-        self.property3_value1 = decode_int(data, off)
-        off += INT_OFF
-        self.property3_value2 = decode_int(data, off)
-        off += INT_OFF
-        self.property4_property_id = decode_int(data, off)
-        off += INT_OFF
-        self.property4_value1 = decode_int(data, off)
-        off += INT_OFF
-        self.property4_value2 = decode_int(data, off)
-        off += INT_OFF
-        self.converted_card_num = decode_short(data, off)
-        off += SHORT_OFF
-        self.shop_purchase_flag = decode_byte(data, off)
-        off += BYTE_OFF
-        self.protect_flag = decode_byte(data, off)
-        off += BYTE_OFF
+        self._sz = self.layout.decode(self, data, offset)
 
-        get_date, new_off = decode_str(data, off)
-        off += new_off
-        self.get_date = prs_dt(get_date)
-        self.sz = off - offset
-    
     @classmethod
     def from_args(cls, hero_data: Dict) -> "HeroLogUserData":
         ret = cls(b"\x00" * 90, 0)
@@ -2714,37 +2820,7 @@ class HeroLogUserData(BaseHelper):
         return ret
     
     def make(self) -> bytes:
-        return super().make() \
-        + encode_str(self.user_hero_log_id) \
-        + encode_int(self.hero_log_id) \
-        + encode_short(self.log_level) \
-        + encode_short(self.max_log_level_extended_num) \
-        + encode_int(self.log_exp) \
-        + encode_byte(self.possible_awakening_flag) \
-        + encode_short(self.awakening_stage) \
-        + encode_int(self.awakening_exp) \
-        + encode_byte(self.skill_slot_correction_value) \
-        + encode_short(self.last_set_skill_slot1_skill_id) \
-        + encode_short(self.last_set_skill_slot2_skill_id) \
-        + encode_short(self.last_set_skill_slot3_skill_id) \
-        + encode_short(self.last_set_skill_slot4_skill_id) \
-        + encode_short(self.last_set_skill_slot5_skill_id) \
-        + encode_int(self.property1_property_id) \
-        + encode_int(self.property1_value1) \
-        + encode_int(self.property1_value2) \
-        + encode_int(self.property2_property_id) \
-        + encode_int(self.property2_value1) \
-        + encode_int(self.property2_value2) \
-        + encode_int(self.property3_property_id) \
-        + encode_int(self.property3_value1) \
-        + encode_int(self.property3_value2) \
-        + encode_int(self.property4_property_id) \
-        + encode_int(self.property4_value1) \
-        + encode_int(self.property4_value2) \
-        + encode_short(self.converted_card_num) \
-        + encode_byte(self.shop_purchase_flag) \
-        + encode_byte(self.protect_flag) \
-        + encode_date_str(self.get_date) 
+        return self.layout.encode(self)
 
 class YuiMedalBonusUserData(BaseHelper):
     def __init__(self, data: bytes, offset: int) -> None:
@@ -2908,64 +2984,37 @@ class BeginnerMissionUserData(BaseHelper):
         + encode_date_str(self.ad_confirm_date)
 
 class EquipmentUserData(BaseHelper):
+    layout = FieldLayout(
+        ("user_equipment_id", "str"),
+        ("equipment_id", "int"),
+        ("enhancement_value", "short"),
+        ("max_enhancement_value_extended_num", "short"),
+        ("enhancement_exp", "int"),
+        ("possible_awakening_flag", "byte"),
+        ("awakening_stage", "short"),
+        ("awakening_exp", "int"),
+        ("property1_property_id", "int"),
+        ("property1_value1", "int"),
+        ("property1_value2", "int"),
+        ("property2_property_id", "int"),
+        ("property2_value1", "int"),
+        ("property2_value2", "int"),
+        ("property3_property_id", "int"),
+        ("property3_value1", "int"),
+        ("property3_value2", "int"),
+        ("property4_property_id", "int"),
+        ("property4_value1", "int"),
+        ("property4_value2", "int"),
+        ("converted_card_num", "short"),
+        ("shop_purchase_flag", "byte"),
+        ("protect_flag", "byte"),
+        ("get_date", "date"),
+    )
+
     def __init__(self, data: bytes, offset: int) -> None:
         super().__init__(data, offset)
-        off = offset
-        self.user_equipment_id, new_off = decode_str(data, off)
-        off += new_off
-        
-        self.equipment_id = decode_int(data, off)
-        off += INT_OFF
-        self.enhancement_value = decode_short(data, off)
-        off += SHORT_OFF
-        self.max_enhancement_value_extended_num = decode_short(data, off)
-        off += SHORT_OFF
-        self.enhancement_exp = decode_int(data, off)
-        off += INT_OFF
-        self.possible_awakening_flag = decode_byte(data, off)
-        off += BYTE_OFF
-        self.awakening_stage = decode_short(data, off)
-        off += SHORT_OFF
-        self.awakening_exp = decode_int(data, off)
-        off += INT_OFF
-        
-        self.property1_property_id = decode_int(data, off)
-        off += INT_OFF
-        self.property1_value1 = decode_int(data, off)
-        off += INT_OFF
-        self.property1_value2 = decode_int(data, off)
-        off += INT_OFF
-        self.property2_property_id = decode_int(data, off)
-        off += INT_OFF
-        self.property2_value1 = decode_int(data, off)
-        off += INT_OFF
-        self.property2_value2 = decode_int(data, off)
-        off += INT_OFF
-        self.property3_property_id = decode_int(data, off)
-        off += INT_OFF
-        self.property3_value1 = decode_int(data, off)
-        off += INT_OFF
-        self.property3_value2 = decode_int(data, off)
-        off += INT_OFF
-        self.property4_property_id = decode_int(data, off)
-        off += INT_OFF
-        self.property4_value1 = decode_int(data, off)
-        off += INT_OFF
-        self.property4_value2 = decode_int(data, off)
-        off += INT_OFF
-        
-        self.converted_card_num = decode_short(data, off)
-        off += SHORT_OFF
-        self.shop_purchase_flag = decode_byte(data, off)
-        off += BYTE_OFF
-        self.protect_flag = decode_byte(data, off)
-        off += BYTE_OFF
-        
-        self.get_date, new_off = decode_date_str(data, off)
-        off += new_off
+        self._sz = self.layout.decode(self, data, offset)
 
-        self._sz = off - offset
-    
     @classmethod
     def from_args(cls, equip_data: Dict) -> "EquipmentUserData":
         ret = cls(b"\x00" * 79, 0)
@@ -2996,45 +3045,20 @@ class EquipmentUserData(BaseHelper):
         return ret
     
     def make(self) -> bytes:
-        return encode_str(self.user_equipment_id) \
-        + encode_int(self.equipment_id) \
-        + encode_short(self.enhancement_value) \
-        + encode_short(self.max_enhancement_value_extended_num) \
-        + encode_int(self.enhancement_exp) \
-        + encode_byte(self.possible_awakening_flag) \
-        + encode_short(self.awakening_stage) \
-        + encode_int(self.awakening_exp) \
-        + encode_int(self.property1_property_id) \
-        + encode_int(self.property1_value1) \
-        + encode_int(self.property1_value2) \
-        + encode_int(self.property2_property_id) \
-        + encode_int(self.property2_value1) \
-        + encode_int(self.property2_value2) \
-        + encode_int(self.property3_property_id) \
-        + encode_int(self.property3_value1) \
-        + encode_int(self.property3_value2) \
-        + encode_int(self.property4_property_id) \
-        + encode_int(self.property4_value1) \
-        + encode_int(self.property4_value2) \
-        + encode_short(self.converted_card_num) \
-        + encode_byte(self.shop_purchase_flag) \
-        + encode_byte(self.protect_flag) \
-        + encode_date_str(self.get_date)
+        return self.layout.encode(self)
 
 class ItemUserData(BaseHelper):
+    layout = FieldLayout(
+        ("user_item_id", "str"),
+        ("item_id", "int"),
+        ("protect_flag", "byte"),
+        ("get_date", "date"),
+    )
+
     def __init__(self, data: bytes, offset: int) -> None:
         super().__init__(data, offset)
-        off = offset
-        self.user_item_id, new_off = decode_str(data, off)
-        off += new_off
-        self.item_id = decode_int(data, off)
-        off += INT_OFF
-        self.protect_flag = decode_byte(data, off)
-        off += BYTE_OFF
-        self.get_date = decode_date_str(data, off)
+        self._sz = self.layout.decode(self, data, offset)
 
-        self._sz = off - offset
-    
     @classmethod
     def from_args(cls, item_data: Dict) -> BaseHelper:
         ret = cls(b"\x00" * 993, 0)
@@ -3045,42 +3069,24 @@ class ItemUserData(BaseHelper):
         return ret
     
     def make(self) -> bytes:
-        return encode_str(self.user_item_id) \
-        + encode_int(self.item_id) \
-        + encode_byte(self.protect_flag) \
-        + encode_date_str(self.get_date)
+        return self.layout.encode(self)
 
 class SupportLogUserData(BaseHelper):
-    def __init__(self, data: bytes, offset: int):
-        off = offset
-        self.user_support_log_id, new_off = decode_str(data, off)
-        off += new_off
-
-        self.support_log_id = decode_int(data, off)
-        off += INT_OFF
+    layout = FieldLayout(
+        ("user_support_log_id", "str"),
+        ("support_log_id", "int"),
+        ("possible_awakening_flag", "byte"),
+        ("awakening_stage", "short"),
+        ("awakening_exp", "int"),
+        ("converted_card_num", "short"),
+        ("shop_purchase_flag", "byte"),
+        ("protect_flag", "byte"),
+        ("get_date", "date"),
+    )
 
-        self.possible_awakening_flag = decode_byte(data, off)
-        off += BYTE_OFF
-
-        self.awakening_stage = decode_short(data, off)
-        off += SHORT_OFF
-
-        self.awakening_exp = decode_int(data, off)
-        off += INT_OFF
-
-        self.converted_card_num = decode_short(data, off)
-        off += SHORT_OFF
-
-        self.shop_purchase_flag = decode_byte(data, off)
-        off += BYTE_OFF
-
-        self.protect_flag = decode_byte(data, off)
-        off += BYTE_OFF
-
-        self.get_date, new_off = decode_date_str(data, off)
-        off += new_off
-
-        self._sz = off - offset
+    def __init__(self, data: bytes, offset: int) -> None:
+        super().__init__(data, offset)
+        self._sz = self.layout.decode(self, data, offset)
 
     @classmethod
     def from_args(cls, user_support_log: str, support_log: int) -> "SupportLogUserData":
@@ -3097,16 +3103,7 @@ class SupportLogUserData(BaseHelper):
         return ret
 
     def make(self) -> bytes:
-        return super().make() \
-        + encode_str(self.user_support_log_id) \
-        + encode_int(self.support_log_id) \
-        + encode_byte(self.possible_awakening_flag) \
-        + encode_short(self.awakening_stage) \
-        + encode_int(self.awakening_exp) \
-        + encode_short(self.converted_card_num) \
-        + encode_byte(self.shop_purchase_flag) \
-        + encode_byte(self.protect_flag) \
-        + encode_date_str(self.get_date)
+        return self.layout.encode(self)
 
 class EventItemUserData(BaseHelper):
     def __init__(self, data: bytes, offset: int):
@@ -121,7 +121,7 @@ class SaoServlet(BaseServlet):
             self.logger.debug(f"Decrypted {req_data.hex()} with IV {iv.hex()}")
             
         else:
-            req_data = req_raw[40:]
+            req_data = memoryview(req_raw)[40:]
 
         self.logger.debug(f"{endpoint} ({cmd_str}) Request from {ip}: {req_raw.hex()}")
         handler = getattr(self.base, f"handle_{cmd_str}", None)
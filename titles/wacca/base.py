@@ -4,6 +4,7 @@ import inflection
 from math import floor
 from datetime import datetime, timedelta
 from core.config import CoreConfig
+from core.data import fetch_concurrently
 from titles.wacca.config import WaccaConfig
 from titles.wacca.const import WaccaConstants
 from titles.wacca.database import WaccaData
@@ -280,12 +281,21 @@ class WaccaBase:
         self.logger.info(f"Get detail for profile {req.userId}")
         user_id = profile["user"]
 
-        profile_scores = await self.data.score.get_best_scores(user_id)
-        profile_items = await self.data.item.get_items(user_id)
-        profile_song_unlocks = await self.data.item.get_song_unlocks(user_id)
-        profile_options = await self.data.profile.get_options(user_id)
-        profile_trophies = await self.data.item.get_trophies(user_id)
-        profile_tickets = await self.data.item.get_tickets(user_id)
+        (
+            profile_scores,
+            profile_items,
+            profile_song_unlocks,
+            profile_options,
+            profile_trophies,
+            profile_tickets,
+        ) = await fetch_concurrently(
+            self.data.score.get_best_scores(user_id),
+            self.data.item.get_items(user_id),
+            self.data.item.get_song_unlocks(user_id),
+            self.data.profile.get_options(user_id),
+            self.data.item.get_trophies(user_id),
+            self.data.item.get_tickets(user_id),
+        )
 
         resp.songUpdateTime = int(profile["last_login_date"].timestamp())
         resp.songPlayStatus = [profile["last_song_id"], 1]
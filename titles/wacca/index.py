@@ -14,7 +14,8 @@ import sys
 
 from core import CoreConfig, Utils
 from core.data import Data
-from core.title import BaseServlet
+from core.metrics import PHASE_DECODE, PHASE_ENCODE, PHASE_HANDLER, UNKNOWN_ENDPOINT, mark_request_phase, set_request_labels
+from core.title import BaseServlet, DispatchTable
 from .config import WaccaConfig
 from .config import WaccaConfig
 from .const import WaccaConstants
@@ -44,6 +45,8 @@ class WaccaServlet(BaseServlet):
             WaccaReverse(core_cfg, self.game_cfg),
         ]
 
+        self.dispatch = [DispatchTable(handler) for handler in self.versions]
+
         self.logger = logging.getLogger("wacca")
         log_fmt_str = "[%(asctime)s] Wacca | %(levelname)s | %(message)s"
         log_fmt = logging.Formatter(log_fmt_str)
@@ -105,6 +108,7 @@ class WaccaServlet(BaseServlet):
         endpoint = request.path_params.get('endpoint', '')
         client_ip = Utils.get_ip_addr(request)
         bod = await request.body()
+        mark_request_phase(PHASE_DECODE)
         
         if branch:
             url_path = f"{api}/{branch}/{endpoint}"
@@ -177,7 +181,11 @@ class WaccaServlet(BaseServlet):
         )
         self.logger.debug(req_json)
 
-        if not hasattr(self.versions[internal_ver], func_to_find):
+        handler = self.dispatch[internal_ver].get_method(func_to_find)
+        set_request_labels(WaccaConstants.GAME_CODE, internal_ver, url_path if handler is not None else UNKNOWN_ENDPOINT)
+        mark_request_phase(PHASE_HANDLER)
+
+        if handler is None:
             self.logger.warning(
                 f"{req_json['appVersion']} has no handler for {func_to_find}"
             )
@@ -185,8 +193,8 @@ class WaccaServlet(BaseServlet):
             return end(resp)
 
         try:
-            handler = getattr(self.versions[internal_ver], func_to_find)
             resp = await handler(req_json)
+            mark_request_phase(PHASE_ENCODE)
 
             self.logger.debug(f"{req.appVersion} response {resp}")
             return end(resp)